@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the keyword rule against checking each phrase on its own
+
+The naive approach is the `any(phrase in text for phrase in PHRASES)` pattern,
+extended to report every phrase found. Its cost grows with the number of
+phrases, while the automaton's only grows with the length of the text.
+
+    python benchmarks/bench_keywords.py --phrases 10 100 1000 2000
+
+Posts are random words with a title of 10 words and a selftext of 300, and
+about 1 in 20 mentions one of the phrases.
+"""
+import argparse
+import json
+import pathlib
+import random
+import sys
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from datascience_bot.keywords import KeywordMatcher  # noqa: E402
+
+
+def make_corpus(
+    count_phrases: int, count_posts: int, seed: int = 0
+) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """Make random phrases and posts, some of which mention a phrase"""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocabulary = [
+        "".join(rng.choices(letters, k=rng.randint(2, 9))) for _ in range(5000)
+    ]
+    phrases = [
+        " ".join(rng.choices(vocabulary, k=rng.randint(2, 4)))
+        for _ in range(count_phrases)
+    ]
+    posts = []
+    for _ in range(count_posts):
+        title = " ".join(rng.choices(vocabulary, k=10))
+        words = rng.choices(vocabulary, k=300)
+        if rng.random() < 0.05:
+            words.insert(rng.randrange(len(words)), rng.choice(phrases).upper())
+        posts.append((title, " ".join(words)))
+    return phrases, posts
+
+
+def naive_matches(phrases: List[str], title: str, selftext: str) -> List[str]:
+    title, selftext = title.lower(), selftext.lower()
+    return [phrase for phrase in phrases if phrase in title or phrase in selftext]
+
+
+def bench(count_phrases: int, count_posts: int) -> Dict:
+    phrases, posts = make_corpus(count_phrases, count_posts)
+    result = {"phrases": count_phrases, "posts": count_posts}
+
+    started_at = time.perf_counter()
+    naive = [naive_matches(phrases, title, selftext) for title, selftext in posts]
+    result["naive_us"] = (time.perf_counter() - started_at) / count_posts * 1e6
+
+    started_at = time.perf_counter()
+    matcher = KeywordMatcher(phrases)
+    matcher.matches("")  # build the automaton
+    result["build_ms"] = (time.perf_counter() - started_at) * 1e3
+
+    started_at = time.perf_counter()
+    found = [matcher.matches(title, selftext) for title, selftext in posts]
+    result["automaton_us"] = (time.perf_counter() - started_at) / count_posts * 1e6
+
+    # the naive approach also matches within words, so it may find more
+    result["agree"] = all(set(a) <= set(b) for a, b in zip(found, naive))
+    result["matched"] = sum(bool(phrases) for phrases in found)
+    return result
+
+
+def print_table(results: List[Dict]) -> None:
+    print(
+        f"{'phrases':>8}{'posts':>8}{'naive us/post':>15}"
+        f"{'automaton us/post':>19}{'build ms':>10}{'matched':>9}  agree"
+    )
+    for result in results:
+        print(
+            f"{result['phrases']:>8}{result['posts']:>8}{result['naive_us']:>15.1f}"
+            f"{result['automaton_us']:>19.1f}{result['build_ms']:>10.1f}"
+            f"{result['matched']:>9}  {result['agree']}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--phrases", type=int, nargs="+", default=[10, 100, 1000, 2000, 10000]
+    )
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--json", action="store_true", help="print JSON lines")
+    args = parser.parse_args()
+
+    results = [bench(count, args.posts) for count in args.phrases]
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the bot's tasks against a local fake reddit
+
+Every task runs in a fresh process, so it starts with cold caches and no
+reddit session, like a cold AWS Lambda invocation. For each task and scale
+the benchmark reports wall time, the number of API requests and the peak
+memory allocated by Python.
+
+    python benchmarks/bench_tasks.py --scales 10 100 1000 --latency 0.01
+
+Scale is the number of submissions in r/new and of top-level comments in the
+old weekly thread. Like reddit, the fake server pages back through at most
+1000 items of a listing.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+from urllib.request import Request, urlopen
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+
+from fake_reddit import SUBREDDIT, serve  # noqa: E402
+
+
+TASKS = [
+    "moderate_submissions",
+    "moderate_modqueue",
+    "moderate_comments",
+    "refresh_weekly_thread",
+    "update_wiki",
+]
+
+
+def fake_request(url: str, data: Dict = None) -> Dict:
+    body = None if data is None else json.dumps(data).encode("utf-8")
+    with urlopen(Request(url, data=body)) as response:
+        return json.load(response)
+
+
+def run_task(task: str, env: Dict[str, str], results) -> None:
+    """Run a task in this process and put its measurements on `results`"""
+    os.environ.update(env)
+    logging.disable(logging.INFO)  # keep the output to the results table
+
+    # import after setting the environment, which modules read on import
+    from datascience_bot.cursor import write_cursor
+
+    if task == "moderate_submissions":
+        from datascience_bot.cli.moderate_submissions import main
+
+        # start from a cursor older than every submission
+        class Oldest:
+            fullname = "t3_0"
+            created_utc = 0
+
+        write_cursor(f"{SUBREDDIT}.new", Oldest)
+    elif task == "moderate_modqueue":
+        from datascience_bot.cli.moderate_modqueue import main
+    elif task == "moderate_comments":
+        from datascience_bot.cli.moderate_comments import main
+
+        class Oldest:
+            fullname = "t1_0"
+            created_utc = 0
+
+        write_cursor(f"{SUBREDDIT}.comments", Oldest)
+    elif task == "refresh_weekly_thread":
+        from datascience_bot.cli import refresh_weekly_thread
+
+        refresh_weekly_thread.READY_INTERVAL = 0.01
+
+        def main():
+            refresh_weekly_thread.main(validate=False)
+
+    elif task == "update_wiki":
+        from datascience_bot.cli.update_wiki import main
+
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    try:
+        main()
+        error = None
+    except Exception as err:
+        error = repr(err)
+    seconds = time.perf_counter() - started_at
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.put({"seconds": seconds, "peak": peak, "error": error})
+
+
+def bench(server_url: str, scale: int, task: str) -> Dict:
+    """Seed the fake reddit, then run a task in a fresh process"""
+    fake_request(f"{server_url}/_fake/seed", {"submissions": scale, "comments": scale})
+    with tempfile.TemporaryDirectory() as state_dir:
+        env = {
+            "SUBREDDIT_NAME": SUBREDDIT,
+            "DATASCIENCE_BOT_STATE_DIR": state_dir,
+            "REDDIT_OAUTH_URL": server_url,
+            "REDDIT_URL": server_url,
+            "DATASCIENCE_BOT_USERNAME": "datascience-bot",
+            "DATASCIENCE_BOT_PASSWORD": "password",
+            "DATASCIENCE_BOT_CLIENT_ID": "client-id",
+            "DATASCIENCE_BOT_CLIENT_SECRET": "client-secret",
+            "praw_check_for_updates": "False",
+        }
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=run_task, args=(task, env, results))
+        process.start()
+        result = results.get()
+        process.join()
+
+    stats = fake_request(f"{server_url}/_fake/stats")
+    result.update(task=task, scale=scale, requests=stats["total"])
+    return result
+
+
+def print_table(results: List[Dict]) -> None:
+    print(
+        f"{'task':<24}{'scale':>8}{'seconds':>10}{'requests':>10}"
+        f"{'peak MiB':>10}  error"
+    )
+    for result in results:
+        print(
+            f"{result['task']:<24}{result['scale']:>8}{result['seconds']:>10.2f}"
+            f"{result['requests']:>10}{result['peak'] / 2 ** 20:>10.1f}"
+            f"  {result['error'] or ''}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--tasks", nargs="+", choices=TASKS, default=TASKS)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds per API request"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="share of requests to 429"
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON lines")
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method("spawn")
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=serve,
+        kwargs={"latency": args.latency, "error_rate": args.error_rate, "ready": ready},
+        daemon=True,
+    )
+    server.start()
+    server_url = ready.get()
+
+    try:
+        results = [
+            bench(server_url, scale, task)
+            for scale in args.scales
+            for task in args.tasks
+        ]
+    finally:
+        server.terminate()
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
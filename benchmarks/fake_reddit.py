@@ -0,0 +1,543 @@
+# -*- coding: utf-8 -*-
+"""A local stand-in for the parts of the reddit API that datascience-bot uses
+
+The server keeps a single fake subreddit in memory and speaks just enough of
+the API for PRAW: OAuth tokens, listings, /api/info, comment trees, mod
+actions and the wiki. It can add latency to every request and answer a share
+of requests with 429 Too Many Requests.
+
+Point the bot at the server with the REDDIT_OAUTH_URL and REDDIT_URL
+environment variables. A few endpoints under /_fake/ control the server:
+
+    POST /_fake/seed   reset the subreddit, e.g. {"submissions": 1000}
+    GET  /_fake/stats  count requests by endpoint
+    POST /_fake/config set {"latency": seconds, "error_rate": 0..1}
+
+Run it on its own with `python benchmarks/fake_reddit.py --port 8080`.
+"""
+import argparse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+SUBREDDIT = "datascience_bot_dev"
+MODERATORS = ["datascience-bot", "vogt4nick"]
+WIKI_PAGES = ["frequently-asked-questions", "index", "resources"]
+
+# reddit only pages this far back through a listing
+MAX_LISTING_SIZE = 1000
+
+SPAM_URLS = [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://towardsdatascience.com/some-article",
+    "https://medium.com/@someone/some-article",
+]
+SPAM_COMMENTS = [
+    "Check out [my site](https://www.pornhub.com/view_video.php?id=1)",
+    "Great question! Answers at xvideos.com/q/1 and also youtube.com",
+]
+
+
+def to_base36(number: int) -> str:
+    chars = "0123456789abcdefghijklmnopqrstuvwxyz"
+    digits = ""
+    while True:
+        number, digit = divmod(number, 36)
+        digits = chars[digit] + digits
+        if number == 0:
+            return digits
+
+
+def listing(children: List[Dict], after: Optional[str] = None) -> Dict:
+    return {
+        "kind": "Listing",
+        "data": {"after": after, "before": None, "children": children},
+    }
+
+
+class FakeSubreddit:
+    """The state of the fake subreddit"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ids = itertools.count(36 ** 4)
+        self.things: Dict[str, Dict] = {}  # fullname -> data
+        self.submissions: List[str] = []  # fullnames, oldest first
+        self.comments: List[str] = []  # fullnames, oldest first
+        self.replies: Dict[str, List[str]] = {}  # parent -> child fullnames
+        self.redditors: Dict[str, Dict] = {}
+        self.wiki: Dict[str, str] = {}
+        self.modlog: List[Dict] = []
+
+    def new_id(self) -> str:
+        return to_base36(next(self.ids))
+
+    def add_redditor(self, name: str, karma: int) -> None:
+        self.redditors[name.lower()] = {
+            "name": name,
+            "id": self.new_id(),
+            "link_karma": karma // 2,
+            "comment_karma": karma - karma // 2,
+            "created_utc": 1500000000.0,
+        }
+
+    def add_submission(self, **data) -> Dict:
+        id = self.new_id()
+        submission = {
+            "id": id,
+            "name": f"t3_{id}",
+            "title": "A question about data science",
+            "selftext": "",
+            "url": f"https://www.reddit.com/r/{SUBREDDIT}/comments/{id}/",
+            "author": "SubstantialStrain6",
+            "subreddit": SUBREDDIT,
+            "created_utc": time.time(),
+            "permalink": f"/r/{SUBREDDIT}/comments/{id}/",
+            "stickied": False,
+            "distinguished": None,
+            "approved": False,
+            "removed": False,
+            "spam": False,
+            "num_comments": 0,
+            "link_flair_text": None,
+        }
+        submission.update(data)
+        submission["is_self"] = submission["url"].endswith(submission["permalink"])
+        self.things[submission["name"]] = submission
+        self.submissions.append(submission["name"])
+        return submission
+
+    def add_comment(self, parent: str, **data) -> Dict:
+        id = self.new_id()
+        link = parent if parent.startswith("t3_") else self.things[parent]["link_id"]
+        comment = {
+            "id": id,
+            "name": f"t1_{id}",
+            "parent_id": parent,
+            "link_id": link,
+            "body": "I have a question",
+            "author": "b3405920",
+            "subreddit": SUBREDDIT,
+            "created_utc": time.time(),
+            "permalink": f"/r/{SUBREDDIT}/comments/{link[3:]}/_/{id}/",
+            "distinguished": None,
+            "stickied": False,
+            "approved": False,
+            "removed": False,
+            "spam": False,
+        }
+        comment.update(data)
+        self.things[comment["name"]] = comment
+        self.comments.append(comment["name"])
+        self.replies.setdefault(parent, []).append(comment["name"])
+        self.things[link]["num_comments"] += 1
+        return comment
+
+    def seed(self, submissions: int = 100, comments: int = 100) -> None:
+        """Reset the subreddit
+
+        Args:
+            submissions (int): Number of submissions in r/new. About 10% link
+                to spam domains, 10% are by authors with little karma and
+                20% are reported, so they're in the modqueue.
+            comments (int): Number of top-level comments in the weekly
+                thread. About half of them are answered, and about 5% link
+                to porn.
+        """
+        with self.lock:
+            self.__init__()
+            rng = random.Random(submissions)
+            for name in MODERATORS:
+                self.add_redditor(name, 10000)
+            for i in range(100):
+                self.add_redditor(f"regular{i}", 1000 + i)
+                self.add_redditor(f"newbie{i}", i // 2)
+            self.add_redditor("SubstantialStrain6", 1000)
+            self.add_redditor("b3405920", 1000)
+
+            created_utc = time.time() - submissions - 7 * 24 * 60 * 60
+            thread = self.add_submission(
+                title=(
+                    "Weekly Entering & Transitioning Thread | "
+                    "01 Sep 2019 - 08 Sep 2019"
+                ),
+                selftext="Testing",
+                author="datascience-bot",
+                stickied=True,
+                approved=True,
+                distinguished="moderator",
+                created_utc=created_utc,
+            )
+            comment_rng = random.Random(comments)
+            for i in range(comments):
+                data = {"author": f"regular{i % 100}"}
+                if comment_rng.random() < 0.05:
+                    data["body"] = comment_rng.choice(SPAM_COMMENTS)
+                comment = self.add_comment(thread["name"], **data)
+                if i % 2:
+                    self.add_comment(comment["name"], author=f"regular{(i + 1) % 100}")
+
+            for i in range(submissions):
+                data = {
+                    "author": f"regular{rng.randrange(100)}",
+                    "created_utc": created_utc + 7 * 24 * 60 * 60 + i,
+                    "selftext": f"Question number {i}",
+                }
+                roll = rng.random()
+                if roll < 0.1:
+                    data["url"] = rng.choice(SPAM_URLS)
+                elif roll < 0.2:
+                    data["author"] = f"newbie{rng.randrange(100)}"
+                if rng.random() < 0.2:
+                    data["num_reports"] = 1
+                self.add_submission(**data)
+
+            for page in WIKI_PAGES:
+                self.wiki[page] = ""
+
+    def thing(self, fullname: str) -> Dict:
+        kind = "t3" if fullname.startswith("t3_") else "t1"
+        return {"kind": kind, "data": dict(self.things[fullname])}
+
+    def comment_tree(self, fullname: str) -> Dict:
+        thing = self.thing(fullname)
+        children = self.replies.get(fullname, [])
+        thing["data"]["replies"] = (
+            listing([self.comment_tree(child) for child in children])
+            if children
+            else ""
+        )
+        return thing
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Route requests to the fake subreddit"""
+
+    server: "FakeRedditServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass  # keep benchmark output clean
+
+    def do_GET(self) -> None:
+        self.handle_request("GET")
+
+    def do_POST(self) -> None:
+        self.handle_request("POST")
+
+    def handle_request(self, method: str) -> None:
+        url = urlsplit(self.path)
+        path = "/" + url.path.strip("/")
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("content-length") or 0)
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        if body.startswith("{"):
+            params.update(json.loads(body))
+        else:
+            params.update({key: values[-1] for key, values in parse_qs(body).items()})
+
+        server = self.server
+        if not path.startswith("/_fake/"):
+            endpoint = server.count(method, path)
+            if server.latency:
+                time.sleep(server.latency)
+            if endpoint != "POST /api/v1/access_token" and (
+                server.rng.random() < server.error_rate
+            ):
+                return self.respond(429, {"message": "Too Many Requests"})
+
+        try:
+            status, payload = server.route(method, path, params)
+        except KeyError as err:
+            status, payload = 404, {"message": "Not Found", "error": str(err)}
+        self.respond(status, payload)
+
+    def respond(self, status: int, payload) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json; charset=UTF-8")
+        self.send_header("content-length", str(len(body)))
+        self.send_header("x-ratelimit-remaining", "600.0")
+        self.send_header("x-ratelimit-used", "0")
+        self.send_header("x-ratelimit-reset", "600")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeRedditServer(ThreadingHTTPServer):
+    """HTTP server with a fake subreddit"""
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0, error_rate: float = 0.0):
+        """
+        Args:
+            port (int): Port to listen on. 0 picks a free port.
+            latency (float): Seconds to wait before answering a request
+            error_rate (float): Share of requests to answer with a 429
+        """
+        super().__init__(("127.0.0.1", port), Handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(0)
+        self.requests: Counter = Counter()
+        self.subreddit = FakeSubreddit()
+        self.subreddit.seed(submissions=10, comments=10)
+        self._count_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, method: str, path: str) -> str:
+        # group paths by endpoint, e.g. "GET /comments/{id}"
+        endpoint = f"{method} " + re.sub(
+            r"^/(comments|user|r/[^/]+/wiki)/[^/]+", r"/\1/{id}", path
+        )
+        with self._count_lock:
+            self.requests[endpoint] += 1
+        return endpoint
+
+    def route(self, method: str, path: str, params: Dict) -> Tuple[int, Dict]:
+        sub = self.subreddit
+        with sub.lock:
+            # control endpoints
+            if path == "/_fake/seed":
+                sub.seed(
+                    submissions=int(params.get("submissions", 100)),
+                    comments=int(params.get("comments", 100)),
+                )
+                self.requests.clear()
+                return 200, {}
+            if path == "/_fake/stats":
+                return (
+                    200,
+                    {
+                        "total": sum(self.requests.values()),
+                        "endpoints": dict(self.requests),
+                    },
+                )
+            if path == "/_fake/config":
+                self.latency = float(params.get("latency", self.latency))
+                self.error_rate = float(params.get("error_rate", self.error_rate))
+                return 200, {}
+
+            # oauth
+            if path == "/api/v1/access_token":
+                return (
+                    200,
+                    {
+                        "access_token": f"fake-{time.time()}",
+                        "token_type": "bearer",
+                        "expires_in": 3600,
+                        "scope": "*",
+                    },
+                )
+
+            # listings
+            match = re.fullmatch(
+                r"/r/[^/]+/(new|hot|comments|about/modqueue|about/reports)", path
+            )
+            if match:
+                return 200, self.listing(match.group(1), params)
+            if path == "/api/info":
+                fullnames = [name for name in params["id"].split(",") if name]
+                return (
+                    200,
+                    listing(
+                        [sub.thing(name) for name in fullnames if name in sub.things]
+                    ),
+                )
+            match = re.fullmatch(r"/comments/([^/]+)", path)
+            if match:
+                fullname = f"t3_{match.group(1)}"
+                children = sub.replies.get(fullname, [])
+                return (
+                    200,
+                    [
+                        listing([sub.thing(fullname)]),
+                        listing([sub.comment_tree(child) for child in children]),
+                    ],
+                )
+            if path == "/r/{}/about/moderators".format(SUBREDDIT):
+                return (
+                    200,
+                    {
+                        "kind": "UserList",
+                        "data": {
+                            "children": [
+                                {
+                                    "name": name,
+                                    "id": f"t2_{name}",
+                                    "date": 1500000000.0,
+                                    "mod_permissions": ["all"],
+                                }
+                                for name in MODERATORS
+                            ]
+                        },
+                    },
+                )
+            if path == "/r/{}/about/log".format(SUBREDDIT):
+                return 200, listing(sub.modlog)
+            match = re.fullmatch(r"/user/([^/]+)/about", path)
+            if match:
+                return (
+                    200,
+                    {"kind": "t2", "data": sub.redditors[match.group(1).lower()]},
+                )
+
+            # wiki
+            match = re.fullmatch(r"/r/[^/]+/wiki/([^/]+)", path)
+            if match and method == "GET":
+                return (
+                    200,
+                    {
+                        "kind": "wikipage",
+                        "data": {
+                            "content_md": sub.wiki[match.group(1)],
+                            "may_revise": True,
+                            "revision_by": None,
+                            "revision_date": time.time(),
+                        },
+                    },
+                )
+            if re.fullmatch(r"/r/[^/]+/api/wiki/edit", path):
+                sub.wiki[params["page"]] = params["content"].strip()
+                return 200, {}
+
+            # actions
+            if path == "/api/submit":
+                submission = sub.add_submission(
+                    title=params["title"],
+                    selftext=params.get("text", ""),
+                    author="datascience-bot",
+                )
+                return (
+                    200,
+                    {
+                        "json": {
+                            "errors": [],
+                            "data": {
+                                "url": "https://www.reddit.com"
+                                + submission["permalink"],
+                                "id": submission["id"],
+                                "name": submission["name"],
+                            },
+                        }
+                    },
+                )
+            if path == "/api/comment":
+                comment = sub.add_comment(
+                    params["thing_id"], body=params["text"], author="datascience-bot"
+                )
+                return (
+                    200,
+                    {
+                        "json": {
+                            "errors": [],
+                            "data": {"things": [sub.thing(comment["name"])]},
+                        }
+                    },
+                )
+            if path in ("/api/remove", "/api/approve", "/api/report"):
+                thing = sub.things[params.get("id") or params.get("thing_id")]
+                if path == "/api/remove":
+                    thing["removed"] = True
+                    thing["spam"] = params.get("spam") == "True"
+                elif path == "/api/approve":
+                    thing["approved"] = True
+                return 200, {}
+            if path == "/api/distinguish":
+                thing = sub.things[params["id"]]
+                thing["distinguished"] = "moderator"
+                thing["stickied"] = params.get("sticky") == "True"
+                return (
+                    200,
+                    {
+                        "json": {
+                            "errors": [],
+                            "data": {"things": [sub.thing(params["id"])]},
+                        }
+                    },
+                )
+            if path == "/api/set_subreddit_sticky":
+                sub.things[params["id"]]["stickied"] = params["state"] == "True"
+                return 200, {"json": {"errors": []}}
+            if re.fullmatch(r"/r/[^/]+/api/(flair|selectflair)", path):
+                sub.things[params["link"]]["link_flair_text"] = params.get("text")
+                return 200, {"json": {"errors": []}}
+
+        raise KeyError(f"{method} {path}")
+
+    def listing(self, name: str, params: Dict) -> Dict:
+        sub = self.subreddit
+        if name == "hot":
+            # stickied submissions come first
+            fullnames = sorted(
+                reversed(sub.submissions),
+                key=lambda fullname: not sub.things[fullname]["stickied"],
+            )
+        elif name == "comments":
+            fullnames = list(reversed(sub.comments))
+        elif name == "about/modqueue":
+            fullnames = [
+                fullname
+                for fullname in reversed(sub.submissions + sub.comments)
+                if not sub.things[fullname]["approved"]
+                and not sub.things[fullname]["removed"]
+                and sub.things[fullname].get("num_reports")
+            ]
+        elif name == "about/reports":
+            fullnames = [
+                fullname
+                for fullname in reversed(sub.submissions + sub.comments)
+                if sub.things[fullname].get("num_reports")
+            ]
+        else:
+            fullnames = list(reversed(sub.submissions))
+        fullnames = fullnames[:MAX_LISTING_SIZE]
+
+        start = 0
+        if params.get("after") in fullnames:
+            start = fullnames.index(params["after"]) + 1
+        elif params.get("after"):
+            start = len(fullnames)  # like reddit, when `after` left the listing
+        limit = min(int(params.get("limit", 25)), 100)
+        page = fullnames[start : start + limit]
+        after = page[-1] if start + limit < len(fullnames) and page else None
+        return listing([sub.thing(fullname) for fullname in page], after=after)
+
+
+def serve(port: int = 0, latency: float = 0.0, error_rate: float = 0.0, ready=None):
+    """Run a fake reddit server until the process is killed
+
+    Args:
+        port (int): Port to listen on. 0 picks a free port.
+        latency (float): Seconds to wait before answering a request
+        error_rate (float): Share of requests to answer with a 429
+        ready: Optional multiprocessing queue that receives the server URL
+    """
+    server = FakeRedditServer(port=port, latency=latency, error_rate=error_rate)
+    if ready is not None:
+        ready.put(server.url)
+    else:
+        print(f"Serving a fake reddit on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    serve(port=args.port, latency=args.latency, error_rate=args.error_rate)
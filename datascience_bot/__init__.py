@@ -2,9 +2,14 @@
 """datascience-bot helps moderate r/datascience on Reddit
 """
 import os
+import threading
+import time
+from typing import Dict, Iterable, NamedTuple, Tuple, Union
 
 import praw
 
+from datascience_bot import ratelimit, tokens
+
 __author__ = "vogt4nick"
 __copyright__ = "Copyright 2019, Nick Vogt"
 __license__ = "MIT"
@@ -70,93 +75,239 @@ def update(target, reddit: praw.models.reddit):
     )
 
 
+class SubmissionStatus(NamedTuple):
+    """Moderation status of a submission"""
+
+    fullname: str
+    deleted: bool
+    removed: bool
+    spam: bool
+    approved: bool
+
+
+# seconds a fetched status is reused by get_submission_statuses
+STATUS_MAX_AGE = 30
+
+# the /api/info endpoint accepts at most 100 fullnames per request
+INFO_BATCH_SIZE = 100
+
+_status_lock = threading.Lock()
+_status_memo: Dict[str, Tuple[float, SubmissionStatus]] = {}
+
+
+def _get_status(submission: praw.models.Submission) -> SubmissionStatus:
+    # modified code from following source:
+    # https://www.reddit.com/r/redditdev/comments/44a7xm/praw_how_to_tell_if_a_submission_has_been_removed/czoreie
+    deleted = submission.author is None or submission.selftext == "[removed]"
+
+    # spam posts are removed, but don't trigger the submission.removed flag
+    # https://www.reddit.com/r/redditdev/comments/d3vqix/how_to_check_if_a_submission_has_been_removed_as/
+    # Only moderators get the moderation flags. Reading a missing one with
+    # getattr would fetch the submission again, so read what's loaded.
+    loaded = vars(submission)
+    return SubmissionStatus(
+        fullname=submission.fullname,
+        deleted=deleted,
+        removed=bool(loaded.get("removed", False)),
+        spam=bool(loaded.get("spam", False)),
+        approved=bool(loaded.get("approved", False)),
+    )
+
+
+def get_submission_statuses(
+    submissions: Iterable[Union[praw.models.Submission, str]],
+    reddit: praw.models.reddit,
+    max_age: float = STATUS_MAX_AGE,
+) -> Dict[str, SubmissionStatus]:
+    """Get the moderation status of many submissions in as few requests as
+    possible
+
+    Submissions are fetched in batches of 100 through the /api/info endpoint.
+    Statuses fetched less than `max_age` seconds ago are reused without a
+    request.
+
+    Args:
+        submissions (Iterable[Union[praw.models.Submission, str]]): Submissions
+            or their fullnames, e.g. "t3_d4j3x5"
+        reddit (praw.models.reddit): reddit instance used to fetch statuses
+        max_age (float): Max age in seconds of a reused status. Pass 0 to
+            always fetch fresh statuses.
+
+    Returns:
+        Dict[str, SubmissionStatus]: Status by fullname. Submissions reddit
+            doesn't know about are left out.
+    """
+    fullnames = [
+        thing if isinstance(thing, str) else thing.fullname for thing in submissions
+    ]
+
+    now = time.time()
+    statuses = {}
+    missing = []
+    with _status_lock:
+        # keep what this caller may reuse, even if it's older than the default
+        prune_age = max(max_age, STATUS_MAX_AGE)
+        for fullname, (fetched_at, _) in list(_status_memo.items()):
+            if now - fetched_at >= prune_age:
+                del _status_memo[fullname]
+
+        for fullname in dict.fromkeys(fullnames):  # dedupe, keep order
+            memo = _status_memo.get(fullname)
+            if memo is not None and now - memo[0] < max_age:
+                statuses[fullname] = memo[1]
+            else:
+                missing.append(fullname)
+
+    for i in range(0, len(missing), INFO_BATCH_SIZE):
+        batch = missing[i : i + INFO_BATCH_SIZE]
+        fetched_at = time.time()
+        for submission in reddit.info(batch):
+            status = _get_status(submission)
+            statuses[status.fullname] = status
+            with _status_lock:
+                _status_memo[status.fullname] = (fetched_at, status)
+
+    return statuses
+
+
+def get_submission_status(
+    submission: Union[praw.models.Submission, str],
+    reddit: praw.models.reddit,
+    max_age: float = 0,
+) -> SubmissionStatus:
+    """Get the moderation status of a single submission
+
+    Args:
+        submission (Union[praw.models.Submission, str]): Submission or its
+            fullname
+        reddit (praw.models.reddit): reddit instance used to fetch the status
+        max_age (float): Max age in seconds of a reused status. By default,
+            the status is always fetched fresh.
+
+    Returns:
+        SubmissionStatus: Status of the submission
+    """
+    fullname = submission if isinstance(submission, str) else submission.fullname
+    statuses = get_submission_statuses([fullname], reddit, max_age=max_age)
+    if fullname not in statuses:
+        raise Exception(f"Could not find submission {fullname}")
+    return statuses[fullname]
+
+
 def submission_is_deleted(
-    submission: praw.models.Submission, reddit: praw.models.reddit
+    submission: praw.models.Submission, reddit: praw.models.reddit, max_age: float = 0
 ) -> bool:
     """Returns true if the given submission has been deleted by the author
 
     Args:
         submission (praw.models.Submission): Submission to test
         reddit (praw.models.reddit): reddit instance used to refresh submission
+        max_age (float): Max age in seconds of a reused status. By default,
+            the status is always fetched fresh.
 
     Returns:
         bool: True if the submission has been deleted. Else False.
     """
-    submission = update(submission, reddit)
-
-    # modified code from following source:
-    # https://www.reddit.com/r/redditdev/comments/44a7xm/praw_how_to_tell_if_a_submission_has_been_removed/czoreie
-    if submission.author is None:
-        if submission.selftext == "[deleted]":
-            return True
-        if submission.selftext == "[removed]":
-            return True
-        return True
-    if submission.selftext == "[removed]":
-        return True
-
-    return False
+    return get_submission_status(submission, reddit, max_age=max_age).deleted
 
 
 def submission_is_removed(
-    submission: praw.models.Submission, reddit: praw.models.reddit
+    submission: praw.models.Submission, reddit: praw.models.reddit, max_age: float = 0
 ) -> bool:
     """Returns true if the given submission has been removed by a moderator
 
     Args:
         submission (praw.models.Submission): Submission to test
         reddit (praw.models.reddit): reddit instance used to refresh submission
+        max_age (float): Max age in seconds of a reused status. By default,
+            the status is always fetched fresh.
 
     Returns:
         bool: True if the submission has been removed. Else False.
     """
-    submission = update(submission, reddit)
+    status = get_submission_status(submission, reddit, max_age=max_age)
+    return status.spam or status.removed
 
-    # spam posts are removed, but don't trigger the submission.removed flag
-    # https://www.reddit.com/r/redditdev/comments/d3vqix/how_to_check_if_a_submission_has_been_removed_as/
-    return submission.spam or submission.removed
+
+# reddit accounts, mapped to the prefix of their environment variables
+ACCOUNTS = {
+    "datascience-bot": "DATASCIENCE_BOT",
+    "SubstantialStrain6": "SUBSTANTIALSTRAIN6",
+    "b3405920": "B3405920",
+}
+
+_sessions_lock = threading.Lock()
+# reddit instances by account and credentials, so rotated credentials get a
+# new instance
+_sessions: Dict[Tuple, praw.Reddit] = {}
+
+
+def get_reddit(account: str) -> praw.models.reddit:
+    """Get the reddit instance of an account, shared by the whole process
+
+    The first call creates the instance. Later calls with the same
+    credentials, e.g. in warm AWS Lambda invocations, reuse it along with its
+    access token. prawcore refreshes the token by itself shortly before it
+    expires. New instances get their token through `tokens.TOKEN_STORE`, so
+    they reuse a valid token from an earlier process instead of doing the
+    password grant again. All requests of an instance are scheduled by
+    priority through `ratelimit`.
+
+    Args:
+        account (str): Username of one of the ACCOUNTS
+
+    Returns:
+        praw.models.reddit: A reddit instance with the account
+    """
+    if account not in ACCOUNTS:
+        raise Exception(f"`account` must be one of {sorted(ACCOUNTS)}. Not {account}")
+
+    prefix = ACCOUNTS[account]
+    settings = {
+        "username": os.getenv(f"{prefix}_USERNAME"),
+        "password": os.getenv(f"{prefix}_PASSWORD"),
+        "client_id": os.getenv(f"{prefix}_CLIENT_ID"),
+        "client_secret": os.getenv(f"{prefix}_CLIENT_SECRET"),
+    }
+    # point the bot at another API, e.g. benchmarks/fake_reddit.py
+    for key, env in (("oauth_url", "REDDIT_OAUTH_URL"), ("reddit_url", "REDDIT_URL")):
+        if os.getenv(env):
+            settings[key] = os.getenv(env)
+    session_key = (account, tuple(sorted(settings.items())))
+
+    with _sessions_lock:
+        if session_key not in _sessions:
+            reddit = praw.Reddit(user_agent=account, **settings)
+            tokens.attach_token_store(
+                reddit, tokens.TOKEN_STORE, key=f"{reddit.config.client_id}:{account}"
+            )
+            ratelimit.install(reddit)
+            _sessions[session_key] = reddit
+        return _sessions[session_key]
 
 
 def get_datascience_bot() -> praw.models.reddit:
-    """Create a reddit instance with u/datascience-bot
+    """Get the reddit instance with u/datascience-bot
 
     Returns:
         praw.models.reddit: A reddit instance with u/datascience-bot
     """
-    return praw.Reddit(
-        username=os.getenv("DATASCIENCE_BOT_USERNAME"),
-        password=os.getenv("DATASCIENCE_BOT_PASSWORD"),
-        client_id=os.getenv("DATASCIENCE_BOT_CLIENT_ID"),
-        client_secret=os.getenv("DATASCIENCE_BOT_CLIENT_SECRET"),
-        user_agent="datascience-bot",
-    )
+    return get_reddit("datascience-bot")
 
 
 def get_SubstantialStrain6() -> praw.models.reddit:
-    """Create a reddit instance with u/SubstantialStrain6
+    """Get the reddit instance with u/SubstantialStrain6
 
     Returns:
         praw.models.reddit: A reddit instance with u/SubstantialStrain6
     """
-    return praw.Reddit(
-        username=os.getenv("SUBSTANTIALSTRAIN6_USERNAME"),
-        password=os.getenv("SUBSTANTIALSTRAIN6_PASSWORD"),
-        client_id=os.getenv("SUBSTANTIALSTRAIN6_CLIENT_ID"),
-        client_secret=os.getenv("SUBSTANTIALSTRAIN6_CLIENT_SECRET"),
-        user_agent="SubstantialStrain6",
-    )
+    return get_reddit("SubstantialStrain6")
 
 
 def get_b3405920() -> praw.models.reddit:
-    """Create a reddit instance with u/b3405920
+    """Get the reddit instance with u/b3405920
 
     Returns:
         praw.models.reddit: A reddit instance with u/b3405920
     """
-    return praw.Reddit(
-        username=os.getenv("B3405920_USERNAME"),
-        password=os.getenv("B3405920_PASSWORD"),
-        client_id=os.getenv("B3405920_CLIENT_ID"),
-        client_secret=os.getenv("B3405920_CLIENT_SECRET"),
-        user_agent="b3405920",
-    )
+    return get_reddit("b3405920")
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""Bounded least-recently-used cache whose entries expire
+"""
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional
+
+from datascience_bot.state import read_state, write_state
+
+
+class TTLCache:
+    """Least-recently-used cache whose entries expire after `ttl` seconds
+
+    The cache holds at most `maxsize` entries and evicts the least recently
+    used one when it's full. Pass `state_name` to back the cache with a state
+    file, which is read on first use and written by `save`. Keys must be
+    strings and values JSON serializable when the cache is backed by a file.
+    """
+
+    def __init__(
+        self, maxsize: int = 1024, ttl: float = 3600, state_name: Optional[str] = None
+    ):
+        """
+        Args:
+            maxsize (int): Max number of entries
+            ttl (float): Seconds before an entry expires
+            state_name (Optional[str]): Name of the state file that backs the
+                cache. If None, the cache lives in memory only.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.state_name = state_name
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = state_name is None
+
+    def _ensure_loaded(self) -> None:
+        # read the state file on first use, not when the module is imported
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self.load()
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.time()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value and mark it as recently used
+
+        Args:
+            key (Hashable): Key of the value
+            default (Any): Returned if the key is missing or expired
+
+        Returns:
+            Any: The cached value, or default
+        """
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[0] <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Cache a value, evicting the least recently used value if full
+
+        Args:
+            key (Hashable): Key of the value
+            value (Any): Value to cache
+        """
+        self._ensure_loaded()
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a value from the cache
+
+        Args:
+            key (Hashable): Key of the value
+            default (Any): Returned if the key is missing
+
+        Returns:
+            Any: The removed value, or default
+        """
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        """Remove all values and reset the hit and miss counters"""
+        with self._lock:
+            self._loaded = True
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Get the size of the cache and its hit and miss counters
+
+        Returns:
+            Dict[str, int]: "size", "hits" and "misses" of the cache
+        """
+        return {"size": len(self), "hits": self.hits, "misses": self.misses}
+
+    def load(self) -> None:
+        """Read unexpired entries from the state file, if any"""
+        if self.state_name is None:
+            return
+
+        now = time.time()
+        rows = read_state(self.state_name, default=[])
+        with self._lock:
+            for key, expires_at, value in rows[-self.maxsize :]:
+                if expires_at > now:
+                    self._entries[key] = (expires_at, value)
+            self._loaded = True
+
+    def save(self) -> None:
+        """Write unexpired entries to the state file, if any"""
+        if self.state_name is None:
+            return
+
+        self._ensure_loaded()
+        now = time.time()
+        with self._lock:
+            rows = [
+                [key, expires_at, value]
+                for key, (expires_at, value) in self._entries.items()
+                if expires_at > now
+            ]
+        write_state(self.state_name, rows)
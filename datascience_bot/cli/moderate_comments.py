@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Remove new comments that link to spam
+
+Spammers who can't get a submission past the spam filter drop their links in
+comments instead. We page back through the newest comments to the last one
+we checked, and scan every URL in each body against the spam domains.
+"""
+import logging
+import os
+from typing import FrozenSet
+
+import praw
+
+from datascience_bot import get_datascience_bot, logs
+from datascience_bot.cursor import iter_since, read_cursor, write_cursor
+from datascience_bot.moderators import check_modlog, get_moderators
+from datascience_bot.remove_spam import remove_spam_comment
+
+
+logger = logging.getLogger(__name__)
+
+
+# how many of the newest comments to check when there is no cursor yet
+FIRST_RUN_LIMIT = 100
+
+
+def moderate_comment(
+    comment: praw.models.reddit.comment, moderators: FrozenSet[str]
+) -> bool:
+    """Remove a comment if it links to spam, unless a moderator vouches for it
+
+    Args:
+        comment (praw.models.reddit.comment): Comment to moderate
+        moderators (FrozenSet[str]): Lowercase usernames of the subreddit
+            moderators
+
+    Returns:
+        bool: True if comment is removed, else False
+    """
+    if comment.author is None:  # deleted
+        return False
+    if getattr(comment, "approved", False):
+        return False
+    if comment.author.name.lower() in moderators:
+        return False
+    return remove_spam_comment(comment)
+
+
+def main() -> None:
+    """Remove new comments that link to spam
+    """
+    logs.setup()
+    logger.info("Collect spam comments")
+
+    # either datascience_bot_dev for testing, or datascience for production
+    SUBREDDIT_NAME = os.getenv("SUBREDDIT_NAME")
+
+    reddit = get_datascience_bot()
+    subreddit = reddit.subreddit(display_name=SUBREDDIT_NAME)
+    check_modlog(subreddit)  # drop cached moderators if the mod list changed
+    moderators = get_moderators(subreddit)
+
+    # page back through the newest comments until we reach the last comment
+    # we processed
+    cursor_name = f"{SUBREDDIT_NAME}.comments"
+    cursor = read_cursor(cursor_name)
+    if cursor is None:
+        logger.info(f"No cursor found; checking {FIRST_RUN_LIMIT} newest comments")
+        listing = subreddit.comments(limit=FIRST_RUN_LIMIT)
+    else:
+        listing = subreddit.comments(limit=None)
+    comments = list(iter_since(listing, cursor))
+
+    # scanning is cheap and removals are rare, so comments are moderated in
+    # order, oldest first, and the cursor is written once at the end, even
+    # when a comment fails and the task with it
+    count_spam_comments = 0
+    last = None
+    try:
+        for comment in reversed(comments):
+            if moderate_comment(comment, moderators):
+                count_spam_comments += 1
+            last = comment
+    finally:
+        if last is not None:
+            write_cursor(cursor_name, last)
+
+    logger.info(
+        f"Checked {len(comments)} comments and removed {count_spam_comments} "
+        "linking to spam"
+    )
+
+
+if __name__ == "__main__":
+    SUBREDDIT_NAME = os.getenv("SUBREDDIT_NAME")
+    if SUBREDDIT_NAME != "datascience_bot_dev":
+        raise Exception("Test only against r/datascience_bot_dev!")
+
+    main()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Moderate submissions waiting in the modqueue and reports
+
+Reported and filtered submissions land in the modqueue, which we page
+through along with the reports a batch at a time, applying the same rules as
+to new submissions. Submissions the rules leave alone stay in the queue for
+a human moderator, and are remembered so later runs don't check them again.
+
+If a run stops early, e.g. because AWS Lambda is about to time out, the
+cursor keeps the last page we finished, and the next run resumes after it.
+"""
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+import praw
+
+from datascience_bot import get_datascience_bot, logs
+from datascience_bot.cache import TTLCache
+from datascience_bot.executor import ActionExecutor
+from datascience_bot.moderators import check_modlog
+from datascience_bot.remove_trolls import AUTHOR_CACHE
+from datascience_bot.rules import evaluate
+from datascience_bot.state import read_state, write_state
+
+
+logger = logging.getLogger(__name__)
+
+
+# listings to work through, by name of their SubredditModeration method
+QUEUES = ("modqueue", "reports")
+# items to moderate at once; one page of a listing
+BATCH_SIZE = 100
+# seconds to keep in reserve before the deadline
+DEADLINE_MARGIN = 30
+
+# submissions we checked and left in the queue, by fullname
+SEEN = TTLCache(
+    maxsize=int(os.getenv("MODQUEUE_SEEN_SIZE", 10000)),
+    ttl=float(os.getenv("MODQUEUE_SEEN_TTL", 7 * 24 * 60 * 60)),
+    state_name="modqueue-seen.json",
+)
+
+
+def moderate_queue(
+    reddit: praw.models.reddit,
+    subreddit: praw.models.Subreddit,
+    queue: str,
+    deadline: Optional[float] = None,
+) -> Dict[str, int]:
+    """Page through a mod listing and apply the rules to each new submission
+
+    Only one page of items is held at a time. Submissions we remove drop out
+    of the listing, so each page starts after the last submission of the
+    previous page that's still in the queue, and the cursor keeps it.
+
+    Args:
+        reddit (praw.models.reddit): reddit instance to act with
+        subreddit (praw.models.Subreddit): Subreddit to moderate
+        queue (str): One of QUEUES
+        deadline (Optional[float]): Unix time by which to stop
+
+    Returns:
+        Dict[str, int]: Count of "checked", "handled" and "skipped"
+            submissions, and "complete" 1 if we reached the end of the queue
+    """
+    cursor_name = f"{subreddit.display_name}.{queue}.cursor"
+    after = (read_state(cursor_name) or {}).get("after")
+    if after:
+        logger.info(f"Resume {queue} after {after}")
+
+    counts = {"checked": 0, "handled": 0, "skipped": 0, "complete": 0}
+    paged = set()  # fullnames this pass has paged through
+
+    with ActionExecutor(reddit) as executor:
+        while True:
+            if deadline is not None and time.time() > deadline - DEADLINE_MARGIN:
+                logger.warning(f"Stop {queue} before the deadline")
+                return counts
+
+            page = list(
+                getattr(subreddit.mod, queue)(
+                    only="submissions",
+                    limit=BATCH_SIZE,
+                    params={"after": after} if after else {},
+                )
+            )
+            # an empty page is the end of the queue, or the cursor's
+            # submission left the queue; either way, start over next run
+            if not page or paged.issuperset(item.fullname for item in page):
+                break
+            paged.update(item.fullname for item in page)
+
+            new = [item for item in page if item.fullname not in SEEN]
+            counts["skipped"] += len(page) - len(new)
+            futures = [executor.submit(item, evaluate) for item in new]
+            handled = set()
+            for item, future in zip(new, futures):
+                try:
+                    if future.result():
+                        handled.add(item.fullname)
+                        counts["handled"] += 1
+                    else:
+                        SEEN.set(item.fullname, True)
+                    counts["checked"] += 1
+                except Exception:
+                    # not seen, so the next pass checks it again
+                    logger.exception(f"Failed to moderate {item.fullname}")
+
+            remaining = [item for item in page if item.fullname not in handled]
+            if remaining:
+                after = remaining[-1].fullname
+                write_state(cursor_name, {"after": after})
+
+    write_state(cursor_name, {})
+    counts["complete"] = 1
+    return counts
+
+
+def main(deadline: Optional[float] = None) -> Dict[str, Dict[str, int]]:
+    """Moderate the modqueue and reports
+
+    Args:
+        deadline (Optional[float]): Unix time by which the task must be done,
+            e.g. when AWS Lambda times out
+
+    Returns:
+        Dict[str, Dict[str, int]]: Counts of each queue, as returned by
+            `moderate_queue`
+    """
+    logs.setup()
+    logger.info("Moderate the modqueue")
+
+    # either datascience_bot_dev for testing, or datascience for production
+    SUBREDDIT_NAME = os.getenv("SUBREDDIT_NAME")
+
+    reddit = get_datascience_bot()
+    subreddit = reddit.subreddit(display_name=SUBREDDIT_NAME)
+    check_modlog(subreddit)  # drop cached moderators if the mod list changed
+
+    summary = {}
+    try:
+        for queue in QUEUES:
+            summary[queue] = moderate_queue(reddit, subreddit, queue, deadline)
+            logger.info(f"Moderated {queue}: {summary[queue]}")
+    finally:
+        SEEN.save()
+        AUTHOR_CACHE.save()
+
+    return summary
+
+
+if __name__ == "__main__":
+    SUBREDDIT_NAME = os.getenv("SUBREDDIT_NAME")
+    if SUBREDDIT_NAME != "datascience_bot_dev":
+        raise Exception("Test only against r/datascience_bot_dev!")
+
+    main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Moderate new submissions as they stream in
+
+Unlike moderate_submissions, which runs on a schedule, this is a long running
+process. Run one or the other; both share the same r/new cursor.
+"""
+import logging
+import os
+import time
+
+import praw
+import prawcore
+
+from datascience_bot import get_datascience_bot, logs
+from datascience_bot.cli import moderate_submissions
+from datascience_bot.cursor import read_cursor, write_cursor
+from datascience_bot.remove_trolls import AUTHOR_CACHE
+
+
+logger = logging.getLogger(__name__)
+
+
+# seconds to wait before reconnecting; doubles after every failed attempt
+MIN_BACKOFF = 1
+MAX_BACKOFF = 5 * 60
+
+# seconds between saves of the author cache while streaming
+AUTHOR_CACHE_SAVE_INTERVAL = 5 * 60
+
+
+def stream_submissions(subreddit: praw.models.Subreddit, cursor_name: str) -> None:
+    """Moderate submissions from the subreddit stream until it fails
+
+    The stream starts with the 100 newest submissions. When there is a cursor,
+    we drop the submissions it has already seen, so a reconnect doesn't miss
+    or repeat submissions. Otherwise, we skip them like a fresh start.
+
+    Submissions are moderated like moderate_submissions does, so the ledger
+    keeps its catch-up runs from moderating them again. A submission we fail
+    to moderate, e.g. when reddit rate limits a reply, is logged and passed
+    over. Only connection errors end the stream. The author cache is saved
+    every AUTHOR_CACHE_SAVE_INTERVAL seconds and when the stream ends.
+
+    Args:
+        subreddit (praw.models.Subreddit): Subreddit to moderate
+        cursor_name (str): Name of the cursor to resume from and advance
+    """
+    cursor = read_cursor(cursor_name)
+    # fullnames processed at the cursor's created_utc
+    seen = set() if cursor is None else {cursor["fullname"]}
+
+    saved_at = time.monotonic()
+    stream = subreddit.stream.submissions(skip_existing=cursor is None)
+    try:
+        for submission in stream:
+            if submission.fullname in seen:
+                continue
+            if cursor is not None and submission.created_utc < cursor["created_utc"]:
+                continue
+
+            logger.debug(f"Moderate submission {submission.id}")
+            try:
+                moderate_submissions.moderate_submission(submission)
+            except prawcore.exceptions.PrawcoreException:
+                raise  # reconnect
+            except Exception:
+                logger.exception(
+                    f"Failed to moderate submission {submission.id}",
+                    extra={"submission_id": submission.id},
+                )
+
+            write_cursor(cursor_name, submission)
+            if cursor is None or submission.created_utc > cursor["created_utc"]:
+                seen.clear()
+            seen.add(submission.fullname)
+            cursor = {
+                "fullname": submission.fullname,
+                "created_utc": submission.created_utc,
+            }
+
+            if time.monotonic() - saved_at >= AUTHOR_CACHE_SAVE_INTERVAL:
+                AUTHOR_CACHE.save()
+                saved_at = time.monotonic()
+    finally:
+        AUTHOR_CACHE.save()
+
+
+def main() -> None:
+    """Moderate new submissions as they're posted, reconnecting on failure
+    """
+    logs.setup()
+    logger.info("Enter moderate_stream.main")
+
+    # either datascience_bot_dev for testing, or datascience for production
+    SUBREDDIT_NAME = os.getenv("SUBREDDIT_NAME")
+
+    reddit = get_datascience_bot()
+    subreddit = reddit.subreddit(display_name=SUBREDDIT_NAME)
+    cursor_name = f"{SUBREDDIT_NAME}.new"
+
+    backoff = MIN_BACKOFF
+    while True:
+        connected_at = time.monotonic()
+        try:
+            # catch up on everything posted while we weren't listening
+            moderate_submissions.main()
+
+            logger.info(f"Stream new submissions to r/{SUBREDDIT_NAME}")
+            stream_submissions(subreddit, cursor_name)
+        except prawcore.exceptions.PrawcoreException as err:
+            if time.monotonic() - connected_at > MAX_BACKOFF:
+                backoff = MIN_BACKOFF  # the last connection was healthy
+            logger.warning(f"Lost the stream ({err!r}); reconnect in {backoff}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+
+if __name__ == "__main__":
+    SUBREDDIT_NAME = os.getenv("SUBREDDIT_NAME")
+    if SUBREDDIT_NAME != "datascience_bot_dev":
+        raise Exception("Test only against r/datascience_bot_dev!")
+
+    main()
@@ -4,28 +4,52 @@
 from datetime import datetime, timedelta
 import logging
 import os
-import sys
 from typing import Coroutine
 
 import praw
 
-from datascience_bot import get_datascience_bot
-from datascience_bot.remove_spam import remove_spam_submission
-from datascience_bot.remove_trolls import remove_troll_submission
+from datascience_bot import get_datascience_bot, ledger, logs
+from datascience_bot.cursor import iter_since, read_cursor, write_cursor
+from datascience_bot.executor import ActionExecutor
+from datascience_bot.moderators import check_modlog
+from datascience_bot.remove_trolls import AUTHOR_CACHE
+from datascience_bot.reposts import REPOST_INDEX, fill_repost_index, report_repost
+from datascience_bot.rules import evaluate
 
 
-# config logger
 logger = logging.getLogger(__name__)
-handler = logging.StreamHandler(sys.stdout)
-handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter("%(asctime)s UTC | %(levelname)s | %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+
+
+# how many of the newest submissions to check when there is no cursor yet
+FIRST_RUN_LIMIT = 5
+
+
+def moderate_submission(submission: praw.models.Submission) -> bool:
+    """Apply the rules to a submission, and check it for reposts if they leave
+    it up
+
+    Completion is recorded in the ledger, so a submission moderated in a run
+    that failed on another submission isn't moderated again next run.
+
+    Args:
+        submission (praw.models.Submission): Submission to moderate
+
+    Returns:
+        bool: True if a rule or the repost check handled the submission
+    """
+
+    def moderate() -> bool:
+        if evaluate(submission):
+            return True
+        return report_repost(submission)
+
+    return ledger.LEDGER.run(submission.fullname, "moderate", moderate)
 
 
 def main() -> None:
     """Remove submissions that link to spam
     """
+    logs.setup()
     logger.info("Collect spam submissions")
 
     # either datascience_bot_dev for testing, or datascience for production
@@ -33,15 +57,51 @@ def main() -> None:
 
     reddit = get_datascience_bot()
     subreddit = reddit.subreddit(display_name=SUBREDDIT_NAME)
+    check_modlog(subreddit)  # drop cached moderators if the mod list changed
 
+    # page back through r/new until we reach the last submission we processed
+    cursor_name = f"{SUBREDDIT_NAME}.new"
+    cursor = read_cursor(cursor_name)
+    if cursor is None:
+        logger.info(f"No cursor found; checking {FIRST_RUN_LIMIT} newest submissions")
+        listing = subreddit.new(limit=FIRST_RUN_LIMIT)
+    else:
+        listing = subreddit.new(limit=None)
+    submissions = list(iter_since(listing, cursor))
+
+    # reposts are found among the submissions we've indexed; after a cold
+    # start, index the recent submissions we're not about to check
+    REPOST_INDEX.prune()
+    if not REPOST_INDEX:
+        count = fill_repost_index(subreddit.new(limit=None), exclude=submissions)
+        logger.info(f"Indexed {count} recent submissions to find reposts")
+
+    # moderate submissions concurrently, but only advance the cursor past
+    # submissions that were moderated along with all older submissions. The
+    # ones moderated after a failure are skipped next run by the ledger.
     count_spam_submissions = 0
-    for submission in subreddit.new(limit=5):
-        count_spam_submissions += 1
-        # remove_*_submission functions return true if submission is removed
-        if remove_spam_submission(submission):
-            continue
-        if remove_troll_submission(submission):
-            continue
+    failed = False
+    with ActionExecutor(reddit) as executor:
+        futures = [
+            executor.submit(submission, moderate_submission)
+            for submission in reversed(submissions)  # oldest first
+        ]
+        for submission, future in zip(reversed(submissions), futures):
+            try:
+                future.result()
+            except Exception:
+                logger.exception(
+                    f"Failed to moderate submission {submission.id}",
+                    extra={"submission_id": submission.id},
+                )
+                failed = True  # retry it next run
+                continue
+            count_spam_submissions += 1
+            if not failed:
+                write_cursor(cursor_name, submission)
+
+    AUTHOR_CACHE.save()
+    logger.debug(f"Author cache stats: {AUTHOR_CACHE.stats()}")
 
     logger.info(
         f"Successfully collected all ({count_spam_submissions}) spam submissions"
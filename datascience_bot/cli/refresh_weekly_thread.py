@@ -5,26 +5,41 @@ u/datascience-bot.
 from datetime import datetime, timedelta
 import logging
 import os
-import sys
+import re
+import threading
 import time
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import praw
 
-from datascience_bot import get_datascience_bot, add_boilerplate
+from datascience_bot import get_datascience_bot, add_boilerplate, ledger, logs
+from datascience_bot import ratelimit
+from datascience_bot.executor import ActionExecutor
 
-# config logger
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-handler = logging.StreamHandler(sys.stdout)
-handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter("%(asctime)s UTC | %(levelname)s | %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
 
 
 SUBREDDIT_NAME = os.getenv("SUBREDDIT_NAME")
 
+# seconds to wait for reddit to serve the new weekly thread
+READY_TIMEOUT = 30
+# seconds between readiness checks; grows by READY_BACKOFF after every check
+READY_INTERVAL = 0.5
+READY_BACKOFF = 1.5
+# seconds to keep in reserve before the deadline for the rest of the task
+DEADLINE_MARGIN = 30
+# max "load more comments" links to expand in the old weekly thread
+REPLACE_MORE_LIMIT = 64
+# max replies to post at once
+REPLY_WORKERS = 4
+# times to retry a reply after reddit rate limits our comments
+REPLY_RETRIES = 3
+# seconds to wait when reddit rate limits a reply without saying how long
+RATELIMIT_WAIT = 60
+
+# how long reddit asks us to wait, e.g. "Take a break for 5 minutes"
+RATELIMIT_PATTERN = re.compile(r"(\d+) (millisecond|second|minute)s?")
+
 
 class MissingSubmissionError(Exception):
     """When we can't find a particular submission."""
@@ -34,6 +49,82 @@ class InvalidTaskError(Exception):
     """When the task is invalid for on reason or another"""
 
 
+class ReplyThrottle:
+    """Hold back replies while reddit rate limits our comments
+
+    Reddit rejects comments it thinks come too fast with a RATELIMIT error
+    that says how long to wait. All workers then wait until that time has
+    passed and retry, rather than each running into the limit again.
+    """
+
+    def __init__(self, deadline: Optional[float] = None, retries: int = REPLY_RETRIES):
+        """
+        Args:
+            deadline (Optional[float]): Unix time by which the task must be
+                done. A reply that would have to wait past it fails instead.
+            retries (int): Times to retry a rate limited reply
+        """
+        self.deadline = deadline
+        self.retries = retries
+        self._lock = threading.Lock()
+        self._allowed_at = 0.0
+
+    @staticmethod
+    def wait_seconds(message: str) -> float:
+        """Get how many seconds a RATELIMIT error asks us to wait
+
+        Args:
+            message (str): Message of the error
+
+        Returns:
+            float: Seconds to wait
+        """
+        match = RATELIMIT_PATTERN.search(message or "")
+        if match is None:
+            return RATELIMIT_WAIT
+        count, unit = int(match.group(1)), match.group(2)
+        return count * {"millisecond": 0.001, "second": 1, "minute": 60}[unit]
+
+    def reply(self, comment: praw.models.Comment, body: str) -> praw.models.Comment:
+        """Reply to a comment once, waiting out reddit's rate limit
+
+        Args:
+            comment (praw.models.Comment): Comment to reply to
+            body (str): Markdown of the reply
+
+        Returns:
+            praw.models.Comment: The reply, as returned by `ledger.reply`
+
+        Raises:
+            praw.exceptions.APIException: When reddit still rate limits us
+                after all retries, or the wait would pass the deadline
+        """
+        for attempt in range(self.retries + 1):
+            with self._lock:
+                wait = self._allowed_at - time.time()
+            if wait > 0:
+                time.sleep(wait)
+
+            try:
+                return ledger.reply(comment, body)
+            except praw.exceptions.APIException as err:
+                if err.error_type != "RATELIMIT" or attempt == self.retries:
+                    raise
+                with self._lock:
+                    self._allowed_at = max(
+                        self._allowed_at,
+                        time.time() + self.wait_seconds(err.message) + 1,
+                    )
+                    allowed_at = self._allowed_at
+                if self.deadline is not None and allowed_at > self.deadline:
+                    raise
+                logger.warning(
+                    f"Reddit rate limits our replies; retry the reply to "
+                    f"comment {comment.id} in {allowed_at - time.time():.0f}s",
+                    extra={"comment_id": comment.id, "action": "reply"},
+                )
+
+
 def get_weekly_thread(
     reddit: praw.models.reddit.subreddit
 ) -> praw.models.reddit.submission:
@@ -110,7 +201,24 @@ def validate_task(reddit: praw.models.reddit) -> None:
             raise InvalidTaskError(msg)
 
 
-def post_weekly_thread(reddit: praw.models.reddit) -> praw.models.Submission:
+def weekly_thread_title() -> str:
+    """Get the title of this week's thread
+
+    Returns:
+        str: Title with the dates of this week
+    """
+    # e.g. Weekly Entering & Transitioning Thread | 15 Sep 2019 - 22 Sep 2019
+    now = datetime.utcnow()
+    return (
+        "Weekly Entering & Transitioning Thread | "
+        f"{now.strftime('%d %b %Y')} - "
+        f"{(now + timedelta(days=7)).strftime('%d %b %Y')}"
+    ).strip()
+
+
+def post_weekly_thread(
+    reddit: praw.models.reddit, title: Optional[str] = None
+) -> praw.models.Submission:
     """Post the weekly thread with required attributes
 
     `post_weekly_thread` does three things:
@@ -118,8 +226,13 @@ def post_weekly_thread(reddit: praw.models.reddit) -> praw.models.Submission:
         2. Post the submission
         3. Distinguish, sticky, flair, etc.
 
+    Each step after the first goes through the ledger, so a retried task
+    picks up the thread it already posted this week.
+
     Args:
         reddit (praw.models.reddit): which reddit to post weekly thread
+        title (Optional[str]): Title of the thread. Defaults to
+            `weekly_thread_title()`.
 
     Return:
         praw.models.Submission: New weekly thread
@@ -127,12 +240,7 @@ def post_weekly_thread(reddit: praw.models.reddit) -> praw.models.Submission:
     logger.info("Post weekly entering & transitioning thread")
 
     ## 1. Create the submission title and selftext
-    # e.g. Weekly Entering & Transitioning Thread | 15 Sep 2019 - 22 Sep 2019
-    title = (
-        "Weekly Entering & Transitioning Thread | "
-        f"{datetime.utcnow().strftime('%d %b %Y')} - "
-        f"{(datetime.utcnow() + timedelta(days=7)).strftime('%d %b %Y')}"
-    ).strip()
+    title = title or weekly_thread_title()
 
     # Long URLs we'll use to format the selftext
     faq = "[FAQ](https://www.reddit.com/r/datascience/wiki/frequently-asked-questions)"
@@ -156,28 +264,102 @@ def post_weekly_thread(reddit: praw.models.reddit) -> praw.models.Submission:
     )
 
     ## 2. Post the submission
-    submission = reddit.subreddit(SUBREDDIT_NAME).submit(
-        title=title, selftext=selftext, send_replies=False
+    submission = ledger.submit(
+        reddit.subreddit(SUBREDDIT_NAME),
+        title=title,
+        selftext=selftext,
+        send_replies=False,
     )
 
     ## 3. Distinguish, sticky, flair, etc.
-    submission.mod.flair(text="Discussion")
-    submission.mod.approve()
-    submission.mod.distinguish()
-    submission.mod.sticky(state=True, bottom=True)
+    for action, func in [
+        ("flair", lambda: submission.mod.flair(text="Discussion")),
+        ("approve", submission.mod.approve),
+        ("distinguish", submission.mod.distinguish),
+        ("sticky", lambda: submission.mod.sticky(state=True, bottom=True)),
+    ]:
+        ledger.LEDGER.run(submission.fullname, action, func)
 
     return submission
 
 
+def wait_for_weekly_thread(
+    reddit: praw.models.reddit, submission: praw.models.Submission, timeout: float
+) -> bool:
+    """Wait until reddit serves the new weekly thread as stickied
+
+    Reddit doesn't serve a new submission everywhere right away. Rather than
+    sleep for a fixed time, poll the /api/info endpoint, which isn't cached,
+    at short, growing intervals.
+
+    Args:
+        reddit (praw.models.reddit): reddit instance to poll with
+        submission (praw.models.Submission): The new weekly thread
+        timeout (float): Max seconds to wait
+
+    Returns:
+        bool: True if the weekly thread is ready. False if we timed out.
+    """
+    started_at = time.monotonic()
+    interval = READY_INTERVAL
+    while True:
+        for thread in reddit.info([submission.fullname]):
+            if thread.stickied:
+                logger.debug(
+                    f"Weekly thread {submission.id} ready after "
+                    f"{time.monotonic() - started_at:.1f}s"
+                )
+                return True
+
+        remaining = timeout - (time.monotonic() - started_at)
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval *= READY_BACKOFF
+
+
+def find_unanswered_comments(
+    submission: praw.models.Submission,
+) -> List[praw.models.Comment]:
+    """Find top-level comments without replies
+
+    The comment tree is expanded once, up to REPLACE_MORE_LIMIT "load more
+    comments" links, and then checked in a single pass.
+
+    Args:
+        submission (praw.models.Submission): Submission to search
+
+    Returns:
+        List[praw.models.Comment]: Top-level comments without replies
+    """
+    submission.comments.replace_more(limit=REPLACE_MORE_LIMIT)
+
+    # an unexpanded "load more comments" link still means there are replies
+    answered = {comment.parent_id for comment in submission.comments.list()}
+    return [
+        comment
+        for comment in submission.comments
+        if isinstance(comment, praw.models.Comment) and comment.fullname not in answered
+    ]
+
+
 def direct_unanswered_comments_to_weekly_thread(
-    reddit: praw.models.reddit, old_thread_id: str, new_thread_id: str
+    reddit: praw.models.reddit,
+    old_thread_id: str,
+    new_thread_id: str,
+    deadline: Optional[float] = None,
 ) -> None:
     """Direct unanswered comments in last weekly thread to the new weekly thread
 
+    Replies go through the ledger, so a retried task picks up where the last
+    attempt stopped without replying twice. When reddit rate limits the
+    replies, they wait and retry.
+
     Args:
         reddit (praw.models.reddit): Reddit account to comment with
         old_thread_id (str)
         new_thread_id (str)
+        deadline (Optional[float]): Unix time by which the task must be done
     """
     old_thread = reddit.submission(id=old_thread_id)
     new_thread = reddit.submission(id=new_thread_id)
@@ -189,15 +371,40 @@ def direct_unanswered_comments_to_weekly_thread(
         "thread."
     )
 
-    for comment in old_thread.comments:
-        if len(comment.replies) == 0:
-            reply = comment.reply(msg)
-            reply.mod.distinguish(how="yes")
+    throttle = ReplyThrottle(deadline)
 
+    def notify(comment: praw.models.Comment) -> bool:
+        # these replies aren't urgent, so queue their distinguish behind
+        # moderation of new submissions
+        with ratelimit.priority(ratelimit.Priority.REPLY):
+            reply = throttle.reply(comment, msg)
+            ledger.distinguish(reply)
+        return True
 
-def main(validate: bool = True):
+    # comments we replied to in an earlier attempt may still look unanswered
+    # while reddit catches up, but the ledger skips their replies
+    comments = find_unanswered_comments(old_thread)
+    logger.info(f"Direct {len(comments)} unanswered comments to the new thread")
+
+    with ActionExecutor(reddit, max_workers=REPLY_WORKERS) as executor:
+        futures = [executor.submit(comment, notify) for comment in comments]
+
+    errors = [future.exception() for future in futures if future.exception()]
+    for err in errors:
+        logger.error(f"Failed to direct a comment to the new thread: {err!r}")
+    if errors:
+        raise errors[0]  # a retry resumes from the ledger
+
+
+def main(validate: bool = True, deadline: Optional[float] = None):
     """Refresh the weekly thread
+
+    Args:
+        validate (bool): Whether to validate it's the right time for the task
+        deadline (Optional[float]): Unix time by which the task must be done,
+            e.g. when AWS Lambda times out
     """
+    logs.setup()
     logger.info("Enter post_weekly_thread.main.py")
 
     # either datascience_bot_dev for testing, or datascience for production
@@ -206,27 +413,45 @@ def main(validate: bool = True):
     subreddit = reddit.subreddit(display_name=SUBREDDIT_NAME)
     logger.info(f"Acting on subreddit: {subreddit.display_name}")
 
-    if validate:
+    # the old thread is recorded before anything changes. Once the new thread
+    # is stickied, searching for the weekly thread finds the new one, so a
+    # retry reads the old one from the ledger and skips validation.
+    title = weekly_thread_title()
+    target = f"r/{subreddit.display_name}"
+    action = f"old_thread:{title}"
+    if ledger.LEDGER.get(target, action) is not None:
+        logger.info("Resume this week's refresh of the weekly thread")
+    elif validate:
         logger.debug("Validating task")
         validate_task(reddit)  # raises error if not valid
 
     logger.debug("Unsticky the last weekly thread")
-    old_thread = get_weekly_thread(reddit)
-    old_thread.mod.sticky(state=False)
+    old_thread_id = ledger.LEDGER.run(
+        target, action, lambda: get_weekly_thread(reddit).id
+    )
+    old_thread = reddit.submission(id=old_thread_id)
+    ledger.LEDGER.run(
+        old_thread.fullname, "unsticky", lambda: old_thread.mod.sticky(state=False)
+    )
 
     logger.debug("Post the new weekly thread")
-    new_thread = post_weekly_thread(reddit)
-
-    # PRAW will not request pages more than once every 30 seconds. If you try,
-    # it returns the cached version. Our cached version of page (created in
-    # conf.py) doesn't have the new weekly thread we're creating for these
-    # tests.
-    # https://praw.readthedocs.io/en/v3.6.0/pages/faq.html#i-made-a-change-but-it-doesn-t-seem-to-have-an-effect
-    time.sleep(30)
+    new_thread = post_weekly_thread(reddit, title=title)
+
+    timeout = READY_TIMEOUT
+    if deadline is not None:
+        timeout = max(0, min(timeout, deadline - time.time() - DEADLINE_MARGIN))
+    if not wait_for_weekly_thread(reddit, new_thread, timeout=timeout):
+        logger.warning(
+            f"Weekly thread {new_thread.id} is not ready after {timeout:.0f}s; "
+            "continue anyway"
+        )
 
     logger.debug("Directed unanswered comments to the new weekly thread")
     direct_unanswered_comments_to_weekly_thread(
-        reddit, old_thread_id=old_thread.id, new_thread_id=new_thread.id
+        reddit,
+        old_thread_id=old_thread.id,
+        new_thread_id=new_thread.id,
+        deadline=deadline,
     )
 
 
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Replay moderation policies over a dump of submissions
+
+Prints what each policy would do with every submission as JSON lines, then a
+summary of the decisions and how they differ between policies. Nothing is
+fetched from or sent to reddit.
+
+    replay-policy submissions.jsonl --authors authors.jsonl \\
+        --policy proposed.json --diff-only > changes.jsonl
+
+A policy file is JSON with any of "name", "spam_karma", "min_karma",
+"domains", "keywords" and "moderators". The current policy is always replayed
+first. Policies without "moderators" exempt the moderators in the state cache.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+from datascience_bot import logs
+from datascience_bot.replay import Policy, Report, replay
+
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> dict:
+    """Replay policies over a dump
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        dict: Summary of the replay, as returned by `Report.summary`
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dump", help="JSONL or SQLite dump of submissions")
+    parser.add_argument("--authors", help="JSONL or SQLite dump of authors")
+    parser.add_argument(
+        "--policy",
+        action="append",
+        default=[],
+        help="JSON policy file to compare against the current policy",
+    )
+    parser.add_argument(
+        "--workers", type=int, help="worker processes; 0 runs in this process"
+    )
+    parser.add_argument(
+        "--diff-only",
+        action="store_true",
+        help="only print submissions the policies disagree about",
+    )
+    parser.add_argument("--output", help="write decisions here instead of stdout")
+    args = parser.parse_args(argv)
+    logs.setup(stream=sys.stderr)  # stdout carries the decisions
+
+    policies = [Policy()] + [Policy.from_file(path) for path in args.policy]
+    report = Report(policies)
+    started_at = time.monotonic()
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for decision in replay(
+            args.dump, policies, authors_path=args.authors, workers=args.workers
+        ):
+            changed = report.add(decision)
+            if changed or not args.diff_only:
+                output.write(json.dumps(decision) + "\n")
+    finally:
+        if args.output:
+            output.close()
+
+    summary = report.summary()
+    seconds = time.monotonic() - started_at
+    logger.info(
+        f"Replayed {summary['records']} submissions in {seconds:.1f}s "
+        f"({summary['records'] / max(seconds, 1e-9):,.0f}/s)"
+    )
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
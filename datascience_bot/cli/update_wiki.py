@@ -1,41 +1,105 @@
 # -*- coding: utf-8 -*-
 """Update the wiki with data from datascience_bot/wiki/ dir
 """
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import logging
 import os
-import pathlib
-import sys
+import time
+from typing import Dict
 
 import praw
+import prawcore
 
 from datascience_bot import get_datascience_bot, add_boilerplate, __version__
+from datascience_bot import logs, wiki
 
 
-# config logger
 logger = logging.getLogger(__name__)
-handler = logging.StreamHandler(sys.stdout)
-handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter("%(asctime)s UTC | %(levelname)s | %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
 
 
 SUBREDDIT_NAME = os.getenv("SUBREDDIT_NAME")
 
 
-def main():
+# max wiki pages to deploy at once
+MAX_WORKERS = 4
+
+
+def content_hash(content: str) -> str:
+    """Hash wiki content the way reddit stores it
+
+    Reddit strips trailing whitespace and may return CRLF line endings, so we
+    normalize both before hashing.
+
+    Args:
+        content (str): Markdown content of a wiki page
+
+    Returns:
+        str: SHA-256 hex digest of the normalized content
+    """
+    normalized = content.replace("\r\n", "\n").strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def deploy_page(subreddit: praw.models.Subreddit, page_name: str) -> str:
+    """Deploy a local markdown file to the wiki page of the same name
+
+    Args:
+        subreddit (praw.models.Subreddit): Subreddit whose wiki to update
+        page_name (str): Name of the page in datascience_bot/wiki/
+
+    Returns:
+        str: "updated" if the page was edited, or "skipped" if the live page
+            already has the same content
+    """
+    new_content = wiki.read_page(page_name)
+    wiki_page = subreddit.wiki[page_name]
+    try:
+        live_content = wiki_page.content_md
+    except prawcore.exceptions.NotFound:
+        live_content = ""  # the page doesn't exist yet
+
+    if content_hash(live_content) == content_hash(new_content):
+        return "skipped"
+
+    wiki_page.edit(content=new_content, reason=f"Deploy version {__version__}")
+    return "updated"
+
+
+def main() -> Dict[str, float]:
+    """Deploy changed wiki pages
+
+    Returns:
+        Dict[str, float]: Count of "skipped", "updated" and "failed" pages,
+            and total "seconds" it took
+    """
+    logs.setup()
+    started_at = time.monotonic()
     reddit = get_datascience_bot()
     subreddit = reddit.subreddit(SUBREDDIT_NAME)
 
-    local_dir = (pathlib.Path(__file__).parent / ".." / "wiki").resolve()
-    for f in local_dir.iterdir():
-        page_name = f.stem
-        if f.is_dir() or f.suffix != ".md":
-            continue
+    def timed_deploy(page_name: str) -> str:
+        page_started_at = time.monotonic()
+        try:
+            result = deploy_page(subreddit, page_name)
+        except Exception:
+            logger.exception(f"Failed to deploy wiki page {page_name}")
+            result = "failed"
+        logger.info(
+            f"Wiki page {page_name}: {result} in "
+            f"{time.monotonic() - page_started_at:.2f}s"
+        )
+        return result
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = list(executor.map(timed_deploy, wiki.list_pages()))
 
-        new_content = f.read_text()
-        wiki_page = subreddit.wiki[page_name]
-        wiki_page.edit(content=new_content, reason=f"Deploy version {__version__}")
+    summary = {
+        status: results.count(status) for status in ("skipped", "updated", "failed")
+    }
+    summary["seconds"] = round(time.monotonic() - started_at, 2)
+    logger.info(f"Deployed wiki: {summary}")
+    return summary
 
 
 if __name__ == "__main__":
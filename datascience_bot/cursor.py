@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Remember where we stopped reading a listing so the next run resumes there
+"""
+from typing import Dict, Iterable, Iterator, Optional
+
+from datascience_bot.state import read_state, write_state
+
+
+def read_cursor(name: str) -> Optional[Dict]:
+    """Read the last processed item of a listing
+
+    Args:
+        name (str): Name of the cursor, e.g. "datascience.new"
+
+    Returns:
+        Optional[Dict]: "fullname" and "created_utc" of the last processed
+            item, or None if the listing was never processed
+    """
+    cursor = read_state(f"{name}.cursor")
+    if not isinstance(cursor, dict) or "fullname" not in cursor:
+        return None
+    return cursor
+
+
+def write_cursor(name: str, thing) -> None:
+    """Mark the given thing as the last processed item of a listing
+
+    Args:
+        name (str): Name of the cursor, e.g. "datascience.new"
+        thing: A submission or comment from the listing
+    """
+    write_state(
+        f"{name}.cursor", {"fullname": thing.fullname, "created_utc": thing.created_utc}
+    )
+
+
+def iter_since(listing: Iterable, cursor: Optional[Dict]) -> Iterator:
+    """Yield items from a newest-first listing until we reach the cursor
+
+    The listing is consumed lazily, so PRAW only requests as many pages as
+    it takes to reach already processed items.
+
+    Args:
+        listing (Iterable): Newest-first listing, e.g. `subreddit.new()`
+        cursor (Optional[Dict]): As returned by `read_cursor`. If None,
+            the whole listing is yielded.
+
+    Yields:
+        Items newer than the cursor, newest first
+    """
+    for thing in listing:
+        if cursor is not None and (
+            thing.fullname == cursor["fullname"]
+            # the cursor item itself may have been deleted in the meantime
+            or thing.created_utc < cursor["created_utc"]
+        ):
+            return
+        yield thing
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Match URLs against categorized lists of domains
+"""
+import pathlib
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+
+# hosts in free text, e.g. "https://user@www.example.com/a", "www.example.com"
+# or "example.com". Every match must start at a word boundary that isn't part of
+# a host or an email address, so the scan stays linear in the length of the
+# text. Dots separate the labels and can't be matched by them, so there's
+# nothing to backtrack into.
+HOST_PATTERN = re.compile(
+    r"(?<![\w.@-])(?:[a-z][a-z0-9+.-]*://(?:[^\s/@]*@)?)?"
+    r"((?:[\w-]+\.)+[a-z]{2,})(?![\w-])",
+    re.IGNORECASE,
+)
+
+
+def normalize_domain(domain: str) -> str:
+    """Normalize a domain from a domain list, e.g. "*.WWW.Example.com."
+
+    Args:
+        domain (str): Domain to normalize
+
+    Returns:
+        str: Lowercase domain without wildcards, "www." or trailing dots
+    """
+    domain = domain.strip().lower().rstrip(".")
+    for prefix in ("*.", ".", "www."):
+        if domain.startswith(prefix):
+            domain = domain[len(prefix) :]
+    return domain
+
+
+def parse_host(url: str) -> Optional[str]:
+    """Get the normalized host of a URL
+
+    Args:
+        url (str): URL to parse. The scheme is optional.
+
+    Returns:
+        Optional[str]: Lowercase host without port or trailing dot, or None
+            if the URL has no host
+    """
+    if "//" not in url:
+        url = "//" + url
+    try:
+        host = urlsplit(url.strip()).hostname
+    except ValueError:  # e.g. invalid IPv6 literals
+        return None
+    if not host:
+        return None
+    return host.rstrip(".")
+
+
+def find_hosts(text: str) -> Iterator[str]:
+    """Find the hosts of all URLs in free text, e.g. a comment body
+
+    Bare domains like "example.com" count as URLs, because that's how
+    spammers write them to dodge link detection. Words that only look like
+    domains, e.g. "setup.py", are harmless: they don't match any domain list.
+
+    Args:
+        text (str): Text to scan
+
+    Yields:
+        str: Lowercase hosts in the order they appear
+    """
+    for match in HOST_PATTERN.finditer(text):
+        yield match.group(1).lower()
+
+
+def read_domain_list(path: Union[str, pathlib.Path]) -> List[str]:
+    """Read a domain list, one domain per line
+
+    Blank lines and # comments are skipped. Hosts file entries such as
+    "0.0.0.0 example.com" are supported, so community blocklists can be used
+    as they are.
+
+    Args:
+        path (Union[str, pathlib.Path]): Path to the domain list
+
+    Returns:
+        List[str]: Domains in the list
+    """
+    domains = []
+    for line in pathlib.Path(path).read_text().splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            domains.append(line.split()[-1])
+    return domains
+
+
+class DomainMatcher:
+    """Look up the category of a URL by its host
+
+    Domains are kept in a hash map, so a lookup costs one probe per label of
+    the host no matter how many domains are registered. A domain matches
+    itself and all of its subdomains, but not other domains that merely end
+    with the same characters, i.e. "medium.com" matches "blog.medium.com" but
+    not "notmedium.com". The most specific domain wins.
+    """
+
+    def __init__(self, categories: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Args:
+            categories (Optional[Dict[str, Iterable[str]]]): Map of category
+                name to the domains in that category
+        """
+        self._domains: Dict[str, str] = {}
+        for category, domains in (categories or {}).items():
+            self.add(category, domains)
+
+    def __len__(self) -> int:
+        return len(self._domains)
+
+    def __contains__(self, url: str) -> bool:
+        return self.match(url) is not None
+
+    def add(self, category: str, domains: Iterable[str]) -> None:
+        """Add domains to a category
+
+        Args:
+            category (str): Category of the domains, e.g. "video"
+            domains (Iterable[str]): Domains to add
+        """
+        for domain in domains:
+            domain = normalize_domain(domain)
+            if domain:
+                self._domains[domain] = category
+
+    def match_host(self, host: str) -> Optional[str]:
+        """Get the category of a normalized host
+
+        Args:
+            host (str): Host as returned by `parse_host`
+
+        Returns:
+            Optional[str]: Category of the most specific matching domain,
+                or None if the host doesn't match any domain
+        """
+        start = 0
+        while True:
+            category = self._domains.get(host[start:])
+            if category is not None:
+                return category
+            start = host.find(".", start) + 1
+            if start == 0:
+                return None
+
+    def match(self, url: str) -> Optional[str]:
+        """Get the category of a URL
+
+        Args:
+            url (str): URL to look up
+
+        Returns:
+            Optional[str]: Category of the most specific matching domain,
+                or None if the URL doesn't match any domain
+        """
+        host = parse_host(url)
+        if host is None:
+            return None
+        return self.match_host(host)
+
+    def search(self, text: str) -> Iterator[Tuple[str, str]]:
+        """Find URLs in free text that match a domain
+
+        The text is scanned once, lazily, so stop iterating at the first
+        match that matters.
+
+        Args:
+            text (str): Text to scan, e.g. a comment body
+
+        Yields:
+            Tuple[str, str]: Host and category of each matching URL
+        """
+        for host in find_hosts(text):
+            category = self.match_host(host)
+            if category is not None:
+                yield host, category
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Run moderation actions for independent items concurrently
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextvars
+import functools
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+import praw
+
+
+logger = logging.getLogger(__name__)
+
+
+# defaults for moderation runs
+MAX_WORKERS = int(os.getenv("MODERATION_WORKERS", 4))
+MAX_REQUESTS = int(os.getenv("MODERATION_MAX_REQUESTS", 0)) or None
+
+# the budget of the executor that owns the current worker thread
+_local = threading.local()
+_hook_lock = threading.Lock()
+
+
+class BudgetExhaustedError(Exception):
+    """When an action needs a request, but the request budget is spent"""
+
+
+class RequestBudget:
+    """Thread-safe count of how many more requests may be made"""
+
+    def __init__(self, limit: Optional[int] = None):
+        """
+        Args:
+            limit (Optional[int]): Max number of requests. If None, there is
+                no limit.
+        """
+        self.limit = limit
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> Optional[int]:
+        if self.limit is None:
+            return None
+        return max(self.limit - self.spent, 0)
+
+    def spend(self, count: int = 1) -> None:
+        """Spend part of the budget
+
+        Args:
+            count (int): Number of requests to spend
+
+        Raises:
+            BudgetExhaustedError: When there's not enough budget left
+        """
+        with self._lock:
+            if self.limit is not None and self.spent + count > self.limit:
+                raise BudgetExhaustedError(
+                    f"Request budget of {self.limit} requests is spent"
+                )
+            self.spent += count
+
+
+def _install_budget_hook(reddit: praw.models.reddit) -> None:
+    """Charge requests made by executor workers to their executor's budget
+
+    The hook is installed once per reddit instance, so executors that share
+    an instance don't step on each other.
+    """
+    with _hook_lock:
+        core = reddit._core
+        if getattr(core, "_has_budget_hook", False):
+            return
+
+        request = core.request
+
+        @functools.wraps(request)
+        def charged_request(*args, **kwargs):
+            budget = getattr(_local, "budget", None)
+            if budget is not None:
+                budget.spend()
+            return request(*args, **kwargs)
+
+        core.request = charged_request
+        core._has_budget_hook = True
+
+
+class ActionExecutor:
+    """Run chains of actions for independent items on a bounded thread pool
+
+    Each chain runs in a single worker, so the actions for one item keep
+    their order while chains for different items run concurrently. Every
+    request the actions make is charged to one `RequestBudget` shared by all
+    chains of the executor; once it's spent, requests raise
+    `BudgetExhaustedError` and the remaining chains fail without touching
+    reddit.
+
+    Use the executor as a context manager:
+
+        with ActionExecutor(reddit) as executor:
+            futures = [
+                executor.submit(submission, remove_spam_submission, ...)
+                for submission in submissions
+            ]
+    """
+
+    def __init__(
+        self,
+        reddit: praw.models.reddit,
+        max_workers: int = MAX_WORKERS,
+        max_requests: Optional[int] = MAX_REQUESTS,
+    ):
+        """
+        Args:
+            reddit (praw.models.reddit): reddit instance the actions use
+            max_workers (int): Max number of chains to run at once
+            max_requests (Optional[int]): Max number of requests the actions
+                may make. If None, there is no limit.
+        """
+        self.reddit = reddit
+        self.budget = RequestBudget(max_requests)
+        _install_budget_hook(reddit)
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="action",
+            initializer=self._init_worker,
+        )
+
+    def __enter__(self) -> "ActionExecutor":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._pool.shutdown(wait=True)
+
+    def _init_worker(self) -> None:
+        _local.budget = self.budget
+
+    def submit(self, item, *actions: Callable) -> Future:
+        """Run actions on the item in order until one returns True
+
+        Args:
+            item: The item to act on, e.g. a submission
+            *actions (Callable): Functions that take the item and return True
+                once the item is handled, e.g. remove_spam_submission
+
+        Returns:
+            Future: Resolves to True if an action handled the item. Else False.
+        """
+        # run in a copy of our context, so e.g. logs keep the name of the task
+        context = contextvars.copy_context()
+        return self._pool.submit(context.run, self._run_chain, item, actions)
+
+    def _run_chain(self, item, actions) -> bool:
+        for action in actions:
+            if action(item):
+                return True
+        return False
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""Count and time the requests a task makes to reddit
+
+`install` hooks two places in PRAW once per process:
+
+    * prawcore's `Requestor.request`, which makes every HTTP request,
+      including OAuth token requests and retries
+    * PRAW's `RedditBase.__getattr__`, which fetches a lazy object the first
+      time we read an attribute it doesn't have yet
+
+While a `record` block is active, both hooks report to its `Metrics`.
+"""
+from contextlib import contextmanager
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from praw.models.reddit.base import RedditBase
+from prawcore.requestor import Requestor
+
+
+# upper bounds of the latency histogram buckets in milliseconds, reported as
+# e.g. "le_250" like Prometheus histograms
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+# path segments followed by the name of a specific thing, and what to call it
+_PATH_PARAMS = {"comments": "id", "r": "subreddit", "user": "user", "wiki": "page"}
+_PATH_PARAM = re.compile(r"/({})/[^/]+".format("|".join(_PATH_PARAMS)))
+
+_install_lock = threading.Lock()
+_installed = False
+_active: Optional["Metrics"] = None
+
+
+def endpoint(method: str, url: str) -> str:
+    """Name the endpoint of a request, e.g. "GET /comments/{id}"
+
+    Args:
+        method (str): HTTP method
+        url (str): Requested URL
+
+    Returns:
+        str: Upper case method and the path with ids replaced
+    """
+    path = "/" + urlsplit(url).path.strip("/")
+    return f"{method.upper()} " + _PATH_PARAM.sub(
+        lambda match: f"/{match.group(1)}/{{{_PATH_PARAMS[match.group(1)]}}}", path
+    )
+
+
+class Metrics:
+    """Requests and lazy fetches made while recording
+
+    Args:
+        trace (bool): Whether to keep every request in `trace`
+    """
+
+    def __init__(self, trace: bool = False):
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.endpoints: Dict[str, Dict] = {}
+        self.ratelimit_remaining: Optional[float] = None
+        self.ratelimit_used: Optional[int] = None
+        self.lazy_fetches: Dict[str, int] = {}
+        self.trace: Optional[List[Dict]] = [] if trace else None
+
+    def record_request(
+        self, method: str, url: str, seconds: float, response=None
+    ) -> None:
+        """Record a finished request
+
+        Args:
+            method (str): HTTP method
+            url (str): Requested URL
+            seconds (float): How long the request took
+            response: `requests.Response`, or None if the request failed
+        """
+        name = endpoint(method, url)
+        milliseconds = seconds * 1000
+        status = None if response is None else response.status_code
+        remaining = None if response is None else _header(response, "remaining")
+        used = None if response is None else _header(response, "used")
+
+        with self._lock:
+            self.requests += 1
+            if status is None or status >= 400:
+                self.errors += 1
+
+            stats = self.endpoints.setdefault(
+                name,
+                {
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "histogram": [0] * len(LATENCY_BUCKETS),
+                },
+            )
+            stats["count"] += 1
+            stats["total_ms"] += milliseconds
+            stats["max_ms"] = max(stats["max_ms"], milliseconds)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if milliseconds <= bound:
+                    stats["histogram"][i] += 1
+                    break
+
+            # the least headroom we had during the task
+            if remaining is not None and (
+                self.ratelimit_remaining is None or remaining < self.ratelimit_remaining
+            ):
+                self.ratelimit_remaining = remaining
+            if used is not None:
+                self.ratelimit_used = max(self.ratelimit_used or 0, int(used))
+
+            if self.trace is not None:
+                self.trace.append(
+                    {
+                        "endpoint": name,
+                        "url": url,
+                        "status": status,
+                        "ms": round(milliseconds, 1),
+                        "ratelimit_remaining": remaining,
+                    }
+                )
+
+    def record_fetch(self, thing: RedditBase, attribute: str) -> None:
+        """Record that reading an attribute fetched a lazy object
+
+        Args:
+            thing (RedditBase): The lazy object, e.g. a Submission
+            attribute (str): The attribute that wasn't loaded yet
+        """
+        key = f"{type(thing).__name__}.{attribute}"
+        with self._lock:
+            self.lazy_fetches[key] = self.lazy_fetches.get(key, 0) + 1
+
+    def summary(self) -> Dict:
+        """Summarize the recorded metrics as JSON serializable data
+
+        Returns:
+            Dict: Totals, per-endpoint latency, rate limit headroom, lazy
+                fetches and, if enabled, the trace of every request
+        """
+        with self._lock:
+            endpoints = {
+                name: {
+                    "count": stats["count"],
+                    "mean_ms": round(stats["total_ms"] / stats["count"], 1),
+                    "max_ms": round(stats["max_ms"], 1),
+                    "histogram": dict(
+                        zip(
+                            [f"le_{bound:g}" for bound in LATENCY_BUCKETS],
+                            stats["histogram"],
+                        )
+                    ),
+                }
+                for name, stats in sorted(self.endpoints.items())
+            }
+            summary = {
+                "seconds": round(time.monotonic() - self._started_at, 3),
+                "requests": self.requests,
+                "errors": self.errors,
+                "request_ms": round(
+                    sum(stats["total_ms"] for stats in self.endpoints.values()), 1
+                ),
+                "endpoints": endpoints,
+                "ratelimit_remaining": self.ratelimit_remaining,
+                "ratelimit_used": self.ratelimit_used,
+                "lazy_fetches": sum(self.lazy_fetches.values()),
+                "lazy_fetches_by_attribute": dict(sorted(self.lazy_fetches.items())),
+            }
+            if self.trace is not None:
+                summary["trace"] = list(self.trace)
+        return summary
+
+
+def _header(response, name: str) -> Optional[float]:
+    value = response.headers.get(f"x-ratelimit-{name}")
+    try:
+        return None if value is None else float(value)
+    except ValueError:
+        return None
+
+
+def install() -> None:
+    """Hook PRAW's request path and lazy fetches, once per process"""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+
+        request = Requestor.request
+        getattr_ = RedditBase.__getattr__
+
+        def timed_request(self, method, url, *args, **kwargs):
+            metrics = _active
+            if metrics is None:
+                return request(self, method, url, *args, **kwargs)
+            started_at = time.monotonic()
+            response = None
+            try:
+                response = request(self, method, url, *args, **kwargs)
+                return response
+            finally:
+                metrics.record_request(
+                    method, url, time.monotonic() - started_at, response
+                )
+
+        def counted_getattr(self, attribute):
+            metrics = _active
+            if (
+                metrics is not None
+                and not attribute.startswith("_")
+                and not self._fetched
+            ):
+                metrics.record_fetch(self, attribute)
+            return getattr_(self, attribute)
+
+        Requestor.request = timed_request
+        RedditBase.__getattr__ = counted_getattr
+        _installed = True
+
+
+@contextmanager
+def record(trace: bool = False) -> Iterator[Metrics]:
+    """Record requests and lazy fetches made within the block
+
+    Only one block records at a time, which matches one task per AWS Lambda
+    invocation. Requests from any thread count toward it, so work done by
+    an `ActionExecutor` is included.
+
+    Args:
+        trace (bool): Whether to keep every request in the summary
+
+    Yields:
+        Metrics: The metrics being recorded
+    """
+    global _active
+    install()
+    metrics = Metrics(trace=trace)
+    previous, _active = _active, metrics
+    try:
+        yield metrics
+    finally:
+        _active = previous
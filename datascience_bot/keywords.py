@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""Find many keyword phrases in text in a single pass
+
+Checking each phrase with `phrase in text` costs a scan of the text per
+phrase. An Aho-Corasick automaton finds all of them in one scan instead, no
+matter how many phrases there are. Our automaton steps over words rather
+than characters, so phrases only match whole words, e.g. "free money" matches
+"FREE money!!" but not "carefree moneylender", and the scan takes one dict
+lookup per word.
+"""
+from collections import deque
+import pathlib
+import re
+import threading
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+
+# words of phrases and text; punctuation and whitespace separate words
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase words
+
+    Args:
+        text (str): Text to split
+
+    Returns:
+        List[str]: Words in the order they appear
+    """
+    return WORD_PATTERN.findall(text.lower())
+
+
+def read_keyword_list(path: Union[str, pathlib.Path]) -> List[str]:
+    """Read a keyword list, one phrase per line
+
+    Blank lines and # comments are skipped.
+
+    Args:
+        path (Union[str, pathlib.Path]): Path to the keyword list
+
+    Returns:
+        List[str]: Phrases in the list
+    """
+    phrases = []
+    for line in pathlib.Path(path).read_text().splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            phrases.append(line)
+    return phrases
+
+
+class KeywordMatcher:
+    """Find which of many phrases appear in a text
+
+    The automaton is built on the first search after phrases are added, and
+    then reused by every search, e.g. across warm AWS Lambda invocations.
+    """
+
+    def __init__(self, phrases: Iterable[str] = ()):
+        """
+        Args:
+            phrases (Iterable[str]): Phrases to find
+        """
+        self._phrases: Dict[Tuple[str, ...], str] = {}
+        self._lock = threading.Lock()
+        self._built = False
+        self.add(phrases)
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    def __getstate__(self) -> Dict:
+        # e.g. for process pools; the automaton is rebuilt on the other side
+        return {"phrases": self._phrases}
+
+    def __setstate__(self, state: Dict) -> None:
+        self._phrases = state["phrases"]
+        self._lock = threading.Lock()
+        self._built = False
+
+    def add(self, phrases: Iterable[str]) -> None:
+        """Add phrases to find
+
+        Args:
+            phrases (Iterable[str]): Phrases to add. Phrases without words
+                are ignored.
+        """
+        with self._lock:
+            for phrase in phrases:
+                words = tuple(tokenize(phrase))
+                if words:
+                    self._phrases.setdefault(words, phrase)
+            self._built = False
+
+    def _build(self) -> None:
+        # trie of the phrases; state 0 is the root
+        goto: List[Dict[str, int]] = [{}]
+        output: List[Tuple[str, ...]] = [()]
+        for words, phrase in self._phrases.items():
+            state = 0
+            for word in words:
+                if word not in goto[state]:
+                    goto.append({})
+                    output.append(())
+                    goto[state][word] = len(goto) - 1
+                state = goto[state][word]
+            output[state] = (phrase,)
+
+        # the fail link of a state points to the state of its longest proper
+        # suffix in the trie. States inherit the output of their fail state,
+        # so a match also reports the phrases that end within it.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in goto[state].items():
+                queue.append(child)
+                suffix = fail[state]
+                while suffix and word not in goto[suffix]:
+                    suffix = fail[suffix]
+                fail[child] = goto[suffix].get(word, 0)
+                output[child] += output[fail[child]]
+
+        self._goto, self._fail, self._output = goto, fail, output
+        self._built = True
+
+    def search(self, *texts: str) -> Iterator[Tuple[int, str]]:
+        """Find every occurrence of the phrases in texts
+
+        The texts are scanned one after the other in a single pass. Phrases
+        don't match across two texts.
+
+        Args:
+            *texts (str): Texts to scan, e.g. a title and a selftext
+
+        Yields:
+            Tuple[int, str]: Index of the text and the phrase found in it,
+                in the order the phrases end
+        """
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._build()
+        goto, fail, output = self._goto, self._fail, self._output
+
+        for index, text in enumerate(texts):
+            state = 0
+            for word in tokenize(text):
+                while state and word not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(word, 0)
+                for phrase in output[state]:
+                    yield index, phrase
+
+    def matches(self, *texts: str) -> List[str]:
+        """Get the phrases that appear in any of the texts
+
+        Args:
+            *texts (str): Texts to scan, e.g. a title and a selftext
+
+        Returns:
+            List[str]: Phrases found, in the order they were first found
+        """
+        return list(dict.fromkeys(phrase for _, phrase in self.search(*texts)))
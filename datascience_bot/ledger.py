@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""Record moderation actions so retried tasks don't repeat them
+
+When AWS Lambda retries a task that timed out, the task starts over and
+would reply, remove and distinguish again. Every moderation action goes
+through the ledger instead: an action that is already recorded for its
+target is skipped without a request, and its recorded result, e.g. the id of
+a reply, is returned as if it had run.
+
+The ledger is a SQLite database in the state dir, or at ACTION_LEDGER_PATH,
+e.g. on a volume shared by all containers. Ledgers can also be exported to
+JSONL and merged into each other to sync them through durable storage.
+"""
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+
+import praw
+
+from datascience_bot.state import state_path
+
+
+logger = logging.getLogger(__name__)
+
+
+# days an action is remembered; once dropped, the action may run again
+LEDGER_DAYS = float(os.getenv("ACTION_LEDGER_DAYS", 30))
+
+SCHEMA = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS actions (
+    target TEXT NOT NULL,
+    action TEXT NOT NULL,
+    created_utc REAL NOT NULL,
+    result TEXT,
+    PRIMARY KEY (target, action)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS actions_created_utc ON actions (created_utc);
+"""
+
+Path = Union[str, pathlib.Path]
+
+
+class ActionLedger:
+    """Moderation actions by target and action, in a SQLite database
+
+    The connection is opened on first use and shared by all threads. Actions
+    older than `days` are dropped when it's opened.
+    """
+
+    def __init__(self, path: Optional[Path] = None, days: float = LEDGER_DAYS):
+        """
+        Args:
+            path (Optional[Path]): Path to the database. Defaults to
+                ACTION_LEDGER_PATH, or "ledger.sqlite3" in the state dir.
+            days (float): Days an action is remembered
+        """
+        self.path = path
+        self.days = days
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            path = (
+                self.path
+                or os.getenv("ACTION_LEDGER_PATH")
+                or state_path("ledger.sqlite3")
+            )
+            connection = sqlite3.connect(str(path), check_same_thread=False)
+            connection.executescript(SCHEMA)
+            with connection:
+                connection.execute(
+                    "DELETE FROM actions WHERE created_utc < ?",
+                    (time.time() - self.days * 24 * 60 * 60,),
+                )
+            self._connection = connection
+        return self._connection
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self.connection.execute("SELECT COUNT(*) FROM actions").fetchone()
+        return row[0]
+
+    def get(self, target: str, action: str) -> Optional[Dict]:
+        """Get a recorded action
+
+        Args:
+            target (str): Fullname of the target, e.g. "t3_d4j3x5"
+            action (str): Name of the action, e.g. "remove"
+
+        Returns:
+            Optional[Dict]: "target", "action", "created_utc" and "result" of
+                the action, or None if it isn't recorded
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT target, action, created_utc, result FROM actions "
+                "WHERE target = ? AND action = ?",
+                (target, action),
+            ).fetchone()
+        return None if row is None else self._to_record(row)
+
+    def record(self, target: str, action: str, result: Any = None) -> None:
+        """Record that an action was done
+
+        Args:
+            target (str): Fullname of the target
+            action (str): Name of the action
+            result (Any): JSON serializable result of the action
+        """
+        with self._lock, self.connection as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO actions VALUES (?, ?, ?, ?)",
+                (target, action, time.time(), json.dumps(result)),
+            )
+
+    def run(self, target: str, action: str, func: Callable[[], Any]) -> Any:
+        """Do an action once
+
+        Args:
+            target (str): Fullname of the target
+            action (str): Name of the action
+            func (Callable[[], Any]): Does the action and returns a JSON
+                serializable result. If it raises, nothing is recorded.
+
+        Returns:
+            Any: Result of func, or the recorded result if the action was
+                already done
+        """
+        done = self.get(target, action)
+        if done is not None:
+            logger.debug(
+                f"Skip {action} of {target}; done before",
+                extra={"target": target, "action": action},
+            )
+            return done["result"]
+
+        started_at = time.perf_counter()
+        result = func()
+        latency_ms = (time.perf_counter() - started_at) * 1e3
+        self.record(target, action, result)
+        logger.debug(
+            f"Did {action} of {target}",
+            extra={"target": target, "action": action, "latency_ms": latency_ms},
+        )
+        return result
+
+    @staticmethod
+    def _to_record(row) -> Dict:
+        target, action, created_utc, result = row
+        return {
+            "target": target,
+            "action": action,
+            "created_utc": created_utc,
+            "result": json.loads(result),
+        }
+
+    def __iter__(self) -> Iterator[Dict]:
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT target, action, created_utc, result FROM actions "
+                "ORDER BY created_utc"
+            ).fetchall()
+        return map(self._to_record, rows)
+
+    def export(self, path: Path) -> int:
+        """Write all recorded actions to a JSONL file
+
+        Args:
+            path (Path): Path of the JSONL file
+
+        Returns:
+            int: Number of actions written
+        """
+        count = 0
+        with open(path, "w") as ofile:
+            for record in self:
+                ofile.write(json.dumps(record) + "\n")
+                count += 1
+        return count
+
+    def merge(self, path: Path) -> int:
+        """Add actions from a JSONL file, e.g. exported by another container
+
+        Actions that are already recorded keep their record.
+
+        Args:
+            path (Path): Path of the JSONL file
+
+        Returns:
+            int: Number of actions added
+        """
+        rows = []
+        with open(path) as ifile:
+            for line in ifile:
+                if line.strip():
+                    record = json.loads(line)
+                    rows.append(
+                        (
+                            record["target"],
+                            record["action"],
+                            record["created_utc"],
+                            json.dumps(record.get("result")),
+                        )
+                    )
+
+        with self._lock, self.connection as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO actions VALUES (?, ?, ?, ?)", rows
+            )
+            return connection.total_changes - before
+
+
+# shared by all runs of a warm AWS Lambda container
+LEDGER = ActionLedger()
+
+
+def remove(thing, spam: bool = False) -> None:
+    """Remove a submission or comment once
+
+    Args:
+        thing: Submission or comment to remove
+        spam (bool): Whether to remove it as spam
+    """
+    action = "remove_spam" if spam else "remove"
+    LEDGER.run(thing.fullname, action, lambda: thing.mod.remove(spam=spam))
+
+
+def reply(thing, body: str) -> praw.models.Comment:
+    """Reply to a submission or comment once
+
+    Args:
+        thing: Submission or comment to reply to
+        body (str): Markdown of the reply
+
+    Returns:
+        praw.models.Comment: The reply. If we replied before, it's the earlier
+            reply, which isn't fetched until it's read.
+    """
+    replies = []
+
+    def act() -> str:
+        replies.append(thing.reply(body))
+        return replies[0].id
+
+    comment_id = LEDGER.run(thing.fullname, "reply", act)
+    # a fresh reply is loaded, so e.g. distinguishing it doesn't fetch it
+    return replies[0] if replies else thing._reddit.comment(id=comment_id)
+
+
+def distinguish(comment: praw.models.Comment, sticky: bool = False) -> None:
+    """Distinguish a comment of ours once
+
+    Args:
+        comment (praw.models.Comment): Comment to distinguish
+        sticky (bool): Whether to sticky the comment too
+    """
+    LEDGER.run(
+        comment.fullname,
+        "distinguish_sticky" if sticky else "distinguish",
+        lambda: comment.mod.distinguish(how="yes", sticky=sticky),
+    )
+
+
+def report(thing, reason: str) -> None:
+    """Report a submission or comment once
+
+    Args:
+        thing: Submission or comment to report
+        reason (str): Reason of the report
+    """
+    LEDGER.run(thing.fullname, "report", lambda: thing.report(reason))
+
+
+def submit(
+    subreddit: praw.models.Subreddit, title: str, **kwargs
+) -> praw.models.Submission:
+    """Submit a post with a given title once
+
+    Args:
+        subreddit (praw.models.Subreddit): Subreddit to submit to
+        title (str): Title of the submission
+        **kwargs: Keyword arguments for `subreddit.submit`, e.g. selftext
+
+    Returns:
+        praw.models.Submission: The submission. If we submitted it before,
+            it's the earlier submission, which isn't fetched until it's read.
+    """
+    submission_id = LEDGER.run(
+        f"r/{subreddit.display_name}",
+        f"submit:{title}",
+        lambda: subreddit.submit(title=title, **kwargs).id,
+    )
+    return subreddit._reddit.submission(id=submission_id)
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""Log JSON lines from a background thread
+
+`setup` gives the root logger a single `QueueHandler`, so a log call only puts
+the record on a queue. A `QueueListener` thread formats the records as JSON
+and writes them to the stream. Each line holds the time, level, logger and
+message, the task that logged it, and whatever fields the call passed as
+`extra`, e.g.
+
+    logger.info(
+        f"Removed submission {submission.id}",
+        extra={"submission_id": submission.id, "action": "remove"},
+    )
+
+so CloudWatch Logs Insights can filter and aggregate on them.
+"""
+import atexit
+import contextlib
+import contextvars
+from datetime import datetime, timezone
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from typing import IO, Iterator, Optional
+
+
+# level of the root logger, e.g. "DEBUG"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# attributes every log record has; all others were passed as `extra`
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "task",
+}
+
+# name of the task that's running, e.g. "moderate_submissions"
+current_task = contextvars.ContextVar("current_task", default=None)
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class TaskFilter(logging.Filter):
+    """Stamp records with the task that's running in the logging thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "task"):
+            record.task = current_task.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as JSON objects on a single line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "task", None) is not None:
+            entry["task"] = record.task
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queue records without formatting them in the logging thread
+
+    The stock handler formats the message before queueing it. We only merge
+    the args into the message and render the traceback, which can't cross
+    threads, and leave the JSON to the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup(
+    level: str = LOG_LEVEL, stream: Optional[IO] = None
+) -> logging.handlers.QueueListener:
+    """Send the records of all loggers through a queue to a JSON stream
+
+    Replaces the handlers of the root logger, e.g. the one of the AWS Lambda
+    runtime, so every record is written once. Calling it again only updates
+    the level.
+
+    Args:
+        level (str): Level of the root logger
+        stream (Optional[IO]): Stream to write to. Defaults to stdout.
+
+    Returns:
+        logging.handlers.QueueListener: Listener writing the records
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(level)
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        records: queue.Queue = queue.Queue()
+        handler = _QueueHandler(records)
+        handler.addFilter(TaskFilter())
+        for old_handler in list(root.handlers):
+            root.removeHandler(old_handler)
+        root.addHandler(handler)
+
+        stream_handler = logging.StreamHandler(stream or sys.stdout)
+        stream_handler.setFormatter(JsonFormatter())
+        _listener = logging.handlers.QueueListener(records, stream_handler)
+        _listener.start()
+        atexit.register(teardown)
+        return _listener
+
+
+def flush() -> None:
+    """Wait until every queued record is written
+
+    Call it before AWS Lambda freezes the container at the end of an
+    invocation, or the queued records are only written on the next one.
+    """
+    listener = _listener
+    if listener is not None:
+        listener.queue.join()
+
+
+def teardown() -> None:
+    """Write the queued records and remove the handler `setup` added"""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, _QueueHandler):
+                root.removeHandler(handler)
+        _listener = None
+
+
+@contextlib.contextmanager
+def task_context(task: str) -> Iterator[None]:
+    """Stamp records logged within the block with the name of a task
+
+    Args:
+        task (str): Name of the task
+    """
+    token = current_task.set(task)
+    try:
+        yield
+    finally:
+        current_task.reset(token)
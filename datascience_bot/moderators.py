@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""Cache subreddit moderator lists
+
+Moderator lists rarely change, so we keep them in memory and in a state file
+under /tmp to reuse them across warm AWS Lambda invocations. Call
+`check_modlog` once per run to drop cached lists that the modlog says are out
+of date.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, FrozenSet, Optional
+
+import praw
+
+from datascience_bot.state import read_state, write_state
+
+
+logger = logging.getLogger(__name__)
+
+
+# seconds before a cached moderator list is fetched again
+MODERATOR_CACHE_TTL = float(os.getenv("MODERATOR_CACHE_TTL", 24 * 60 * 60))
+
+# modlog actions that change who is a moderator
+MODERATOR_ACTIONS = {"acceptmoderatorinvite", "addmoderator", "removemoderator"}
+
+STATE_NAME = "moderators.json"
+
+_lock = threading.Lock()
+_cache: Optional[Dict[str, Dict]] = None
+
+
+def _load() -> Dict[str, Dict]:
+    global _cache
+    if _cache is None:
+        _cache = read_state(STATE_NAME, default={})
+    return _cache
+
+
+def _is_fresh(entry: Optional[Dict]) -> bool:
+    return entry is not None and time.time() - entry["fetched_at"] < MODERATOR_CACHE_TTL
+
+
+def is_cached(subreddit: praw.models.Subreddit) -> bool:
+    """Returns true if the subreddit moderators can be had without a request
+
+    Args:
+        subreddit (praw.models.Subreddit): Subreddit to check
+
+    Returns:
+        bool: True if the moderators are cached and fresh. Else False.
+    """
+    with _lock:
+        return _is_fresh(_load().get(subreddit.display_name.lower()))
+
+
+def get_moderators(subreddit: praw.models.Subreddit) -> FrozenSet[str]:
+    """Get the lowercase names of the subreddit moderators
+
+    Args:
+        subreddit (praw.models.Subreddit): Subreddit to get moderators of
+
+    Returns:
+        FrozenSet[str]: Lowercase usernames of the subreddit moderators
+    """
+    key = subreddit.display_name.lower()
+    with _lock:
+        cache = _load()
+        entry = cache.get(key)
+        if _is_fresh(entry):
+            return frozenset(entry["moderators"])
+
+        logger.debug(f"Fetch moderators of r/{subreddit.display_name}")
+        fetched_at = time.time()
+        moderators = frozenset(mod.name.lower() for mod in subreddit.moderator())
+        cache[key] = {"fetched_at": fetched_at, "moderators": sorted(moderators)}
+        write_state(STATE_NAME, cache)
+        return moderators
+
+
+def cached_moderators() -> FrozenSet[str]:
+    """Get the lowercase names of every cached moderator without a request
+
+    Lists are returned even if they're stale, e.g. for offline replays.
+
+    Returns:
+        FrozenSet[str]: Lowercase usernames of the moderators of all cached
+            subreddits
+    """
+    with _lock:
+        return frozenset(
+            moderator for entry in _load().values() for moderator in entry["moderators"]
+        )
+
+
+def is_moderator(subreddit: praw.models.Subreddit, redditor) -> bool:
+    """Returns true if the redditor moderates the subreddit
+
+    Args:
+        subreddit (praw.models.Subreddit): Subreddit to check
+        redditor (praw.models.Redditor): Redditor or username to check. May be
+            None if the account was deleted.
+
+    Returns:
+        bool: True if the redditor is a moderator of the subreddit. Else False.
+    """
+    if redditor is None:
+        return False
+    name = redditor if isinstance(redditor, str) else redditor.name
+    return name.lower() in get_moderators(subreddit)
+
+
+def invalidate_moderators(subreddit: Optional[praw.models.Subreddit] = None) -> None:
+    """Forget the cached moderators of the subreddit
+
+    Args:
+        subreddit (Optional[praw.models.Subreddit]): Subreddit to forget. If
+            None, forget all subreddits.
+    """
+    with _lock:
+        cache = _load()
+        if subreddit is None:
+            cache.clear()
+        else:
+            cache.pop(subreddit.display_name.lower(), None)
+        write_state(STATE_NAME, cache)
+
+
+def check_modlog(subreddit: praw.models.Subreddit, limit: int = 100) -> bool:
+    """Invalidate the cached moderators if the modlog shows a change
+
+    Args:
+        subreddit (praw.models.Subreddit): Subreddit to check
+        limit (int): How many of the newest modlog entries to check
+
+    Returns:
+        bool: True if the cached moderators were invalidated. Else False.
+    """
+    with _lock:
+        entry = _load().get(subreddit.display_name.lower())
+    if entry is None:
+        return False  # nothing to invalidate
+
+    for log in subreddit.mod.log(limit=limit):
+        if log.created_utc < entry["fetched_at"]:
+            break
+        if log.action in MODERATOR_ACTIONS:
+            logger.info(
+                f"Moderators of r/{subreddit.display_name} changed "
+                f"({log.action}); invalidate cached moderators"
+            )
+            invalidate_moderators(subreddit)
+            return True
+    return False
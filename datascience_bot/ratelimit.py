@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""Schedule reddit requests by priority within the rate limit
+
+Every request of a reddit session goes through its rate limiter. We replace
+prawcore's limiter, which makes each thread sleep on its own, with one that
+queues requests by priority. Requests wait for a token from a token bucket
+that is sized from reddit's X-Ratelimit-Remaining and X-Ratelimit-Reset
+headers, and the most important request waiting gets the next token. When
+the quota runs low, spam removals still go out while the weekly thread
+replies and wiki edits wait.
+
+Responses with status 429 are retried after a jittered, exponential backoff,
+and take their place in the queue again. prawcore already retries 5xx
+responses on its own, so we leave those to it.
+"""
+from contextlib import contextmanager
+import enum
+import heapq
+import itertools
+import logging
+import random
+import re
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+import praw
+
+
+logger = logging.getLogger(__name__)
+
+
+# requests per second to make before reddit reports the rate limit
+DEFAULT_RATE = 1.0
+# max requests to make back to back before reddit reports the rate limit
+BURST = 10
+# requests per second kept in reserve until the rate limit resets. The rest
+# of the quota can be spent right away. Once only the reserve is left,
+# requests go out one at a time, most important first.
+RESERVE_RATE = 0.1
+# attempts after a 429 response, and the backoff between them
+MAX_RETRIES = 2
+BACKOFF = 1.0
+MAX_BACKOFF = 30.0
+
+
+class Priority(enum.IntEnum):
+    """Order of queued requests; lower goes first"""
+
+    REMOVE = 0
+    DISTINGUISH = 1
+    READ = 2
+    REPLY = 3
+    WIKI = 4
+
+
+# priority of requests by the end of their path
+ENDPOINT_PRIORITIES = [
+    (re.compile(r"/api/(remove|approve|lock|spam)/?$"), Priority.REMOVE),
+    (
+        re.compile(r"/api/(distinguish|set_subreddit_sticky|(select)?flair)/?$"),
+        Priority.DISTINGUISH,
+    ),
+    (re.compile(r"/api/(comment|submit|editusertext)/?$"), Priority.REPLY),
+    (re.compile(r"/wiki/"), Priority.WIKI),
+]
+
+_local = threading.local()
+
+
+@contextmanager
+def priority(level: Priority) -> Iterator[None]:
+    """Give every request made by this thread within the block a priority
+
+    Use it for bulk work whose requests would otherwise look urgent, e.g. the
+    distinguish after each weekly thread reply.
+
+    Args:
+        level (Priority): Priority of the requests
+    """
+    previous = getattr(_local, "priority", None)
+    _local.priority = level
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def classify(method: str, url: str) -> Priority:
+    """Get the priority of a request
+
+    Args:
+        method (str): HTTP method
+        url (str): Requested URL
+
+    Returns:
+        Priority: The priority set with `priority`, if any. Else the priority
+            of the endpoint; reads default to READ and other writes to REPLY.
+    """
+    level = getattr(_local, "priority", None)
+    if level is not None:
+        return level
+    path = url.split("?", 1)[0]
+    for pattern, level in ENDPOINT_PRIORITIES:
+        if pattern.search(path):
+            return level
+    return Priority.READ if method.upper() == "GET" else Priority.REPLY
+
+
+class PriorityRateLimiter:
+    """A token bucket shared by all threads of a reddit session
+
+    It has the same interface as prawcore's RateLimiter, so it can take its
+    place on a session.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: float = BURST,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """
+        Args:
+            rate (float): Tokens added per second until reddit tells us more
+            burst (float): Max tokens in the bucket until reddit tells us more
+            clock: Function returning the current time in seconds
+            sleep: Function to sleep before retrying a request
+        """
+        self.default_rate = rate
+        self.default_burst = burst
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        # requests left in this rate limit window, and when it ends
+        self.remaining: Optional[float] = None
+        self.reset_at: Optional[float] = None
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._condition = threading.Condition()
+        self._queue = []
+        self._counter = itertools.count()
+
+    def _refill(self, now: float) -> None:
+        if self.reset_at is not None and now >= self.reset_at:
+            # a new window starts with the full quota
+            self.remaining = self.reset_at = None
+            self.rate = self.default_rate
+            self.burst = self.tokens = self.default_burst
+        self.tokens = min(
+            self.burst, self.tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def _wait_seconds(self, now: float) -> float:
+        if self.remaining is not None and self.remaining < 1:
+            return self.reset_at - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def acquire(self, level: Priority = Priority.READ) -> None:
+        """Wait until the request is the most important one and has a token
+
+        Args:
+            level (Priority): Priority of the request
+        """
+        with self._condition:
+            entry = (level, next(self._counter))
+            heapq.heappush(self._queue, entry)
+            while True:
+                now = self._clock()
+                self._refill(now)
+                if self._queue[0] == entry:
+                    wait = self._wait_seconds(now)
+                    if wait <= 0:
+                        heapq.heappop(self._queue)
+                        self.tokens -= 1
+                        if self.remaining is not None:
+                            self.remaining -= 1
+                        self._condition.notify_all()
+                        return
+                    self._condition.wait(timeout=wait)
+                else:
+                    self._condition.wait()
+
+    def update(self, headers: Dict[str, str]) -> None:
+        """Update the quota from the rate limit headers of a response
+
+        Whatever is left beyond RESERVE_RATE until the reset can be spent
+        right away. The reserve, or the whole quota once it's below the
+        reserve, is spread evenly over the rest of the window, so a low quota
+        slows requests down rather than running out.
+
+        Args:
+            headers (Dict[str, str]): Response headers
+        """
+        try:
+            remaining = float(headers["x-ratelimit-remaining"])
+            reset = float(headers["x-ratelimit-reset"])
+        except (KeyError, ValueError):
+            return
+
+        with self._condition:
+            now = self._clock()
+            self._refill(now)
+            self.remaining = remaining
+            self.reset_at = now + reset
+            self.rate = min(RESERVE_RATE, max(remaining, 1) / max(reset, 1))
+            self.tokens = max(remaining - reset * RESERVE_RATE, 0)
+            self.burst = max(self.default_burst, self.tokens)
+            self._condition.notify_all()
+
+    def call(self, request_function, set_header_callback, *args, **kwargs):
+        """Make a request once it's its turn, retrying 429 responses
+
+        Args:
+            request_function: Function that makes the request and returns
+                the response, i.e. prawcore's `Requestor.request`
+            set_header_callback: Function returning the request headers. It
+                refreshes the access token if needed.
+            *args: Method and URL for request_function
+            **kwargs: Keyword arguments for request_function
+
+        Returns:
+            The last response
+        """
+        method, url = args[0], args[1]
+        level = classify(method, url)
+        for attempt in range(MAX_RETRIES + 1):
+            self.acquire(level)
+            kwargs["headers"] = set_header_callback()
+            response = request_function(*args, **kwargs)
+            self.update(response.headers)
+
+            status = response.status_code
+            # prawcore retries 5xx responses itself; retrying them here too
+            # would send a request up to 9 times
+            if status != 429 or attempt == MAX_RETRIES:
+                return response
+            # full jitter keeps concurrent requests from retrying in lockstep
+            backoff = random.uniform(0, min(MAX_BACKOFF, BACKOFF * 2 ** attempt))
+            logger.warning(
+                f"Retry {method.upper()} {url} in {backoff:.1f}s "
+                f"after status {status}"
+            )
+            self._sleep(backoff)
+
+
+def install(reddit: praw.models.reddit) -> PriorityRateLimiter:
+    """Replace the rate limiter of a reddit session
+
+    Args:
+        reddit (praw.models.reddit): reddit instance to schedule requests of
+
+    Returns:
+        PriorityRateLimiter: The session's rate limiter
+    """
+    limiter = reddit._core._rate_limiter
+    if not isinstance(limiter, PriorityRateLimiter):
+        limiter = reddit._core._rate_limiter = PriorityRateLimiter()
+    return limiter
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Remove submissions that mention known scam phrases
+"""
+import logging
+import os
+
+import praw
+
+from datascience_bot import ledger, moderators
+from datascience_bot.keywords import KeywordMatcher, read_keyword_list
+
+
+logger = logging.getLogger(__name__)
+
+
+# built once per process, so warm AWS Lambda invocations reuse the automaton
+KEYWORD_MATCHER = KeywordMatcher()
+
+# import the scam phrases, e.g. a list of a few thousand phrases
+if os.getenv("SPAM_KEYWORDS_PATH"):
+    KEYWORD_MATCHER.add(read_keyword_list(os.getenv("SPAM_KEYWORDS_PATH")))
+
+
+def remove_keyword_submission(submission: praw.models.reddit.submission) -> bool:
+    """Remove submission whose title or selftext mentions a scam phrase
+
+    Approved and deleted submissions and submissions by moderators are left
+    alone.
+
+    Args:
+        submission (praw.models.reddit.submission): Submission to remove as
+            spam
+
+    Returns:
+        bool: True if submission is removed, else False
+    """
+    if not KEYWORD_MATCHER or submission.approved:
+        return False
+
+    phrases = KEYWORD_MATCHER.matches(submission.title, submission.selftext)
+    if not phrases:
+        return False
+
+    # only look up the moderators when there's a match
+    author = submission.author
+    if author is None:
+        return False
+    if author.name.lower() in moderators.get_moderators(submission.subreddit):
+        logger.info(f"Keep submission {submission.id} by moderator u/{author}")
+        return False
+
+    ledger.remove(submission, spam=True)
+    logger.info(
+        f"Removed submission {submission.id} by u/{author} mentioning "
+        f"{phrases} from r/{submission.subreddit.display_name}; "
+        f"{submission.permalink}",
+        extra={
+            "submission_id": submission.id,
+            "action": "remove_spam",
+            "phrases": phrases,
+        },
+    )
+    return True
@@ -7,7 +7,8 @@ from typing import Coroutine
 
 import praw
 
-from datascience_bot import add_boilerplate
+from datascience_bot import add_boilerplate, ledger
+from datascience_bot.domains import DomainMatcher, read_domain_list
 
 
 logger = logging.getLogger(__name__)
@@ -32,6 +33,18 @@ PORN_URLS = [
 ]
 BLACKLISTED_URLS = VIDEO_URLS + BLOG_URLS + PORN_URLS
 
+DOMAIN_MATCHER = DomainMatcher(
+    {"video": VIDEO_URLS, "blog": BLOG_URLS, "porn": PORN_URLS}
+)
+
+# categories that get a comment removed. Videos and blog posts are welcome as
+# sources in a discussion, they just don't make good submissions.
+COMMENT_SPAM_CATEGORIES = ("porn", "spam")
+
+# optionally import a community spam list, e.g. a hosts file
+if os.getenv("SPAM_DOMAINS_PATH"):
+    DOMAIN_MATCHER.add("spam", read_domain_list(os.getenv("SPAM_DOMAINS_PATH")))
+
 
 def remove_spam_submission(submission: praw.models.reddit.submission) -> bool:
     """Remove submission that links to spam and reply with explanation
@@ -46,55 +59,94 @@ def remove_spam_submission(submission: praw.models.reddit.submission) -> bool:
     """
     logger.debug("Enter remove_spam_submission")
 
-    # Remove videos without comment
-    if any(url in submission.url for url in BLACKLISTED_URLS):
-        submission.mod.remove(spam=True)
-        logger.info(
-            f"Removed submission {submission.id} by u/{submission.author} "
-            f"from r/{submission.subreddit.display_name}; "
-            f"{submission.permalink}"
-        )
-    else:
+    category = DOMAIN_MATCHER.match(submission.url)
+    if category is None:
         return False
 
+    ledger.remove(submission, spam=True)
+    logger.info(
+        f"Removed {category} submission {submission.id} by u/{submission.author} "
+        f"from r/{submission.subreddit.display_name}; "
+        f"{submission.permalink}",
+        extra={
+            "submission_id": submission.id,
+            "action": "remove_spam",
+            "category": category,
+        },
+    )
+
     # Reply with explanation or constructive advice if warranted.
 
-    # Remove porn without comment
-    if any(url in submission.url for url in PORN_URLS):
+    # Remove porn and known spam without comment
+    if category in ("porn", "spam"):
         return True
 
     # Remove video and explain
-    elif any(url in submission.url for url in VIDEO_URLS):
+    elif category == "video":
         text = add_boilerplate(
             "I removed your submission. "
             f"Videos are not allowed in r/{submission.subreddit.display_name}."
         )
-        comment = submission.reply(text)
-        comment.mod.distinguish(how="yes", sticky=True)
+        comment = ledger.reply(submission, text)
+        ledger.distinguish(comment, sticky=True)
         return True
 
     # Remove blog posts and comment alternative
-    elif any(url in submission.url for url in BLOG_URLS):
+    elif category == "blog":
         text = add_boilerplate(
             "I removed your submission. "
             f"r/{submission.subreddit.display_name} receives a lot of spam "
             "from that domain. Try sharing the original article and offer "
             "context for discussion in the title of your submission."
         )
-        comment = submission.reply(text)
-        comment.mod.distinguish(how="yes", sticky=True)
+        comment = ledger.reply(submission, text)
+        ledger.distinguish(comment, sticky=True)
         return True
 
     else:
         logger.warning(
-            "The given submission exists in BLACKLISTED_URLS, but none of the "
-            "constituent lists. This is a programming error."
+            f"The given submission matches the unknown category {category}. "
+            "This is a programming error."
         )
         return True
 
     logger.debug("Exit remove_spam_submission")
 
 
+def remove_spam_comment(comment: praw.models.reddit.comment) -> bool:
+    """Remove comment that links to spam
+
+    Every URL in the body is checked, including bare domains. Comments are
+    removed without a reply, so spammers don't learn which link gave them
+    away.
+
+    Args:
+        comment (praw.models.reddit.comment): Comment to remove as spam
+
+    Returns:
+        bool: True if comment is removed, else False
+    """
+    for host, category in DOMAIN_MATCHER.search(comment.body):
+        if category in COMMENT_SPAM_CATEGORIES:
+            break
+    else:
+        return False
+
+    ledger.remove(comment, spam=True)
+    logger.info(
+        f"Removed {category} comment {comment.id} by u/{comment.author} "
+        f"linking to {host} from r/{comment.subreddit.display_name}; "
+        f"{comment.permalink}",
+        extra={
+            "comment_id": comment.id,
+            "action": "remove_spam",
+            "category": category,
+            "host": host,
+        },
+    )
+    return True
+
+
 if __name__ == "__main__":
     from datascience_bot import get_datascience_bot
 
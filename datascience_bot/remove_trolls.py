@@ -3,45 +3,107 @@
 """
 import logging
 import os
-from typing import Coroutine
+from typing import Coroutine, Optional
 
 import praw
 
-from datascience_bot import add_boilerplate
+from datascience_bot import add_boilerplate, ledger
+from datascience_bot.cache import TTLCache
+from datascience_bot.moderators import is_moderator
 
 
 logger = logging.getLogger(__name__)
 
 
-def remove_troll_submission(submission: praw.models.reddit.submission) -> None:
+# author profiles by lowercase username, shared across warm Lambda invocations
+AUTHOR_CACHE = TTLCache(
+    maxsize=int(os.getenv("AUTHOR_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("AUTHOR_CACHE_TTL", 60 * 60)),
+    state_name="authors.json",
+)
+
+# authors at or below SPAM_KARMA are removed as spam; authors at or below
+# MIN_KARMA are asked to post in the weekly thread instead
+SPAM_KARMA = -10
+MIN_KARMA = 50
+
+
+def classify_karma(
+    total_karma: int, spam_karma: int = SPAM_KARMA, min_karma: int = MIN_KARMA
+) -> Optional[str]:
+    """Decide whether an author's karma disqualifies their submission
+
+    Args:
+        total_karma (int): Sum of the author's link and comment karma
+        spam_karma (int): Remove as spam at or below this karma
+        min_karma (int): Remove at or below this karma
+
+    Returns:
+        Optional[str]: "spam" or "underqualified", or None if the author
+            may post
+    """
+    if total_karma <= spam_karma:
+        return "spam"
+    if total_karma <= min_karma:
+        return "underqualified"
+    return None
+
+
+def get_author_karma(redditor: praw.models.Redditor) -> int:
+    """Get the total karma of a redditor, fetching their profile if not cached
+
+    Args:
+        redditor (praw.models.Redditor): Redditor to get total karma of
+
+    Returns:
+        int: Sum of link and comment karma
+    """
+    key = redditor.name.lower()
+    profile = AUTHOR_CACHE.get(key)
+    if profile is None:
+        profile = {
+            "link_karma": redditor.link_karma,
+            "comment_karma": redditor.comment_karma,
+        }
+        AUTHOR_CACHE.set(key, profile)
+
+    return profile["link_karma"] + profile["comment_karma"]
+
+
+def remove_troll_submission(submission: praw.models.reddit.submission) -> bool:
     """Remove submission that posted by a troll or underqualified users.
     Reply with explanation or constructive advice if warranted.
 
     Args:
         submission (praw.models.reddit.submission): Submission to remove as
             troll or underqualified user.
+
+    Returns:
+        bool: True if submission is removed, else False
     """
     logger.debug("Enter remove_troll_submission")
 
     redditor = submission.author
     if submission.approved:
-        return None
+        return False
+    if redditor is None:  # the author deleted their account
+        return False
 
     # check if user is a moderator first
-    subreddit_moderators = list(submission.subreddit.moderator())
-    if redditor in subreddit_moderators:
+    if is_moderator(submission.subreddit, redditor):
         logger.info(
             f"Submission {submission.id} was authored by an "
             f"r/{submission.subreddit.display_name} moderator, "
             f"u/{redditor.name}"
         )
-        return None
+        return False
 
-    total_karma = redditor.link_karma + redditor.comment_karma
+    total_karma = get_author_karma(redditor)
+    category = classify_karma(total_karma)
 
-    if total_karma <= -10:
-        submission.mod.remove(spam=True)
-    if total_karma <= 50:
+    if category == "spam":
+        ledger.remove(submission, spam=True)
+    if category is not None:
         # long urls
         weekly_thread = "[weekly entering & transitioning thread](https://www.reddit.com/r/datascience/search?q=Weekly%20Entering%20%26%20Transitioning%20Thread&restrict_sr=1&t=week)"
         the_wiki = "[the wiki](https://www.reddit.com/r/datascience/wiki/index)"
@@ -53,7 +115,7 @@ def remove_troll_submission(submission: praw.models.reddit.submission) -> None:
             f"r/{submission.subreddit.display_name} gets a lot of posts from "
             f"new redditors. It's likely your topic or question has been "
             f"discussed at length before, so we remove posts from authors with "
-            f"less than 50 karma as a rule. You only have {total_karma} "
+            f"less than {MIN_KARMA} karma as a rule. You only have {total_karma} "
             f"karma right now.\n"
             f"\n"
             f"The {weekly_thread} is a good place to start. You may also find "
@@ -63,12 +125,24 @@ def remove_troll_submission(submission: praw.models.reddit.submission) -> None:
             f"with a throwaway account, please {message_the_mods} to approve "
             f"your submission."
         )
-        comment = submission.reply(text)
-        comment.mod.distinguish(how="yes", sticky=True)
+        comment = ledger.reply(submission, text)
+        ledger.distinguish(comment, sticky=True)
 
-        submission.mod.remove(spam=False)
+        ledger.remove(submission, spam=False)
+        logger.info(
+            f"Removed submission {submission.id} by u/{redditor} with "
+            f"{total_karma} karma from r/{submission.subreddit.display_name}; "
+            f"{submission.permalink}",
+            extra={
+                "submission_id": submission.id,
+                "action": "remove_spam" if category == "spam" else "remove",
+                "karma": total_karma,
+            },
+        )
+        return True
 
     logger.debug("Exit remove_troll_submission")
+    return False
 
 
 if __name__ == "__main__":
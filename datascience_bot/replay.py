@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""Replay moderation policies over dumps of submissions without side effects
+
+A dump is either a JSONL file with one submission per line or a SQLite
+database with a `submissions` table. Submissions need an "id" and may have
+"url", "title", "selftext", "author" and "approved". The author's karma is
+read from the submission itself, as "author_karma" or "link_karma" and
+"comment_karma", or else from a separate authors dump keyed by "name" (a
+JSONL file, or an `authors` table in the SQLite database).
+
+Decisions follow the order of `rules.SUBMISSION_RULES`, but only decide
+what would happen; nothing is fetched from or sent to reddit. Records are
+decided in chunks on a process pool, and decisions come back in dump order.
+"""
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+import itertools
+import json
+import os
+import pathlib
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from datascience_bot import moderators as moderator_cache
+from datascience_bot import rules
+from datascience_bot.domains import DomainMatcher
+from datascience_bot.keywords import KeywordMatcher
+from datascience_bot.remove_keywords import KEYWORD_MATCHER
+from datascience_bot.remove_spam import DOMAIN_MATCHER
+from datascience_bot.remove_trolls import MIN_KARMA, SPAM_KARMA, classify_karma
+
+
+# records per task sent to a worker process
+CHUNK_SIZE = 10000
+
+Path = Union[str, pathlib.Path]
+
+
+class Policy:
+    """Thresholds, domain lists and phrases of the submission rules"""
+
+    def __init__(
+        self,
+        name: str = "current",
+        spam_karma: int = SPAM_KARMA,
+        min_karma: int = MIN_KARMA,
+        domains: Optional[Dict[str, Iterable[str]]] = None,
+        keywords: Optional[Iterable[str]] = None,
+        moderators: Optional[Iterable[str]] = None,
+    ):
+        """
+        Args:
+            name (str): Name of the policy in decisions and reports
+            spam_karma (int): Remove as spam at or below this author karma
+            min_karma (int): Remove at or below this author karma
+            domains (Optional[Dict[str, Iterable[str]]]): Map of category to
+                blacklisted domains. Defaults to the domains of remove_spam.
+            keywords (Optional[Iterable[str]]): Scam phrases. Defaults to the
+                phrases of remove_keywords.
+            moderators (Optional[Iterable[str]]): Authors exempt from the
+                keyword and troll rules. Defaults to the cached moderators.
+        """
+        self.name = name
+        self.spam_karma = spam_karma
+        self.min_karma = min_karma
+        self.matcher = DOMAIN_MATCHER if domains is None else DomainMatcher(domains)
+        self.keywords = (
+            KEYWORD_MATCHER if keywords is None else KeywordMatcher(keywords)
+        )
+        if moderators is None:
+            moderators = moderator_cache.cached_moderators()
+        self.moderators = frozenset(moderator.lower() for moderator in moderators)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "Policy":
+        """Read a policy from a JSON file
+
+        Keys are the arguments of `Policy`. Missing keys keep the current
+        values, and the name defaults to the file name without suffix.
+
+        Args:
+            path (Path): Path to the JSON file
+
+        Returns:
+            Policy: The policy in the file
+        """
+        path = pathlib.Path(path)
+        return cls(**{"name": path.stem, **json.loads(path.read_text())})
+
+    def decide(self, record: Dict, authors: Optional[Dict[str, int]] = None):
+        """Decide what the bot would do with a submission
+
+        Args:
+            record (Dict): A submission from a dump
+            authors (Optional[Dict[str, int]]): Total karma by lowercase
+                author name, for records without karma
+
+        Returns:
+            Optional[str]: "<rule>:<reason>", e.g. "spam:video",
+                "keywords:<first phrase>" or "troll:underqualified", or None
+                if the submission stays up
+        """
+        for rule in rules.SUBMISSION_RULES:
+            # a rule without a check here would silently keep what it removes
+            reason = getattr(self, f"check_{rule.name}")(record, authors)
+            if reason is not None:
+                return f"{rule.name}:{reason}"
+        return None
+
+    def is_exempt(self, record: Dict) -> bool:
+        """Returns true if the keyword and troll rules leave the record alone
+
+        Args:
+            record (Dict): A submission from a dump
+
+        Returns:
+            bool: True if the submission is approved, deleted or by a
+                moderator. Else False.
+        """
+        author = record.get("author")
+        if record.get("approved") or not author:
+            return True
+        return author.lower() in self.moderators
+
+    def check_spam(self, record: Dict, authors: Optional[Dict[str, int]] = None):
+        return self.matcher.match(record.get("url") or "")
+
+    def check_keywords(self, record: Dict, authors: Optional[Dict[str, int]] = None):
+        if self.is_exempt(record):
+            return None
+        phrases = self.keywords.matches(
+            record.get("title") or "", record.get("selftext") or ""
+        )
+        return phrases[0] if phrases else None
+
+    def check_troll(self, record: Dict, authors: Optional[Dict[str, int]] = None):
+        if self.is_exempt(record):
+            return None
+        karma = total_karma(record, authors)
+        if karma is None:
+            return None  # we can't tell without the author's profile
+        return classify_karma(karma, self.spam_karma, self.min_karma)
+
+
+def total_karma(record: Dict, authors: Optional[Dict[str, int]] = None):
+    """Get the total karma of the author of a record
+
+    Args:
+        record (Dict): A submission or author from a dump
+        authors (Optional[Dict[str, int]]): Total karma by lowercase author
+            name, used if the record has no karma
+
+    Returns:
+        Optional[int]: Total karma, or None if unknown
+    """
+    if record.get("author_karma") is not None:
+        return record["author_karma"]
+    link_karma, comment_karma = record.get("link_karma"), record.get("comment_karma")
+    if link_karma is not None or comment_karma is not None:
+        return (link_karma or 0) + (comment_karma or 0)
+    if authors and record.get("author"):
+        return authors.get(record["author"].lower())
+    return None
+
+
+def read_authors(path: Path) -> Dict[str, int]:
+    """Read total karma by lowercase author name from a JSONL or SQLite dump
+
+    Args:
+        path (Path): JSONL file of authors, or SQLite database with an
+            `authors` table
+
+    Returns:
+        Dict[str, int]: Total karma by lowercase author name
+    """
+    if is_sqlite(path):
+        with closing(sqlite3.connect(str(path))) as connection:
+            connection.row_factory = sqlite3.Row
+            rows = connection.execute("SELECT * FROM authors")
+            return {row["name"].lower(): total_karma(dict(row)) for row in rows}
+
+    authors = {}
+    with open(path) as ifile:
+        for line in ifile:
+            if line.strip():
+                author = json.loads(line)
+                authors[author["name"].lower()] = total_karma(author)
+    return authors
+
+
+def is_sqlite(path: Path) -> bool:
+    with open(path, "rb") as ifile:
+        return ifile.read(16) == b"SQLite format 3\x00"
+
+
+def read_chunks(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[List]:
+    """Read a dump of submissions in chunks
+
+    JSONL lines are passed on unparsed, so workers do the parsing.
+
+    Args:
+        path (Path): JSONL file, or SQLite database with a `submissions` table
+        chunk_size (int): Records per chunk
+
+    Yields:
+        List: Records as dicts or JSON strings
+    """
+    if is_sqlite(path):
+        with closing(sqlite3.connect(str(path))) as connection:
+            connection.row_factory = sqlite3.Row
+            tables = {
+                row["name"]
+                for row in connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                )
+            }
+            if "authors" in tables:
+                # join the karma here rather than loading every author
+                query = (
+                    "SELECT s.*, a.link_karma AS link_karma, "
+                    "a.comment_karma AS comment_karma FROM submissions s "
+                    "LEFT JOIN authors a ON a.name = s.author COLLATE NOCASE"
+                )
+            else:
+                query = "SELECT * FROM submissions"
+            cursor = connection.execute(query)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield [dict(row) for row in rows]
+
+    with open(path) as ifile:
+        while True:
+            lines = list(itertools.islice(ifile, chunk_size))
+            if not lines:
+                return
+            yield [line for line in lines if line.strip()]
+
+
+# set in each worker process by _init_worker
+_policies: Sequence[Policy] = ()
+_authors: Optional[Dict[str, int]] = None
+
+
+def _init_worker(policies: Sequence[Policy], authors: Optional[Dict[str, int]]):
+    global _policies, _authors
+    _policies, _authors = policies, authors
+
+
+def _decide_chunk(records: List) -> List[Dict]:
+    decisions = []
+    for record in records:
+        if isinstance(record, str):
+            record = json.loads(record)
+        decisions.append(
+            {
+                "id": record.get("id"),
+                "decisions": {
+                    policy.name: policy.decide(record, _authors) for policy in _policies
+                },
+            }
+        )
+    return decisions
+
+
+def replay(
+    path: Path,
+    policies: Sequence[Policy],
+    authors_path: Optional[Path] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[Dict]:
+    """Decide what each policy would do with every submission in a dump
+
+    Args:
+        path (Path): JSONL or SQLite dump of submissions
+        policies (Sequence[Policy]): Policies to replay. Names must be unique.
+        authors_path (Optional[Path]): JSONL or SQLite dump of authors, for
+            submissions without karma
+        workers (Optional[int]): Number of worker processes. Defaults to the
+            number of CPUs. 0 decides in this process.
+        chunk_size (int): Records per task sent to a worker
+
+    Yields:
+        Dict: "id" of a submission and its "decisions" by policy name, in
+            dump order
+    """
+    if len({policy.name for policy in policies}) != len(policies):
+        raise ValueError("Policies must have unique names")
+    authors = read_authors(authors_path) if authors_path else None
+    chunks = read_chunks(path, chunk_size)
+
+    if workers == 0:
+        _init_worker(policies, authors)
+        for chunk in chunks:
+            yield from _decide_chunk(chunk)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(policies, authors)
+    ) as executor:
+        # map() submits every chunk up front, so keep a bounded window in
+        # flight to stream large dumps in constant memory
+        window = workers * 2
+        pending = []
+        for chunk in chunks:
+            pending.append(executor.submit(_decide_chunk, chunk))
+            if len(pending) >= window:
+                yield from pending.pop(0).result()
+        for future in pending:
+            yield from future.result()
+
+
+class Report:
+    """Count decisions by policy and how decisions change between policies"""
+
+    def __init__(self, policies: Sequence[Policy]):
+        self.names = [policy.name for policy in policies]
+        self.records = 0
+        self.decisions = {name: Counter() for name in self.names}
+        self.changes = Counter()
+
+    def add(self, decision: Dict) -> bool:
+        """Count the decisions about one submission
+
+        Args:
+            decision (Dict): As yielded by `replay`
+
+        Returns:
+            bool: True if the policies disagree about the submission
+        """
+        self.records += 1
+        outcomes = [decision["decisions"][name] or "keep" for name in self.names]
+        for name, outcome in zip(self.names, outcomes):
+            self.decisions[name][outcome] += 1
+        changed = len(set(outcomes)) > 1
+        if changed:
+            self.changes[" -> ".join(outcomes)] += 1
+        return changed
+
+    def summary(self) -> Dict:
+        """
+        Returns:
+            Dict: Number of "records", counts of "decisions" by policy and
+                counts of "changes" like "keep -> troll:underqualified"
+        """
+        return {
+            "records": self.records,
+            "decisions": {
+                name: dict(counts.most_common())
+                for name, counts in self.decisions.items()
+            },
+            "changes": dict(self.changes.most_common()),
+        }
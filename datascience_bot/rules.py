@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Evaluate moderation rules cheapest first
+
+Each rule declares the fields it reads and how many requests it costs when
+those fields aren't loaded yet. Rules that can decide with the data already
+in the listing payload run first, and the first rule that handles an item
+stops the evaluation, so expensive lookups only happen when they're needed.
+"""
+import logging
+from typing import Callable, List, Optional, Sequence
+
+import praw
+
+from datascience_bot import moderators
+from datascience_bot.remove_keywords import remove_keyword_submission
+from datascience_bot.remove_spam import remove_spam_submission
+from datascience_bot.remove_trolls import AUTHOR_CACHE, remove_troll_submission
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_loaded(thing, field: str) -> bool:
+    """Returns true if reading the field doesn't make a request
+
+    Args:
+        thing: A PRAW object, e.g. a submission from a listing
+        field (str): Attribute to check. Dotted paths like "author.link_karma"
+            check nested objects.
+
+    Returns:
+        bool: True if the field is loaded. Else False.
+    """
+    for name in field.split("."):
+        if thing is None:
+            return True  # e.g. the author of a deleted submission
+        if name not in vars(thing):
+            return False
+        thing = vars(thing)[name]
+    return True
+
+
+class Rule:
+    """A moderation rule
+
+    The action of a rule takes an item and returns True if it handled the
+    item, e.g. removed it, which stops the evaluation of further rules.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        action: Callable[..., bool],
+        fields: Sequence[str] = (),
+        cost: int = 0,
+    ):
+        """
+        Args:
+            name (str): Name of the rule, used in logs
+            action (Callable[..., bool]): Function that applies the rule to an
+                item and returns True if it handled the item
+            fields (Sequence[str]): Fields of the item the rule reads
+            cost (int): Estimated number of requests the rule makes when its
+                fields aren't loaded
+        """
+        self.name = name
+        self.action = action
+        self.fields = tuple(fields)
+        self.cost = cost
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.name!r}, cost={self.cost})"
+
+    def cost_for(self, item) -> int:
+        """Estimate how many requests applying the rule to the item costs
+
+        Args:
+            item: Item to apply the rule to
+
+        Returns:
+            int: 0 if all fields are loaded. Else the cost of the rule.
+        """
+        if all(is_loaded(item, field) for field in self.fields):
+            return 0
+        return self.cost
+
+    def __call__(self, item) -> bool:
+        return bool(self.action(item))
+
+
+class TrollRule(Rule):
+    """remove_troll_submission, whose cost depends on what's cached"""
+
+    def cost_for(self, item: praw.models.Submission) -> int:
+        cost = 0
+        if not moderators.is_cached(item.subreddit):
+            cost += 1
+        author = item.author
+        if author is not None and author.name.lower() not in AUTHOR_CACHE:
+            if not is_loaded(item, "author.link_karma"):
+                cost += 1
+        return cost
+
+
+SUBMISSION_RULES: List[Rule] = [
+    Rule("spam", remove_spam_submission, fields=["url"], cost=1),
+    Rule(
+        "keywords",
+        remove_keyword_submission,
+        fields=["approved", "title", "selftext"],
+        cost=1,
+    ),
+    TrollRule("troll", remove_troll_submission, fields=["approved", "author"], cost=2),
+]
+
+
+def evaluate(item, rules: Optional[Sequence[Rule]] = None) -> Optional[str]:
+    """Apply rules to an item cheapest first until one handles it
+
+    Rules with the same cost keep their order.
+
+    Args:
+        item: Item to moderate, e.g. a submission
+        rules (Optional[Sequence[Rule]]): Rules to apply. Defaults to
+            SUBMISSION_RULES.
+
+    Returns:
+        Optional[str]: Name of the rule that handled the item, or None
+    """
+    if rules is None:
+        rules = SUBMISSION_RULES
+
+    costs = [rule.cost_for(item) for rule in rules]
+    for _, rule in sorted(zip(costs, rules), key=lambda pair: pair[0]):
+        logger.debug(f"Apply rule {rule.name} to {item.fullname}")
+        if rule(item):
+            return rule.name
+    return None
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Persist small bits of bot state between runs
+
+AWS Lambda keeps /tmp around for as long as a container stays warm, so state
+written here survives between invocations of the same container. Point
+DATASCIENCE_BOT_STATE_DIR somewhere else when running locally.
+"""
+import json
+import logging
+import os
+import pathlib
+import tempfile
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+STATE_DIR = pathlib.Path(os.getenv("DATASCIENCE_BOT_STATE_DIR", "/tmp/datascience-bot"))
+
+
+def state_path(name: str) -> pathlib.Path:
+    """Get the path of a state file, creating the state dir if needed
+
+    Args:
+        name (str): Name of the state file, e.g. "moderate_submissions.cursor"
+
+    Returns:
+        pathlib.Path: Path to the state file
+    """
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    return STATE_DIR / name
+
+
+def read_state(name: str, default: Any = None) -> Any:
+    """Read a JSON state file
+
+    Args:
+        name (str): Name of the state file
+        default (Any): Returned when the file is missing or unreadable
+
+    Returns:
+        Any: The decoded JSON content of the state file
+    """
+    path = state_path(name)
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as err:
+        logger.warning(f"Ignoring unreadable state file {path}: {err}")
+        return default
+
+
+def write_state(name: str, data: Any) -> None:
+    """Atomically write a JSON state file
+
+    The data is written to a temporary file first and moved into place, so a
+    run that dies halfway never leaves a truncated state file behind.
+
+    Args:
+        name (str): Name of the state file
+        data (Any): JSON serializable data to write
+    """
+    path = state_path(name)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{name}.")
+    try:
+        with os.fdopen(fd, "w") as ofile:
+            json.dump(data, ofile)
+        os.replace(tmp_path, str(path))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
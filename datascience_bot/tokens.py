@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""Share OAuth access tokens between reddit sessions
+
+Every new reddit session would otherwise do its own password grant. With a
+token store, a new session picks up a valid token from an earlier session,
+and only one session at a time refreshes an expired token.
+"""
+import abc
+from contextlib import contextmanager
+import fcntl
+import logging
+import threading
+import time
+from typing import ContextManager, Dict, Iterator, Optional
+
+import praw
+
+from datascience_bot.state import read_state, state_path, write_state
+
+
+logger = logging.getLogger(__name__)
+
+
+# seconds before expiry at which a stored token is no longer handed out
+EXPIRY_MARGIN = 60
+
+
+class TokenStore(abc.ABC):
+    """Where access tokens are kept between sessions
+
+    Tokens are dicts with an "access_token", its "expires_at" unix time and
+    its "scopes".
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[Dict]:
+        """Get the stored token for the key, if any"""
+
+    @abc.abstractmethod
+    def set(self, key: str, token: Dict) -> None:
+        """Store the token for the key"""
+
+    @abc.abstractmethod
+    def lock(self, key: str) -> ContextManager[None]:
+        """Hold an exclusive lock on the key while refreshing its token"""
+
+
+class MemoryTokenStore(TokenStore):
+    """Keep tokens in memory, e.g. for tests"""
+
+    def __init__(self):
+        self._tokens: Dict[str, Dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self._tokens.get(key)
+
+    def set(self, key: str, token: Dict) -> None:
+        self._tokens[key] = token
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        with self._locks_lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            yield
+
+
+class FileTokenStore(TokenStore):
+    """Keep tokens in a state file, shared by all processes on the machine
+
+    Refreshes are serialized with an exclusive flock on a lock file next to
+    the state file, so concurrent workers don't all refresh at once.
+    """
+
+    def __init__(self, state_name: str = "tokens.json"):
+        """
+        Args:
+            state_name (str): Name of the state file that keeps the tokens
+        """
+        self.state_name = state_name
+
+    def get(self, key: str) -> Optional[Dict]:
+        return read_state(self.state_name, default={}).get(key)
+
+    def set(self, key: str, token: Dict) -> None:
+        # only called while holding the lock, so read-modify-write is safe
+        tokens = read_state(self.state_name, default={})
+        tokens[key] = token
+        write_state(self.state_name, tokens)
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        with open(state_path(f"{self.state_name}.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# the store used for new sessions; replace it to change the backend
+TOKEN_STORE: TokenStore = FileTokenStore()
+
+
+def _is_fresh(token: Optional[Dict]) -> bool:
+    return token is not None and token["expires_at"] - EXPIRY_MARGIN > time.time()
+
+
+def attach_token_store(reddit: praw.models.reddit, store: TokenStore, key: str) -> None:
+    """Make a reddit session get and refresh its access token through a store
+
+    Args:
+        reddit (praw.models.reddit): A reddit instance with a script app
+        store (TokenStore): Where to share the access token
+        key (str): Key of the token in the store, unique per account and app
+    """
+    authorizer = reddit._core._authorizer
+    refresh = authorizer.refresh
+    # the last token this session used. If the store still hands out the same
+    # token when we need a new one, reddit rejected it or it expired.
+    used = {"access_token": None}
+
+    def use(token: Dict) -> None:
+        authorizer.access_token = token["access_token"]
+        authorizer._expiration_timestamp = token["expires_at"]
+        authorizer.scopes = set(token["scopes"])
+        used["access_token"] = token["access_token"]
+
+    def refresh_through_store() -> None:
+        seen = authorizer.access_token
+        with store.lock(key):
+            if authorizer.access_token != seen and authorizer.is_valid():
+                return  # another thread of this session refreshed it meanwhile
+
+            token = store.get(key)
+            if _is_fresh(token) and token["access_token"] != used["access_token"]:
+                logger.debug(f"Use stored access token for {key}")
+                use(token)
+                return
+
+            logger.debug(f"Refresh access token for {key}")
+            refresh()
+            token = {
+                "access_token": authorizer.access_token,
+                "expires_at": authorizer._expiration_timestamp,
+                "scopes": sorted(authorizer.scopes),
+            }
+            store.set(key, token)
+            used["access_token"] = token["access_token"]
+
+    authorizer.refresh = refresh_through_store
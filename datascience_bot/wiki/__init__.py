@@ -1,9 +1,79 @@
 # -*- coding: utf-8 -*-
 """Markdown files as variables
+
+Pages are read from disk on first access, e.g. `wiki.faq`, and read again
+only if the file changed since.
 """
+import os
 import pathlib
+import threading
+from typing import Dict, List, Tuple
+
+
+WIKI_DIR = pathlib.Path(__file__).parent
+
+# module variables for pages, mapped to the page name
+VARIABLES = {
+    "faq": "frequently-asked-questions",
+    "index": "index",
+    "resources": "resources",
+}
+
+_lock = threading.Lock()
+_pages: Dict[str, Tuple[int, str]] = {}  # page name -> (mtime, content)
+
+
+def list_pages() -> List[str]:
+    """List the names of all wiki pages without reading them
+
+    Returns:
+        List[str]: Sorted page names, e.g. "frequently-asked-questions"
+    """
+    return sorted(
+        entry.name[: -len(".md")]
+        for entry in os.scandir(WIKI_DIR)
+        if entry.is_file() and entry.name.endswith(".md")
+    )
+
+
+def page_path(name: str) -> pathlib.Path:
+    """Get the path to a wiki page
+
+    Args:
+        name (str): Page name, e.g. "frequently-asked-questions"
+
+    Returns:
+        pathlib.Path: Path to the markdown file of the page
+    """
+    return WIKI_DIR / f"{name}.md"
+
+
+def read_page(name: str) -> str:
+    """Read a wiki page, reusing the last read if the file didn't change
+
+    Args:
+        name (str): Page name, e.g. "frequently-asked-questions"
+
+    Returns:
+        str: Markdown content of the page
+    """
+    path = page_path(name)
+    mtime = path.stat().st_mtime_ns
+    with _lock:
+        cached = _pages.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        content = path.read_text()
+        _pages[name] = (mtime, content)
+        return content
+
+
+def __getattr__(name: str) -> str:
+    if name in VARIABLES:
+        return read_page(VARIABLES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-faq = (pathlib.Path(__file__).parent / "frequently-asked-questions.md").read_text()
-index = (pathlib.Path(__file__).parent / "index.md").read_text()
-resources = (pathlib.Path(__file__).parent / "resources.md").read_text()
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + list(VARIABLES))
@@ -2,21 +2,27 @@
 # -*- coding: utf-8 -*-
 """AWS Lambda entrypoint
 """
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import importlib
+import inspect
 import logging
-import sys
-from typing import Dict
+import time
+from typing import Dict, List, Optional
 
-from datascience_bot.cli import refresh_weekly_thread, moderate_submissions
 
-
-# config logger
+# the datascience_bot package loads praw, so it's imported when a task runs,
+# not when AWS Lambda loads this module
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler(sys.stdout)
-handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter("%(asctime)s UTC | %(levelname)s | %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+
+
+# tasks mapped to the module whose `main` runs them. Modules are imported
+# when a task is dispatched, so a cold start only loads what it needs.
+TASKS = {
+    "refresh_weekly_thread": "datascience_bot.cli.refresh_weekly_thread",
+    "moderate_submissions": "datascience_bot.cli.moderate_submissions",
+    "moderate_modqueue": "datascience_bot.cli.moderate_modqueue",
+    "moderate_comments": "datascience_bot.cli.moderate_comments",
+}
 
 
 class EventConfigError(Exception):
@@ -25,6 +31,17 @@ class EventConfigError(Exception):
     The event must be a dict of two key-value pairs:
         "task": mapped to a str
         "kwargs": mapped to a dict
+
+    or, to run several tasks in one invocation, a dict with:
+        "tasks": mapped to a list of dicts with "task" and "kwargs", and
+            optionally "name" (a unique str, defaults to "task") and "after"
+            (a list of names of tasks that must succeed first)
+        "concurrent": optionally mapped to a bool, whether to run tasks
+            without dependencies on each other at the same time. Defaults
+            to True.
+
+    and may have:
+        "trace": mapped to a bool, whether to return every API request
     """
 
 
@@ -41,6 +58,80 @@ class UnknownTaskError(Exception):
     """
 
 
+def validate_task(spec: Dict, where: str = "AWS Lambda event") -> None:
+    """Validate a "task" and "kwargs" pair
+
+    Args:
+        spec (Dict): The event, or an item of its "tasks" list
+        where (str): Where the pair is, for error messages
+
+    Raises:
+        EventConfigError: if the pair is invalid
+    """
+    if not isinstance(spec, dict):
+        raise EventConfigError(f"{where} must be a dict")
+    if "task" not in spec.keys():
+        raise EventConfigError(f"{where} is missing the `task` key")
+    if not isinstance(spec["task"], str):
+        raise EventConfigError(f"{where} 'task' key must map to a str")
+    if "kwargs" not in spec.keys():
+        raise EventConfigError(f"{where} is missing the `kwargs` key")
+    if not isinstance(spec["kwargs"], dict):
+        raise EventConfigError(f"{where} 'kwargs' key must map to a dict")
+
+
+def validate_tasks(specs: List) -> None:
+    """Validate the "tasks" list of a batch event
+
+    Args:
+        specs (List): Value of the "tasks" key
+
+    Raises:
+        EventConfigError: if a task is invalid, names aren't unique, or
+            dependencies are unknown or circular
+    """
+    if not isinstance(specs, list) or not specs:
+        raise EventConfigError("AWS Lambda event 'tasks' key must map to a list")
+
+    names = []
+    for i, spec in enumerate(specs):
+        where = f"AWS Lambda event 'tasks' item {i}"
+        validate_task(spec, where)
+        name = spec.get("name", spec["task"])
+        if not isinstance(name, str):
+            raise EventConfigError(f"{where} 'name' key must map to a str")
+        if name in names:
+            raise EventConfigError(f"{where} name '{name}' is not unique")
+        after = spec.get("after", [])
+        if not isinstance(after, list) or not all(isinstance(a, str) for a in after):
+            raise EventConfigError(f"{where} 'after' key must map to a list of str")
+        names.append(name)
+
+    dependencies = {
+        spec.get("name", spec["task"]): set(spec.get("after", [])) for spec in specs
+    }
+    for name, after in dependencies.items():
+        unknown = after - set(names)
+        if unknown:
+            raise EventConfigError(
+                f"AWS Lambda event task '{name}' runs after unknown tasks "
+                f"{sorted(unknown)}"
+            )
+
+    # peel off tasks whose dependencies are met; whatever is left is a cycle
+    remaining = dict(dependencies)
+    while remaining:
+        ready = [
+            name for name, after in remaining.items() if not after & remaining.keys()
+        ]
+        if not ready:
+            raise EventConfigError(
+                f"AWS Lambda event tasks {sorted(remaining)} depend on each other"
+            )
+        for name in ready:
+            del remaining[name]
+
+
 def validate_event(event: Dict) -> None:
     """Validate the event dict passed to lambda_handler
 
@@ -52,14 +143,135 @@ def validate_event(event: Dict) -> None:
     """
     if not isinstance(event, dict):
         raise EventConfigError("AWS Lambda event must be a dict")
-    if "task" not in event.keys():
-        raise EventConfigError("AWS Lambda event is missing the `task` key")
-    if not isinstance(event["task"], str):
-        raise EventConfigError("AWS Lambda event 'task' key must map to a str")
-    if "kwargs" not in event.keys():
-        raise EventConfigError("AWS Lambda event is missing the `kwargs` key")
-    if not isinstance(event["kwargs"], dict):
-        raise EventConfigError("AWS Lambda event 'kwargs' key must map to a dict")
+    if "tasks" in event.keys():
+        if "task" in event.keys():
+            raise EventConfigError(
+                "AWS Lambda event must have either the `task` or `tasks` key"
+            )
+        validate_tasks(event["tasks"])
+        if not isinstance(event.get("concurrent", True), bool):
+            raise EventConfigError(
+                "AWS Lambda event 'concurrent' key must map to a bool"
+            )
+    else:
+        validate_task(event)
+    if not isinstance(event.get("trace", False), bool):
+        raise EventConfigError("AWS Lambda event 'trace' key must map to a bool")
+
+
+def get_deadline(context) -> Optional[float]:
+    """Get the unix time at which AWS Lambda will time out
+
+    Args:
+        context: AWS Lambda context object, or None when run locally
+
+    Returns:
+        Optional[float]: Unix time of the timeout, or None if unknown
+    """
+    if context is None:
+        return None
+    return time.time() + context.get_remaining_time_in_millis() / 1000
+
+
+def get_main(task: str):
+    """Import the `main` function of a task
+
+    Raises:
+        UnknownTaskError: if the task is not in TASKS
+    """
+    if task not in TASKS:
+        raise UnknownTaskError(f"The given task, '{task}', is not supported")
+    return importlib.import_module(TASKS[task]).main
+
+
+def run_task(task: str, kwargs: Dict, deadline: Optional[float]) -> None:
+    """Run the `main` function of a task
+
+    Args:
+        task (str): Name of the task in TASKS
+        kwargs (Dict): Keyword arguments for `main`
+        deadline (Optional[float]): Unix time by which the task must be done.
+            Passed on if `main` takes a deadline.
+    """
+    from datascience_bot import logs
+
+    main = get_main(task)
+    if "deadline" in inspect.signature(main).parameters:
+        kwargs = {"deadline": deadline, **kwargs}
+    with logs.task_context(task):
+        main(**kwargs)
+
+
+def run_tasks(
+    specs: List[Dict], deadline: Optional[float], concurrent: bool = True
+) -> List[Dict]:
+    """Run several tasks in dependency order
+
+    Tasks share the process, and so the reddit session of `get_reddit`. A
+    task that fails doesn't stop the others, but the tasks that run after
+    it are skipped.
+
+    Args:
+        specs (List[Dict]): Validated items of the event's "tasks" list
+        deadline (Optional[float]): Unix time by which the tasks must be done
+        concurrent (bool): Whether to run independent tasks at the same time
+
+    Returns:
+        List[Dict]: "name", "task", "status" ("succeeded", "failed" or
+            "skipped"), "seconds" and, if it failed, "error" of each task, in
+            the order of `specs`
+    """
+    results = {}
+    specs = {spec.get("name", spec["task"]): spec for spec in specs}
+    pending = dict(specs)
+
+    def timed_run(name: str) -> Dict:
+        spec = specs[name]
+        started_at = time.monotonic()
+        result = {"name": name, "task": spec["task"], "status": "succeeded"}
+        try:
+            run_task(spec["task"], dict(spec["kwargs"]), deadline)
+        except Exception as err:
+            logger.exception(f"Task {name} failed")
+            result.update(status="failed", error=repr(err))
+        result["seconds"] = round(time.monotonic() - started_at, 3)
+        logger.info(
+            f"Task {name} {result['status']}",
+            extra={
+                "task": spec["task"],
+                "status": result["status"],
+                "latency_ms": round(result["seconds"] * 1e3),
+            },
+        )
+        return result
+
+    with ThreadPoolExecutor(max_workers=len(specs) if concurrent else 1) as executor:
+        running = {}
+        while pending or running:
+            for name, spec in list(pending.items()):
+                statuses = [
+                    results[a]["status"] if a in results else None
+                    for a in spec.get("after", [])
+                ]
+                if "failed" in statuses or "skipped" in statuses:
+                    del pending[name]
+                    results[name] = {
+                        "name": name,
+                        "task": spec["task"],
+                        "status": "skipped",
+                        "seconds": 0.0,
+                    }
+                    logger.warning(f"Skip task {name}; a task it runs after failed")
+                elif all(status == "succeeded" for status in statuses):
+                    del pending[name]
+                    running[executor.submit(timed_run, name)] = name
+            if not running:
+                continue  # skipping a task may unblock or skip others
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+    return [results[name] for name in specs]
 
 
 def lambda_handler(event: Dict, context) -> Dict:
@@ -73,23 +285,57 @@ def lambda_handler(event: Dict, context) -> Dict:
         context
 
     Returns:
-        Dict: Response to return to application
+        Dict: Response to return to application, with "metrics" on the API
+            requests the task made. Batch events also return the result of
+            each task under "tasks", and status code 207 if any task failed.
     """
-    validate_event(event)
+    from datascience_bot import instrumentation, logs
 
-    task = event["task"]
-    kwargs = event["kwargs"]
+    # one JSON log stream for all modules, written off the hot path
+    logs.setup()
+
+    validate_event(event)
+    deadline = get_deadline(context)
 
-    if task == "refresh_weekly_thread":
-        refresh_weekly_thread.main(**kwargs)
-    elif task == "moderate_submissions":
-        moderate_submissions.main(**kwargs)
+    if "tasks" in event:
+        task = ",".join(spec.get("name", spec["task"]) for spec in event["tasks"])
+        for spec in event["tasks"]:
+            get_main(spec["task"])  # fail before running any task
     else:
-        raise UnknownTaskError(f"The given task, '{task}', is not supported")
+        task = event["task"]
+        get_main(task)
+
+    with instrumentation.record(trace=event.get("trace", False)) as metrics:
+        try:
+            if "tasks" in event:
+                results = run_tasks(
+                    event["tasks"], deadline, event.get("concurrent", True)
+                )
+            else:
+                run_task(task, event["kwargs"], deadline)
+        finally:
+            summary = metrics.summary()
+            # one line per task, so CloudWatch Logs Insights can query it
+            logger.info(f"Ran {task}", extra={"task": task, "metrics": summary})
+            # AWS Lambda freezes the container once we return
+            logs.flush()
+
+    if "tasks" not in event:
+        return {"status_code": 200, "metrics": summary}
 
-    return {"status_code": 200}
+    logger.info(f"Ran tasks {task}", extra={"task": task, "tasks": results})
+    logs.flush()
+    failed = any(result["status"] != "succeeded" for result in results)
+    return {"status_code": 207 if failed else 200, "tasks": results, "metrics": summary}
 
 
 if __name__ == "__main__":
-    lambda_handler(event={"task": "moderate_submissions", "kwargs": {}}, context=None)
-    lambda_handler(event={"task": "refresh_weekly_thread", "kwargs": {}}, context=None)
+    lambda_handler(
+        event={
+            "tasks": [
+                {"task": "moderate_submissions", "kwargs": {}},
+                {"task": "refresh_weekly_thread", "kwargs": {}},
+            ]
+        },
+        context=None,
+    )
@@ -23,6 +23,10 @@ setup(
         "console_scripts": [
             "refresh-weekly-thread = datascience_bot.cli.refresh_weekly_thread:main",
             "moderate-submissions = datascience_bot.cli.moderate_submissions:main",
+            "moderate-stream = datascience_bot.cli.moderate_stream:main",
+            "moderate-modqueue = datascience_bot.cli.moderate_modqueue:main",
+            "moderate-comments = datascience_bot.cli.moderate_comments:main",
+            "replay-policy = datascience_bot.cli.replay_policy:main",
         ]
     },
     install_requires=requirements,
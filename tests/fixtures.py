@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Fixtures shared by the offline tests
+
+conftest.py prepares r/datascience_bot_dev for the live tests, so offline
+tests import the fixtures they need from here instead, e.g.
+
+    from fixtures import state_dir  # noqa: F401
+
+Autouse fixtures apply to every test of a module that imports them.
+"""
+import logging
+
+import pytest
+
+from datascience_bot import ledger, logs, state
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    """Keep state files in a temporary directory"""
+    monkeypatch.setattr(state, "STATE_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def action_ledger(tmp_path, monkeypatch):
+    """Record actions in a fresh ledger"""
+    action_ledger = ledger.ActionLedger(tmp_path / "ledger.sqlite3")
+    monkeypatch.setattr(ledger, "LEDGER", action_ledger)
+    return action_ledger
+
+
+@pytest.fixture
+def root_logger():
+    """Restore the handlers and level of the root logger after `logs.setup`"""
+    logs.teardown()  # e.g. set up by lambda_handler
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield root
+    logs.teardown()
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from datascience_bot import state
+from datascience_bot.cache import TTLCache
+
+from fixtures import state_dir  # noqa: F401
+
+
+def test__get_counts_hits_and_misses():
+    cache = TTLCache(maxsize=2)
+    cache.set("vogt4nick", 100)
+
+    assert cache.get("vogt4nick") == 100
+    assert cache.get("b3405920") is None
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test__evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test__entries_expire():
+    cache = TTLCache(ttl=0)
+    cache.set("a", 1)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test__save_and_load():
+    cache = TTLCache(state_name="test.json")
+    cache.set("vogt4nick", {"link_karma": 1, "comment_karma": 2})
+    cache.save()
+
+    warm = TTLCache(state_name="test.json")
+
+    assert warm.get("vogt4nick") == {"link_karma": 1, "comment_karma": 2}
+
+
+def test__load_respects_maxsize():
+    cache = TTLCache(state_name="test.json")
+    for i in range(10):
+        cache.set(str(i), i)
+    cache.save()
+
+    small = TTLCache(maxsize=3, state_name="test.json")
+
+    assert [key for key in map(str, range(10)) if key in small] == ["7", "8", "9"]
+
+
+def test__state_file_is_read_on_first_use(tmp_path, monkeypatch):
+    monkeypatch.setattr(state, "STATE_DIR", tmp_path / "import")
+    cache = TTLCache(state_name="test.json")  # e.g. at import time
+    monkeypatch.setattr(state, "STATE_DIR", tmp_path)
+    state.write_state("test.json", [["a", 2e9, 1]])
+
+    assert cache.get("a") == 1
+    assert not (tmp_path / "import").exists()
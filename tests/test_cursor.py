@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+from datascience_bot import cursor
+from datascience_bot.cli import moderate_submissions
+
+from fixtures import action_ledger, state_dir  # noqa: F401
+
+
+def make_listing(count: int):
+    """Newest-first listing of fake submissions"""
+    return [
+        SimpleNamespace(fullname=f"t3_{i}", created_utc=1570000000.0 + i)
+        for i in reversed(range(count))
+    ]
+
+
+def test__iter_since_without_cursor():
+    listing = make_listing(10)
+    assert list(cursor.iter_since(listing, None)) == listing
+
+
+def test__iter_since_stops_at_cursor():
+    listing = make_listing(10)
+    cursor.write_cursor("test.new", listing[3])
+
+    new = list(cursor.iter_since(listing, cursor.read_cursor("test.new")))
+
+    assert new == listing[:3]
+
+
+def test__iter_since_stops_at_older_when_cursor_deleted():
+    listing = make_listing(10)
+    cursor.write_cursor("test.new", listing[3])
+    del listing[3]
+
+    new = list(cursor.iter_since(listing, cursor.read_cursor("test.new")))
+
+    assert new == listing[:3]
+
+
+def test__read_cursor_missing():
+    assert cursor.read_cursor("test.new") is None
+
+
+def test__moderate_submissions_resumes_after_a_failure(monkeypatch, tmp_path):
+    listing = make_listing(5)  # t3_4 is the newest
+    for submission in listing:
+        submission.id = submission.fullname[3:]
+    moderated = []
+    failures = {"t3_2": 1}
+
+    def evaluate(submission):
+        moderated.append(submission.fullname)
+        if failures.get(submission.fullname):
+            failures[submission.fullname] -= 1
+            raise RuntimeError("503")
+        return False
+
+    subreddit = SimpleNamespace(new=lambda limit: listing[:limit] if limit else listing)
+    reddit = SimpleNamespace(
+        _core=SimpleNamespace(request=None), subreddit=lambda display_name: subreddit
+    )
+    monkeypatch.setenv("SUBREDDIT_NAME", "datascience_bot_dev")
+    for name, value in [
+        ("get_datascience_bot", lambda: reddit),
+        ("check_modlog", lambda subreddit: None),
+        ("evaluate", evaluate),
+        ("report_repost", lambda submission: False),
+        ("REPOST_INDEX", SimpleNamespace(prune=lambda: None)),  # not empty
+        ("AUTHOR_CACHE", SimpleNamespace(save=lambda: None, stats=lambda: {})),
+    ]:
+        monkeypatch.setattr(moderate_submissions, name, value)
+    cursor.write_cursor("datascience_bot_dev.new", listing[4])  # t3_0
+
+    moderate_submissions.main()
+
+    # the cursor stops before the failed submission
+    assert cursor.read_cursor("datascience_bot_dev.new")["fullname"] == "t3_1"
+    assert sorted(moderated) == ["t3_1", "t3_2", "t3_3", "t3_4"]
+
+    moderated.clear()
+    moderate_submissions.main()
+
+    # the submissions moderated after the failure aren't moderated again
+    assert moderated == ["t3_2"]
+    assert cursor.read_cursor("datascience_bot_dev.new")["fullname"] == "t3_4"
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+
+from datascience_bot.domains import (
+    DomainMatcher,
+    find_hosts,
+    parse_host,
+    read_domain_list,
+)
+from datascience_bot.remove_spam import DOMAIN_MATCHER
+
+
+@pytest.mark.parametrize(
+    "url,host",
+    [
+        ("https://www.YouTube.com/watch?v=dQw4w9WgXcQ", "www.youtube.com"),
+        ("http://user:pw@medium.com:443/path", "medium.com"),
+        ("youtu.be/dQw4w9WgXcQ", "youtu.be"),
+        ("https://example.com./", "example.com"),
+        ("/r/datascience/comments/abc123/", None),
+    ],
+)
+def test__parse_host(url, host):
+    assert parse_host(url) == host
+
+
+@pytest.mark.parametrize(
+    "url,category",
+    [
+        ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "video"),
+        ("https://m.youtube.com/watch?v=dQw4w9WgXcQ", "video"),
+        ("https://towardsdatascience.com/some-article", "blog"),
+        ("https://blog.medium.com/some-article", "blog"),
+        ("https://notmedium.com/some-article", None),
+        ("https://medium.com.example.org/", None),
+        ("https://www.reddit.com/r/datascience/comments/abc123/", None),
+        ("https://example.com/?ref=youtube.com", None),
+    ],
+)
+def test__remove_spam_domain_matcher(url, category):
+    assert DOMAIN_MATCHER.match(url) == category
+
+
+def test__most_specific_domain_wins():
+    matcher = DomainMatcher({"blog": ["medium.com"], "spam": ["spam.medium.com"]})
+
+    assert matcher.match("https://medium.com/a") == "blog"
+    assert matcher.match("https://x.spam.medium.com/a") == "spam"
+
+
+def test__large_domain_list():
+    matcher = DomainMatcher({"spam": (f"spam{i}.example" for i in range(50000))})
+
+    assert len(matcher) == 50000
+    assert "https://www.spam49999.example/buy-now" in matcher
+    assert "https://spam50000.example/" not in matcher
+
+
+def test__read_domain_list(tmp_path):
+    path = tmp_path / "hosts"
+    path.write_text(
+        "# community blocklist\n"
+        "\n"
+        "0.0.0.0 spam.example  # trailing comment\n"
+        "*.Wildcard.example\n"
+    )
+
+    matcher = DomainMatcher({"spam": read_domain_list(path)})
+
+    assert read_domain_list(path) == ["spam.example", "*.Wildcard.example"]
+    assert matcher.match("https://a.wildcard.example") == "spam"
+
+
+@pytest.mark.parametrize(
+    "text,hosts",
+    [
+        ("See [this](https://WWW.YouTube.com/watch?v=1)", ["www.youtube.com"]),
+        ("xvideos.com/q/1, or www.medium.com.", ["xvideos.com", "www.medium.com"]),
+        ("mail me at someone@spam.example", []),
+        ("http://user@spam.example:8080/a", ["spam.example"]),
+        ("I have a question", []),
+    ],
+)
+def test__find_hosts(text, hosts):
+    assert list(find_hosts(text)) == hosts
+
+
+def test__find_hosts_is_linear():
+    # long runs that almost look like hosts mustn't make the scan backtrack
+    text = "a." * 200000 + "1 " + "ab-" * 200000
+
+    started_at = time.perf_counter()
+    assert list(find_hosts(text)) == []
+    assert time.perf_counter() - started_at < 1
+
+
+def test__search():
+    text = "Sources: youtube.com/watch?v=1 and https://www.pornhub.com/a"
+
+    assert list(DOMAIN_MATCHER.search(text)) == [
+        ("youtube.com", "video"),
+        ("www.pornhub.com", "porn"),
+    ]
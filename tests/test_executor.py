@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+import pytest
+
+from datascience_bot import logs
+from datascience_bot.executor import ActionExecutor, BudgetExhaustedError
+
+
+class FakeCore:
+    def __init__(self):
+        self.count_requests = 0
+
+    def request(self, method, path, **kwargs):
+        self.count_requests += 1
+
+
+def make_reddit():
+    return SimpleNamespace(_core=FakeCore())
+
+
+def test__chains_keep_order_and_short_circuit():
+    reddit = make_reddit()
+    calls = []
+
+    def first(item):
+        calls.append(("first", item))
+        return item == 1
+
+    def second(item):
+        calls.append(("second", item))
+        return False
+
+    with ActionExecutor(reddit, max_workers=4) as executor:
+        futures = [executor.submit(item, first, second) for item in range(3)]
+
+    assert [future.result() for future in futures] == [False, True, False]
+    for item in (0, 2):
+        assert calls.index(("first", item)) < calls.index(("second", item))
+    assert ("second", 1) not in calls
+
+
+def test__request_budget():
+    reddit = make_reddit()
+
+    def act(item):
+        reddit._core.request("POST", "/api/remove")
+
+    with ActionExecutor(reddit, max_workers=2, max_requests=3) as executor:
+        futures = [executor.submit(item, act) for item in range(5)]
+
+    errors = [future.exception() for future in futures]
+    assert reddit._core.count_requests == 3
+    assert sum(isinstance(err, BudgetExhaustedError) for err in errors) == 2
+
+    # requests outside of the executor aren't charged
+    reddit._core.request("GET", "/r/datascience/new")
+    assert reddit._core.count_requests == 4
+
+
+def test__chains_run_in_the_context_of_the_submitter():
+    reddit = make_reddit()
+    tasks = []
+
+    def act(item):
+        tasks.append(logs.current_task.get())
+
+    with logs.task_context("moderate_submissions"):
+        with ActionExecutor(reddit, max_workers=2) as executor:
+            for item in range(3):
+                executor.submit(item, act)
+
+    assert tasks == ["moderate_submissions"] * 3
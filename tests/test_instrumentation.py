@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+import praw
+import pytest
+
+from datascience_bot import instrumentation
+
+
+@pytest.mark.parametrize(
+    "method, url, expected",
+    [
+        ("get", "https://oauth.reddit.com/comments/abc/", "GET /comments/{id}"),
+        (
+            "GET",
+            "https://oauth.reddit.com/r/datascience/about/log/?limit=100",
+            "GET /r/{subreddit}/about/log",
+        ),
+        (
+            "GET",
+            "https://oauth.reddit.com/r/datascience/wiki/index",
+            "GET /r/{subreddit}/wiki/{page}",
+        ),
+        ("GET", "https://oauth.reddit.com/user/a-b/about/", "GET /user/{user}/about"),
+        ("post", "https://oauth.reddit.com/api/remove/", "POST /api/remove"),
+    ],
+)
+def test__endpoint(method, url, expected):
+    assert instrumentation.endpoint(method, url) == expected
+
+
+def response(status_code=200, remaining="595.0", used="5"):
+    headers = {"x-ratelimit-remaining": remaining, "x-ratelimit-used": used}
+    return SimpleNamespace(status_code=status_code, headers=headers)
+
+
+def test__metrics_summary():
+    metrics = instrumentation.Metrics()
+    url = "https://oauth.reddit.com/api/info/"
+    metrics.record_request("GET", url, 0.040, response(remaining="599.0", used="1"))
+    metrics.record_request("GET", url, 0.300, response(remaining="598.0", used="2"))
+    metrics.record_request("POST", "https://oauth.reddit.com/api/remove/", 9, None)
+
+    summary = metrics.summary()
+    assert summary["requests"] == 3
+    assert summary["errors"] == 1
+    assert summary["ratelimit_remaining"] == 598.0
+    assert summary["ratelimit_used"] == 2
+    assert "trace" not in summary
+
+    info = summary["endpoints"]["GET /api/info"]
+    assert info["count"] == 2
+    assert info["mean_ms"] == 170.0
+    assert info["max_ms"] == 300.0
+    assert info["histogram"]["le_50"] == 1
+    assert info["histogram"]["le_500"] == 1
+    assert summary["endpoints"]["POST /api/remove"]["histogram"]["le_inf"] == 1
+
+
+def test__trace():
+    metrics = instrumentation.Metrics(trace=True)
+    metrics.record_request(
+        "GET", "https://oauth.reddit.com/comments/abc/", 0.01, response(404)
+    )
+
+    (trace,) = metrics.summary()["trace"]
+    assert trace["endpoint"] == "GET /comments/{id}"
+    assert trace["status"] == 404
+    assert trace["ratelimit_remaining"] == 595.0
+
+
+def test__record_counts_lazy_fetches(monkeypatch):
+    reddit = praw.Reddit(
+        client_id="client-id",
+        client_secret="client-secret",
+        user_agent="test",
+        check_for_updates=False,
+    )
+
+    def fetch(self):
+        self.title = "Fetched"
+        self._fetched = True
+
+    monkeypatch.setattr(praw.models.Submission, "_fetch", fetch)
+
+    with instrumentation.record() as metrics:
+        submission = reddit.submission(id="abc")
+        assert submission.title == "Fetched"
+        assert submission.title == "Fetched"  # already fetched
+    submission = reddit.submission(id="def")
+    submission.title  # not recording
+
+    summary = metrics.summary()
+    assert summary["lazy_fetches"] == 1
+    assert summary["lazy_fetches_by_attribute"] == {"Submission.title": 1}
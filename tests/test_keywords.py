@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+from datascience_bot import remove_keywords
+from datascience_bot.keywords import KeywordMatcher, read_keyword_list
+
+from fixtures import action_ledger  # noqa: F401
+
+
+PHRASES = ["he", "she", "his", "hers", "free money", "money back guarantee"]
+
+
+def test__finds_overlapping_phrases():
+    matcher = KeywordMatcher(PHRASES)
+
+    assert list(matcher.search("Ushers said she hers")) == [(0, "she"), (0, "hers")]
+
+
+def test__matches_title_and_selftext_in_one_pass():
+    matcher = KeywordMatcher(PHRASES)
+
+    assert matcher.matches(
+        "FREE money!!", "100% money-back guarantee. Free money, free money"
+    ) == ["free money", "money back guarantee"]
+
+
+def test__phrases_match_whole_words_only():
+    matcher = KeywordMatcher(["free money"])
+
+    assert matcher.matches("carefree moneylender") == []
+
+
+def test__phrases_dont_span_texts():
+    matcher = KeywordMatcher(["free money"])
+
+    assert matcher.matches("Get it free", "money is tight") == []
+
+
+def test__add_rebuilds_the_automaton():
+    matcher = KeywordMatcher(["free money"])
+    assert matcher.matches("act now") == []
+
+    matcher.add(["act now", "   "])
+
+    assert len(matcher) == 2
+    assert matcher.matches("ACT NOW!") == ["act now"]
+
+
+def test__pickle():
+    matcher = pickle.loads(pickle.dumps(KeywordMatcher(PHRASES)))
+
+    assert matcher.matches("his money back guarantee") == [
+        "his",
+        "money back guarantee",
+    ]
+
+
+def test__read_keyword_list(tmp_path):
+    path = tmp_path / "keywords"
+    path.write_text("# scam phrases\n\nGuaranteed job placement  # bootcamps\n")
+
+    assert read_keyword_list(path) == ["Guaranteed job placement"]
+
+
+class FakeSubmissionModeration:
+    def __init__(self):
+        self.removed = False
+
+    def remove(self, spam=False):
+        self.removed = True
+
+
+def make_submission(title, selftext="", author="b3405920", approved=False):
+    return SimpleNamespace(
+        id="abc123",
+        fullname="t3_abc123",
+        title=title,
+        selftext=selftext,
+        author=None if author is None else SimpleNamespace(name=author),
+        approved=approved,
+        subreddit=SimpleNamespace(display_name="datascience_bot_dev"),
+        permalink="/r/datascience_bot_dev/comments/abc123/",
+        mod=FakeSubmissionModeration(),
+    )
+
+
+@pytest.fixture
+def keyword_matcher(tmp_path, monkeypatch):
+    matcher = KeywordMatcher(["guaranteed job placement"])
+    monkeypatch.setattr(remove_keywords, "KEYWORD_MATCHER", matcher)
+    monkeypatch.setattr(
+        remove_keywords.moderators,
+        "get_moderators",
+        lambda subreddit: frozenset(["vogt4nick"]),
+    )
+    return matcher
+
+
+@pytest.mark.parametrize(
+    "kwargs,removed",
+    [
+        ({"title": "Bootcamp", "selftext": "Guaranteed job placement!"}, True),
+        ({"title": "Is guaranteed job placement real?"}, True),
+        ({"title": "Bootcamp", "selftext": "Is it worth it?"}, False),
+        ({"title": "Guaranteed job placement", "approved": True}, False),
+        ({"title": "Guaranteed job placement", "author": "vogt4nick"}, False),
+        ({"title": "Guaranteed job placement", "author": None}, False),
+    ],
+)
+def test__remove_keyword_submission(keyword_matcher, kwargs, removed):
+    submission = make_submission(**kwargs)
+
+    assert remove_keywords.remove_keyword_submission(submission) == removed
+    assert submission.mod.removed == removed
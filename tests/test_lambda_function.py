@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import pathlib
+import subprocess
+import sys
+import threading
+import time
+from types import ModuleType
+
+import pytest
+
+import lambda_function
+from lambda_function import EventConfigError, UnknownTaskError, lambda_handler
+
+from fixtures import root_logger  # noqa: F401
+
+
+# lambda_handler sets up logging; undo it after every test
+pytestmark = pytest.mark.usefixtures("root_logger")
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Replace TASKS with fake tasks that record when they run"""
+    calls = []
+    lock = threading.Lock()
+
+    def make_task(name, fail=False, seconds=0.0):
+        module = ModuleType(f"fake_tasks.{name}")
+
+        def main(**kwargs):
+            with lock:
+                calls.append(("start", name, kwargs))
+            time.sleep(seconds)
+            with lock:
+                calls.append(("end", name, kwargs))
+            if fail:
+                raise RuntimeError(f"{name} failed")
+
+        module.main = main
+        monkeypatch.setitem(sys.modules, module.__name__, module)
+        return module.__name__
+
+    monkeypatch.setattr(
+        lambda_function,
+        "TASKS",
+        {
+            "fast": make_task("fast"),
+            "slow": make_task("slow", seconds=0.1),
+            "broken": make_task("broken", fail=True),
+        },
+    )
+    return calls
+
+
+def test__single_task(calls):
+    response = lambda_handler({"task": "fast", "kwargs": {"a": 1}}, None)
+
+    assert response["status_code"] == 200
+    assert calls == [("start", "fast", {"a": 1}), ("end", "fast", {"a": 1})]
+    assert "tasks" not in response
+
+
+def test__single_task_raises(calls):
+    with pytest.raises(RuntimeError):
+        lambda_handler({"task": "broken", "kwargs": {}}, None)
+
+
+def test__tasks_run_concurrently(calls):
+    event = {"tasks": [{"task": "slow", "kwargs": {}}, {"task": "fast", "kwargs": {}}]}
+
+    response = lambda_handler(event, None)
+
+    assert response["status_code"] == 200
+    assert [result["status"] for result in response["tasks"]] == [
+        "succeeded",
+        "succeeded",
+    ]
+    # fast finished while slow was still running
+    assert calls.index(("end", "fast", {})) < calls.index(("end", "slow", {}))
+
+
+def test__tasks_run_in_dependency_order(calls):
+    event = {
+        "tasks": [
+            {"task": "fast", "kwargs": {}, "after": ["slow"]},
+            {"task": "slow", "kwargs": {}},
+        ]
+    }
+
+    response = lambda_handler(event, None)
+
+    assert response["status_code"] == 200
+    assert [call[:2] for call in calls] == [
+        ("start", "slow"),
+        ("end", "slow"),
+        ("start", "fast"),
+        ("end", "fast"),
+    ]
+    assert [result["name"] for result in response["tasks"]] == ["fast", "slow"]
+
+
+def test__failures_are_isolated(calls):
+    event = {
+        "tasks": [
+            {"task": "broken", "kwargs": {}},
+            {"task": "fast", "kwargs": {}, "after": ["broken"]},
+            {"name": "other", "task": "slow", "kwargs": {}},
+            {"name": "last", "task": "fast", "kwargs": {}, "after": ["fast"]},
+        ],
+        "concurrent": False,
+    }
+
+    response = lambda_handler(event, None)
+
+    assert response["status_code"] == 207
+    results = {result["name"]: result for result in response["tasks"]}
+    assert results["broken"]["status"] == "failed"
+    assert "broken failed" in results["broken"]["error"]
+    assert results["fast"]["status"] == "skipped"
+    assert results["other"]["status"] == "succeeded"
+    assert results["last"]["status"] == "skipped"
+    assert [call[1] for call in calls] == ["broken", "broken", "slow", "slow"]
+
+
+def test__unknown_task_runs_nothing(calls):
+    event = {
+        "tasks": [{"task": "fast", "kwargs": {}}, {"task": "missing", "kwargs": {}}]
+    }
+
+    with pytest.raises(UnknownTaskError):
+        lambda_handler(event, None)
+    assert calls == []
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        {"tasks": []},
+        {"tasks": [{"task": "fast"}]},
+        {"tasks": [{"task": "fast", "kwargs": {}}], "task": "fast", "kwargs": {}},
+        {"tasks": [{"task": "fast", "kwargs": {}}, {"task": "fast", "kwargs": {}}]},
+        {"tasks": [{"task": "fast", "kwargs": {}, "after": ["slow"]}]},
+        {"tasks": [{"task": "fast", "kwargs": {}, "after": "slow"}]},
+        {
+            "tasks": [
+                {"task": "fast", "kwargs": {}, "after": ["slow"]},
+                {"task": "slow", "kwargs": {}, "after": ["fast"]},
+            ]
+        },
+        {"tasks": [{"task": "fast", "kwargs": {}}], "concurrent": "yes"},
+    ],
+)
+def test__validate_event_rejects_invalid_tasks(event):
+    with pytest.raises(EventConfigError):
+        lambda_function.validate_event(event)
+
+
+def test__import_does_not_load_praw():
+    code = "import sys, lambda_function; assert 'praw' not in sys.modules"
+    root = pathlib.Path(__file__).resolve().parents[1]
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
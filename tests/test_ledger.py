@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from datascience_bot import ledger
+from datascience_bot.ledger import ActionLedger
+
+from fixtures import action_ledger  # noqa: F401
+
+
+def test__run_once(action_ledger):
+    calls = []
+
+    def act():
+        calls.append(1)
+        return "t1_reply"
+
+    assert action_ledger.run("t3_abc", "reply", act) == "t1_reply"
+    assert action_ledger.run("t3_abc", "reply", act) == "t1_reply"
+    assert len(calls) == 1
+    assert action_ledger.get("t3_abc", "reply")["result"] == "t1_reply"
+    assert action_ledger.get("t3_abc", "remove") is None
+
+
+def test__failed_actions_are_not_recorded(action_ledger):
+    def fail():
+        raise RuntimeError("503")
+
+    with pytest.raises(RuntimeError):
+        action_ledger.run("t3_abc", "remove", fail)
+
+    assert action_ledger.get("t3_abc", "remove") is None
+
+
+def test__survives_a_new_process(tmp_path, action_ledger):
+    action_ledger.record("t3_abc", "remove_spam")
+
+    assert ActionLedger(tmp_path / "ledger.sqlite3").get("t3_abc", "remove_spam")
+
+
+def test__old_actions_are_dropped(tmp_path, action_ledger):
+    action_ledger.record("t3_abc", "remove")
+
+    assert len(ActionLedger(tmp_path / "ledger.sqlite3", days=-1)) == 0
+
+
+def test__export_and_merge(tmp_path, action_ledger):
+    action_ledger.record("t3_abc", "remove")
+    action_ledger.record("t3_abc", "reply", "t1_def")
+    path = tmp_path / "ledger.jsonl"
+
+    assert action_ledger.export(path) == 2
+    assert [json.loads(line)["action"] for line in path.open()] == ["remove", "reply"]
+
+    other = ActionLedger(tmp_path / "other.sqlite3")
+    other.record("t3_abc", "reply", "t1_xyz")
+
+    assert other.merge(path) == 1
+    assert len(other) == 2
+    assert other.get("t3_abc", "reply")["result"] == "t1_xyz"  # keeps its own
+
+
+class FakeComment(SimpleNamespace):
+    def __init__(self, id, **kwargs):
+        super().__init__(
+            id=id,
+            fullname=f"t1_{id}",
+            mod=SimpleNamespace(distinguish=self.distinguish),
+            **kwargs,
+        )
+        self.distinguished = []
+
+    def distinguish(self, how, sticky):
+        self.distinguished.append(sticky)
+
+
+class FakeSubmission(SimpleNamespace):
+    def reply(self, body):
+        self.replies.append(body)
+        return FakeComment("reply")
+
+
+def test__retried_reply_and_distinguish():
+    reddit = SimpleNamespace(comment=lambda id: FakeComment(id))
+    submission = FakeSubmission(fullname="t3_abc", replies=[], _reddit=reddit)
+
+    first = ledger.reply(submission, "I removed your submission")
+    ledger.distinguish(first, sticky=True)
+    retried = ledger.reply(submission, "I removed your submission")
+    ledger.distinguish(retried, sticky=True)
+
+    assert submission.replies == ["I removed your submission"]
+    assert retried.fullname == first.fullname
+    assert first.distinguished == [True]
+    assert retried.distinguished == []
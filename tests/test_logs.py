@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import logging
+import threading
+
+from datascience_bot import logs
+
+from fixtures import root_logger  # noqa: F401
+
+
+def read_lines(stream):
+    logs.flush()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test__json_formatter():
+    record = logging.makeLogRecord(
+        {
+            "name": "datascience_bot.remove_spam",
+            "levelname": "INFO",
+            "msg": "Removed submission %s",
+            "args": ("abc123",),
+            "submission_id": "abc123",
+            "action": "remove_spam",
+            "task": "moderate_submissions",
+        }
+    )
+
+    entry = json.loads(logs.JsonFormatter().format(record))
+
+    assert entry.pop("time").endswith("+00:00")
+    assert entry == {
+        "level": "INFO",
+        "logger": "datascience_bot.remove_spam",
+        "message": "Removed submission abc123",
+        "task": "moderate_submissions",
+        "submission_id": "abc123",
+        "action": "remove_spam",
+    }
+
+
+def test__setup_writes_one_json_line_per_record(root_logger):
+    root_logger.addHandler(logging.StreamHandler(io.StringIO()))  # e.g. Lambda's
+    stream = io.StringIO()
+    listener = logs.setup("INFO", stream)
+    assert logs.setup("INFO", io.StringIO()) is listener
+    assert len(root_logger.handlers) == 1
+
+    logger = logging.getLogger("datascience_bot.test")
+    with logs.task_context("moderate_comments"):
+        logger.info("Removed comment", extra={"comment_id": "xyz", "latency_ms": 3})
+    logger.debug("Not written")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed")
+
+    first, second = read_lines(stream)
+    assert first["message"] == "Removed comment"
+    assert first["task"] == "moderate_comments"
+    assert first["comment_id"] == "xyz"
+    assert first["latency_ms"] == 3
+    assert "task" not in second
+    assert second["level"] == "ERROR"
+    assert "ValueError: boom" in second["exception"]
+
+
+def test__records_are_written_by_the_listener(root_logger, monkeypatch):
+    stream = io.StringIO()
+    logs.setup("INFO", stream)
+    threads = []
+    format = logs.JsonFormatter.format
+
+    def spy(self, record):
+        threads.append(threading.current_thread())
+        return format(self, record)
+
+    monkeypatch.setattr(logs.JsonFormatter, "format", spy)
+    logging.getLogger("datascience_bot.test").info("Queued")
+
+    assert [line["message"] for line in read_lines(stream)] == ["Queued"]
+    assert threads and threading.current_thread() not in threads
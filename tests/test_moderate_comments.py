@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+import pytest
+
+from datascience_bot.cli import moderate_comments
+from datascience_bot.cli.moderate_comments import moderate_comment
+from datascience_bot.cursor import read_cursor
+
+from fixtures import action_ledger, state_dir  # noqa: F401
+
+
+MODERATORS = frozenset(["vogt4nick"])
+
+
+class FakeCommentModeration:
+    def __init__(self):
+        self.removed = False
+        self.fail = False
+
+    def remove(self, spam=False):
+        if self.fail:
+            raise RuntimeError("503")
+        self.removed = True
+
+
+def make_comment(body, author="b3405920", approved=False):
+    return SimpleNamespace(
+        id="abc123",
+        fullname="t1_abc123",
+        body=body,
+        author=None if author is None else SimpleNamespace(name=author),
+        approved=approved,
+        subreddit=SimpleNamespace(display_name="datascience_bot_dev"),
+        permalink="/r/datascience_bot_dev/comments/xyz/_/abc123/",
+        mod=FakeCommentModeration(),
+    )
+
+
+@pytest.mark.parametrize(
+    "body,removed",
+    [
+        ("Check out [my site](https://www.pornhub.com/view_video.php?id=1)", True),
+        ("Answers at xvideos.com/q/1", True),
+        ("This video explains it: https://youtu.be/dQw4w9WgXcQ", False),
+        ("Try towardsdatascience.com, then read setup.py", False),
+        ("I have a question", False),
+    ],
+)
+def test__remove_spam_links(body, removed):
+    comment = make_comment(body)
+
+    assert moderate_comment(comment, MODERATORS) == removed
+    assert comment.mod.removed == removed
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"author": "VOGT4NICK"}, {"approved": True}, {"author": None}]
+)
+def test__leave_vouched_for_comments(kwargs):
+    comment = make_comment("https://www.pornhub.com/", **kwargs)
+
+    assert not moderate_comment(comment, MODERATORS)
+    assert not comment.mod.removed
+
+
+def test__main_saves_the_cursor_and_fails(monkeypatch):
+    comments = []
+    for index, body in enumerate(["hi", "xvideos.com/q/1", "hi"]):
+        comment = make_comment(body)
+        comment.id = f"c{index}"
+        comment.fullname = f"t1_c{index}"
+        comment.created_utc = 1570000000.0 + index
+        comments.insert(0, comment)  # newest first
+    comments[1].mod.fail = True
+    subreddit = SimpleNamespace(comments=lambda limit: comments)
+    reddit = SimpleNamespace(subreddit=lambda display_name: subreddit)
+    monkeypatch.setenv("SUBREDDIT_NAME", "datascience_bot_dev")
+    monkeypatch.setattr(moderate_comments, "get_datascience_bot", lambda: reddit)
+    monkeypatch.setattr(moderate_comments, "check_modlog", lambda subreddit: None)
+    monkeypatch.setattr(
+        moderate_comments, "get_moderators", lambda subreddit: MODERATORS
+    )
+
+    with pytest.raises(RuntimeError):
+        moderate_comments.main()
+
+    assert read_cursor("datascience_bot_dev.comments")["fullname"] == "t1_c0"
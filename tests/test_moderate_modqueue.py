@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import os
+import pathlib
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from datascience_bot import state
+from datascience_bot.cache import TTLCache
+from datascience_bot.cli import moderate_modqueue
+
+from fixtures import state_dir  # noqa: F401
+
+
+class FakeCore:
+    def request(self, method, path, **kwargs):
+        pass
+
+
+class FakeQueue:
+    """A mod listing; removed items drop out of it, like on reddit"""
+
+    def __init__(self, count):
+        self.items = [
+            SimpleNamespace(fullname=f"t3_{i}", removed=False) for i in range(count)
+        ]
+        self.pages = 0
+
+    def __call__(self, only, limit, params):
+        self.pages += 1
+        items = [item for item in self.items if not item.removed]
+        fullnames = [item.fullname for item in items]
+        start = 0
+        if params.get("after") in fullnames:
+            start = fullnames.index(params["after"]) + 1
+        elif params.get("after"):
+            start = len(items)
+        return iter(items[start : start + limit])
+
+
+@pytest.fixture(autouse=True)
+def seen(monkeypatch):
+    monkeypatch.setattr(moderate_modqueue, "SEEN", TTLCache())
+    monkeypatch.setattr(moderate_modqueue, "BATCH_SIZE", 10)
+
+
+@pytest.fixture
+def evaluated(monkeypatch):
+    evaluated = []
+
+    def evaluate(item):
+        evaluated.append(item.fullname)
+        # remove every third submission
+        item.removed = int(item.fullname[3:]) % 3 == 0
+        return item.removed
+
+    monkeypatch.setattr(moderate_modqueue, "evaluate", evaluate)
+    return evaluated
+
+
+def make_subreddit(queue):
+    mod = SimpleNamespace(modqueue=queue)
+    return SimpleNamespace(display_name="datascience_bot_dev", mod=mod)
+
+
+def test__pages_through_the_whole_queue(evaluated):
+    queue = FakeQueue(35)
+    reddit = SimpleNamespace(_core=FakeCore())
+
+    counts = moderate_modqueue.moderate_queue(reddit, make_subreddit(queue), "modqueue")
+
+    # removals shift the listing, but no submission is missed
+    assert sorted(evaluated) == sorted(item.fullname for item in queue.items)
+    assert counts == {"checked": 35, "handled": 12, "skipped": 0, "complete": 1}
+    assert state.read_state("datascience_bot_dev.modqueue.cursor") == {}
+
+
+def test__skips_seen_submissions(evaluated):
+    queue = FakeQueue(25)
+    reddit = SimpleNamespace(_core=FakeCore())
+    moderate_modqueue.moderate_queue(reddit, make_subreddit(queue), "modqueue")
+    evaluated.clear()
+
+    counts = moderate_modqueue.moderate_queue(reddit, make_subreddit(queue), "modqueue")
+
+    assert evaluated == []
+    assert counts == {"checked": 0, "handled": 0, "skipped": 16, "complete": 1}
+
+
+def test__resumes_from_cursor_after_deadline(evaluated, monkeypatch):
+    queue = FakeQueue(35)
+    reddit = SimpleNamespace(_core=FakeCore())
+    # the deadline passes after two pages
+    clock = SimpleNamespace(time=lambda: 100 if queue.pages >= 2 else 0)
+    monkeypatch.setattr(moderate_modqueue, "time", clock)
+
+    counts = moderate_modqueue.moderate_queue(
+        reddit, make_subreddit(queue), "modqueue", deadline=50
+    )
+
+    assert counts["checked"] == 20
+    assert counts["complete"] == 0
+    assert state.read_state("datascience_bot_dev.modqueue.cursor") == {"after": "t3_19"}
+
+    evaluated.clear()
+    counts = moderate_modqueue.moderate_queue(reddit, make_subreddit(queue), "modqueue")
+
+    assert sorted(evaluated) == [f"t3_{i}" for i in range(20, 35)]
+    assert counts["complete"] == 1
+
+
+def test__import_does_not_touch_state(tmp_path):
+    # SEEN and AUTHOR_CACHE read their state files on first use
+    import_dir = tmp_path / "state"
+    root = pathlib.Path(__file__).resolve().parents[1]
+    subprocess.run(
+        [sys.executable, "-c", "import datascience_bot.cli.moderate_modqueue"],
+        cwd=root,
+        env={**os.environ, "DATASCIENCE_BOT_STATE_DIR": str(import_dir)},
+        check=True,
+    )
+
+    assert not import_dir.exists()
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+import praw
+import prawcore
+import pytest
+
+from datascience_bot.cli import moderate_stream, moderate_submissions
+from datascience_bot.cursor import read_cursor, write_cursor
+
+from fixtures import action_ledger, state_dir  # noqa: F401
+
+
+CURSOR_NAME = "datascience_bot_dev.new"
+
+
+class StopStreaming(Exception):
+    """Ends the otherwise endless reconnect loop of a test"""
+
+
+class FakeSubreddit:
+    """Subreddit whose stream plays one list of events per connection
+
+    Events are submissions, exceptions to raise, or numbers of seconds to
+    advance the clock by.
+    """
+
+    def __init__(self, connections, clock=None):
+        self.connections = list(connections)
+        self.clock = clock
+        self.skip_existing = []
+        self.stream = SimpleNamespace(submissions=self.submissions)
+
+    def submissions(self, skip_existing=False):
+        self.skip_existing.append(skip_existing)
+        for event in self.connections.pop(0):
+            if isinstance(event, Exception):
+                raise event
+            if isinstance(event, (int, float)):
+                self.clock.now += event
+            else:
+                yield event
+
+
+def make_submission(id, created_utc):
+    return SimpleNamespace(id=id, fullname=f"t3_{id}", created_utc=created_utc)
+
+
+class FakeAuthorCache:
+    def __init__(self):
+        self.saves = 0
+
+    def save(self):
+        self.saves += 1
+
+
+@pytest.fixture(autouse=True)
+def author_cache(monkeypatch):
+    author_cache = FakeAuthorCache()
+    monkeypatch.setattr(moderate_stream, "AUTHOR_CACHE", author_cache)
+    return author_cache
+
+
+@pytest.fixture
+def moderated(monkeypatch):
+    moderated = []
+
+    def evaluate(submission):
+        moderated.append(submission.id)
+        if submission.id == "bad":
+            raise praw.exceptions.APIException(
+                "RATELIMIT", "you are doing that too much", "ratelimit"
+            )
+        return False
+
+    monkeypatch.setattr(moderate_submissions, "evaluate", evaluate)
+    monkeypatch.setattr(moderate_submissions, "report_repost", lambda submission: False)
+    return moderated
+
+
+def test__fresh_start_skips_existing(moderated):
+    subreddit = FakeSubreddit([[make_submission("a", 1), make_submission("b", 2)]])
+
+    moderate_stream.stream_submissions(subreddit, CURSOR_NAME)
+
+    assert subreddit.skip_existing == [True]
+    assert moderated == ["a", "b"]
+    assert read_cursor(CURSOR_NAME)["fullname"] == "t3_b"
+
+
+def test__resume_drops_what_the_cursor_has_seen(moderated):
+    write_cursor(CURSOR_NAME, make_submission("b", 2))
+    subreddit = FakeSubreddit(
+        [
+            [
+                make_submission("a", 1),
+                make_submission("b", 2),
+                make_submission("c", 2),  # posted in the same second
+                make_submission("d", 3),
+                make_submission("c", 2),  # repeated by the stream
+            ]
+        ]
+    )
+
+    moderate_stream.stream_submissions(subreddit, CURSOR_NAME)
+
+    assert subreddit.skip_existing == [False]
+    assert moderated == ["c", "d"]
+    assert read_cursor(CURSOR_NAME)["fullname"] == "t3_d"
+
+
+def test__failed_submission_is_passed_over(moderated):
+    subreddit = FakeSubreddit([[make_submission("bad", 1), make_submission("good", 2)]])
+
+    moderate_stream.stream_submissions(subreddit, CURSOR_NAME)
+
+    assert moderated == ["bad", "good"]
+    assert read_cursor(CURSOR_NAME)["fullname"] == "t3_good"
+
+
+def test__streamed_submissions_are_not_moderated_again(moderated):
+    subreddit = FakeSubreddit([[make_submission("a", 1)]])
+
+    moderate_stream.stream_submissions(subreddit, CURSOR_NAME)
+    # e.g. the catch-up run after a reconnect
+    moderate_submissions.moderate_submission(make_submission("a", 1))
+
+    assert moderated == ["a"]
+
+
+def test__author_cache_is_saved_while_streaming(moderated, author_cache, monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(
+        moderate_stream, "time", SimpleNamespace(monotonic=lambda: clock.now)
+    )
+    interval = moderate_stream.AUTHOR_CACHE_SAVE_INTERVAL
+    subreddit = FakeSubreddit(
+        [
+            [
+                make_submission("a", 1),
+                interval - 1,
+                make_submission("b", 2),
+                1,
+                make_submission("c", 3),
+                make_submission("d", 4),
+            ]
+        ],
+        clock=clock,
+    )
+
+    moderate_stream.stream_submissions(subreddit, CURSOR_NAME)
+
+    # once the interval passed, and once when the stream ended
+    assert author_cache.saves == 2
+
+
+def test__reconnect_with_backoff(moderated, monkeypatch):
+    clock = SimpleNamespace(now=0.0, sleeps=[])
+
+    def sleep(seconds):
+        clock.sleeps.append(seconds)
+        clock.now += seconds
+
+    lost = prawcore.exceptions.PrawcoreException("connection reset")
+    subreddit = FakeSubreddit(
+        [
+            [lost],
+            [make_submission("a", 1), lost],
+            # a healthy connection resets the backoff
+            [make_submission("b", 2), moderate_stream.MAX_BACKOFF + 1, lost],
+            [lost],
+            [StopStreaming()],
+        ],
+        clock=clock,
+    )
+    catch_ups = []
+    reddit = SimpleNamespace(subreddit=lambda display_name: subreddit)
+    monkeypatch.setattr(moderate_stream, "get_datascience_bot", lambda: reddit)
+    monkeypatch.setattr(
+        moderate_stream.moderate_submissions, "main", lambda: catch_ups.append(1)
+    )
+    monkeypatch.setattr(
+        moderate_stream,
+        "time",
+        SimpleNamespace(monotonic=lambda: clock.now, sleep=sleep),
+    )
+
+    with pytest.raises(StopStreaming):
+        moderate_stream.main()
+
+    assert clock.sleeps == [1, 2, 1, 2]
+    assert len(catch_ups) == 5
+    assert subreddit.skip_existing == [True, True, False, False, False]
+    assert moderated == ["a", "b"]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from datascience_bot import moderators
+
+from fixtures import state_dir  # noqa: F401
+
+
+class FakeSubreddit:
+    display_name = "datascience_bot_dev"
+
+    def __init__(self, names, log=()):
+        self.names = names
+        self.count_requests = 0
+        self.mod = SimpleNamespace(log=lambda limit: iter(log))
+
+    def moderator(self):
+        self.count_requests += 1
+        return [SimpleNamespace(name=name) for name in self.names]
+
+
+@pytest.fixture(autouse=True)
+def moderator_cache(monkeypatch):
+    monkeypatch.setattr(moderators, "_cache", None)
+
+
+def test__is_moderator_uses_cache():
+    subreddit = FakeSubreddit(["datascience-bot", "vogt4nick"])
+
+    assert moderators.is_moderator(subreddit, "Vogt4Nick")
+    assert moderators.is_moderator(subreddit, SimpleNamespace(name="datascience-bot"))
+    assert not moderators.is_moderator(subreddit, "SubstantialStrain6")
+    assert not moderators.is_moderator(subreddit, None)
+    assert subreddit.count_requests == 1
+
+
+def test__cache_persists_across_processes(monkeypatch):
+    subreddit = FakeSubreddit(["vogt4nick"])
+    moderators.get_moderators(subreddit)
+
+    monkeypatch.setattr(moderators, "_cache", None)  # e.g. a warm Lambda
+    moderators.get_moderators(subreddit)
+
+    assert subreddit.count_requests == 1
+
+
+def test__cache_expires(monkeypatch):
+    subreddit = FakeSubreddit(["vogt4nick"])
+    moderators.get_moderators(subreddit)
+
+    monkeypatch.setattr(moderators, "MODERATOR_CACHE_TTL", 0)
+    moderators.get_moderators(subreddit)
+
+    assert subreddit.count_requests == 2
+
+
+def test__check_modlog_invalidates():
+    subreddit = FakeSubreddit(["vogt4nick"])
+    moderators.get_moderators(subreddit)
+
+    subreddit.names = ["vogt4nick", "b3405920"]
+    subreddit.mod = SimpleNamespace(
+        log=lambda limit: iter(
+            [SimpleNamespace(action="addmoderator", created_utc=time.time() + 1)]
+        )
+    )
+
+    assert moderators.check_modlog(subreddit)
+    assert moderators.is_moderator(subreddit, "b3405920")
+    assert subreddit.count_requests == 2
+
+
+def test__check_modlog_ignores_old_changes():
+    subreddit = FakeSubreddit(
+        ["vogt4nick"],
+        log=[SimpleNamespace(action="addmoderator", created_utc=time.time() - 60)],
+    )
+    moderators.get_moderators(subreddit)
+
+    assert not moderators.check_modlog(subreddit)
+    assert subreddit.count_requests == 1
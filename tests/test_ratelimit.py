@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from datascience_bot import ratelimit
+from datascience_bot.ratelimit import Priority, PriorityRateLimiter
+
+
+@pytest.mark.parametrize(
+    "method, url, expected",
+    [
+        ("POST", "https://oauth.reddit.com/api/remove/", Priority.REMOVE),
+        ("POST", "https://oauth.reddit.com/api/approve/", Priority.REMOVE),
+        ("POST", "https://oauth.reddit.com/api/distinguish/", Priority.DISTINGUISH),
+        ("POST", "https://oauth.reddit.com/r/ds/api/flair/", Priority.DISTINGUISH),
+        ("GET", "https://oauth.reddit.com/r/ds/new?limit=100", Priority.READ),
+        ("POST", "https://oauth.reddit.com/api/comment/", Priority.REPLY),
+        ("GET", "https://oauth.reddit.com/r/ds/wiki/index", Priority.WIKI),
+        ("POST", "https://oauth.reddit.com/r/ds/api/wiki/edit/", Priority.WIKI),
+    ],
+)
+def test__classify(method, url, expected):
+    assert ratelimit.classify(method, url) == expected
+
+
+def test__priority_overrides_endpoint():
+    url = "https://oauth.reddit.com/api/distinguish/"
+    with ratelimit.priority(Priority.WIKI):
+        assert ratelimit.classify("POST", url) == Priority.WIKI
+    assert ratelimit.classify("POST", url) == Priority.DISTINGUISH
+
+
+def headers(remaining, reset):
+    return {"x-ratelimit-remaining": str(remaining), "x-ratelimit-reset": str(reset)}
+
+
+def test__surplus_quota_is_spent_right_away():
+    limiter = PriorityRateLimiter()
+    limiter.update(headers(remaining=600, reset=600))
+
+    started_at = time.monotonic()
+    for _ in range(100):
+        limiter.acquire()
+    assert time.monotonic() - started_at < 0.5
+
+
+def test__queued_requests_go_out_by_priority():
+    limiter = PriorityRateLimiter()
+    # the quota is spent until the window resets
+    limiter.update(headers(remaining=0, reset=0.2))
+
+    order = []
+    lock = threading.Lock()
+
+    def request(level):
+        limiter.acquire(level)
+        with lock:
+            order.append(level)
+
+    levels = [Priority.WIKI, Priority.REPLY, Priority.READ, Priority.REMOVE]
+    threads = [threading.Thread(target=request, args=(level,)) for level in levels]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)  # queue them in this order
+    for thread in threads:
+        thread.join()
+
+    assert order == sorted(levels)
+
+
+def test__low_quota_is_spread_over_the_window():
+    limiter = PriorityRateLimiter()
+    limiter.update(headers(remaining=3, reset=60))
+
+    assert limiter.rate == pytest.approx(3 / 60)
+    assert limiter.tokens == 0
+
+
+def response(status, **headers):
+    return SimpleNamespace(status_code=status, headers=headers)
+
+
+def test__call_retries_429():
+    sleeps = []
+    limiter = PriorityRateLimiter(sleep=sleeps.append)
+    responses = [response(429), response(429), response(200)]
+    calls = []
+
+    def request_function(method, url, **kwargs):
+        calls.append(kwargs["headers"])
+        return responses[len(calls) - 1]
+
+    result = limiter.call(
+        request_function,
+        lambda: {"Authorization": f"bearer {len(calls)}"},
+        "POST",
+        "https://oauth.reddit.com/api/remove/",
+        data={},
+    )
+
+    assert result.status_code == 200
+    # every attempt gets fresh headers
+    assert calls == [{"Authorization": f"bearer {i}"} for i in range(3)]
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= ratelimit.BACKOFF
+    assert 0 <= sleeps[1] <= ratelimit.BACKOFF * 2
+
+
+def test__call_gives_up_after_max_retries():
+    limiter = PriorityRateLimiter(sleep=lambda seconds: None)
+    calls = []
+
+    def request_function(method, url, **kwargs):
+        calls.append(url)
+        return response(429)
+
+    result = limiter.call(
+        request_function, dict, "GET", "https://oauth.reddit.com/r/ds/new"
+    )
+
+    assert result.status_code == 429
+    assert len(calls) == ratelimit.MAX_RETRIES + 1
+
+
+def test__call_leaves_5xx_to_prawcore():
+    limiter = PriorityRateLimiter(sleep=lambda seconds: None)
+    calls = []
+
+    def request_function(method, url, **kwargs):
+        calls.append(url)
+        return response(503)
+
+    result = limiter.call(
+        request_function, dict, "GET", "https://oauth.reddit.com/r/ds/new"
+    )
+
+    assert result.status_code == 503
+    assert len(calls) == 1
+
+
+def test__install_replaces_rate_limiter_once():
+    reddit = SimpleNamespace(_core=SimpleNamespace(_rate_limiter=object()))
+
+    limiter = ratelimit.install(reddit)
+
+    assert reddit._core._rate_limiter is limiter
+    assert ratelimit.install(reddit) is limiter
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+import praw
+import pytest
+
+from datascience_bot.cli import refresh_weekly_thread
+
+from fixtures import action_ledger  # noqa: F401
+
+
+class FakeMod:
+    def __init__(self, thing):
+        self.thing = thing
+
+    def _record(self, action):
+        self.thing.reddit.actions.append((self.thing.id, action))
+
+    def flair(self, text):
+        self._record("flair")
+
+    def approve(self):
+        self._record("approve")
+
+    def distinguish(self, how="yes", sticky=False):
+        if self.thing.reddit.failures.get("distinguish"):
+            self.thing.reddit.failures["distinguish"] -= 1
+            raise RuntimeError("503")
+        self._record("distinguish")
+
+    def sticky(self, state=True, bottom=True):
+        self._record("sticky" if state else "unsticky")
+        self.thing.stickied = state
+
+
+class FakeForest(list):
+    """Top-level comments of a submission, some behind "load more comments"
+    """
+
+    def replace_more(self, limit):
+        for index, item in reversed(list(enumerate(self))):
+            if isinstance(item, praw.models.MoreComments) and limit:
+                self[index : index + 1] = item.expanded
+                limit -= 1
+        return [item for item in self if isinstance(item, praw.models.MoreComments)]
+
+    def list(self):
+        items, queue = [], list(self)
+        while queue:
+            item = queue.pop(0)
+            items.append(item)
+            queue.extend(getattr(item, "_replies", None) or [])
+        return items
+
+
+class FakeSubmission(SimpleNamespace):
+    def __init__(self, reddit, id, title, stickied=False, comments=()):
+        super().__init__(
+            reddit=reddit,
+            id=id,
+            title=title,
+            stickied=stickied,
+            author="datascience-bot",
+            subreddit=reddit.sub,
+            permalink=f"/r/datascience_bot_dev/comments/{id}/",
+            comments=FakeForest(comments),
+        )
+        self.mod = FakeMod(self)
+
+    @property
+    def fullname(self):
+        return f"t3_{self.id}"
+
+
+class FakeSubreddit:
+    display_name = "datascience_bot_dev"
+
+    def __init__(self, reddit):
+        self._reddit = reddit
+
+    def hot(self, limit):
+        things = self._reddit.things.values()
+        return [thing for thing in things if thing.stickied][:limit]
+
+    def submit(self, title, selftext, send_replies):
+        submission = FakeSubmission(
+            self._reddit, f"new{len(self._reddit.things)}", title
+        )
+        self._reddit.things[submission.fullname] = submission
+        self._reddit.actions.append((submission.id, "submit"))
+        return submission
+
+
+class FakeReddit:
+    def __init__(self):
+        self._core = SimpleNamespace(request=lambda *args, **kwargs: None)
+        self.config = SimpleNamespace(kinds={"comment": "t1", "more": "more"})
+        self.sub = FakeSubreddit(self)
+        self.things = {}
+        self.actions = []
+        self.replies = {}
+        self.failures = {}  # times an action fails before it succeeds
+        self.ratelimits = []  # messages of RATELIMIT errors for the next replies
+
+    def subreddit(self, display_name=None):
+        return self.sub
+
+    def submission(self, id):
+        return self.things[f"t3_{id}"]
+
+    def info(self, fullnames):
+        return [self.things[name] for name in fullnames if name in self.things]
+
+    def post(self, path, data):
+        # Comment.reply
+        if self.ratelimits:
+            raise praw.exceptions.APIException(
+                "RATELIMIT", self.ratelimits.pop(0), "ratelimit"
+            )
+        reply = FakeSubmission(self, f"r{len(self.actions)}", "")
+        self.replies[reply.id] = reply
+        self.actions.append((data["thing_id"], "reply"))
+        return [reply]
+
+    def comment(self, id):
+        return self.replies[id]
+
+
+def make_comment(reddit, id, parent_id, replies=()):
+    comment = praw.models.Comment(
+        reddit, _data={"id": id, "parent_id": parent_id, "body": "?"}
+    )
+    comment._replies = list(replies)
+    return comment
+
+
+def make_more(reddit, parent_id, expanded=()):
+    more = praw.models.MoreComments(
+        reddit, _data={"id": "more", "parent_id": parent_id, "count": 1}
+    )
+    more.expanded = list(expanded)
+    return more
+
+
+@pytest.fixture
+def reddit(monkeypatch):
+    reddit = FakeReddit()
+    old_thread = FakeSubmission(
+        reddit,
+        "old",
+        "Weekly Entering & Transitioning Thread | 08 Sep 2019 - 15 Sep 2019",
+        stickied=True,
+    )
+    old_thread.comments.extend(
+        [
+            make_comment(reddit, "c1", "t3_old"),
+            make_comment(
+                reddit, "c2", "t3_old", replies=[make_comment(reddit, "c3", "t1_c2")]
+            ),
+        ]
+    )
+    reddit.things[old_thread.fullname] = old_thread
+    monkeypatch.setattr(refresh_weekly_thread, "get_datascience_bot", lambda: reddit)
+    monkeypatch.setattr(refresh_weekly_thread.time, "sleep", lambda seconds: None)
+    return reddit
+
+
+def fail_once(monkeypatch, name):
+    func = getattr(refresh_weekly_thread, name)
+    calls = []
+
+    def flaky(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("Task timed out")
+        return func(*args, **kwargs)
+
+    monkeypatch.setattr(refresh_weekly_thread, name, flaky)
+
+
+def test__refresh(reddit):
+    refresh_weekly_thread.main(validate=False)
+
+    new_thread = reddit.things["t3_new1"]
+    assert new_thread.stickied and not reddit.things["t3_old"].stickied
+    assert ("t1_c1", "reply") in reddit.actions
+    assert ("t1_c2", "reply") not in reddit.actions
+
+
+@pytest.mark.parametrize("validate", [True, False])
+def test__retry_resumes_with_the_recorded_old_thread(reddit, monkeypatch, validate):
+    validated = []
+
+    def validate_task(reddit):
+        # the stickied thread is the new one by now, which is too young
+        validated.append(1)
+        if len(validated) > 1:
+            raise refresh_weekly_thread.InvalidTaskError("Too soon")
+
+    monkeypatch.setattr(refresh_weekly_thread, "validate_task", validate_task)
+    fail_once(monkeypatch, "direct_unanswered_comments_to_weekly_thread")
+
+    with pytest.raises(RuntimeError):
+        refresh_weekly_thread.main(validate=validate)
+    assert reddit.things["t3_new1"].stickied
+
+    refresh_weekly_thread.main(validate=validate)
+
+    assert len(validated) == int(validate)
+    assert reddit.things["t3_new1"].stickied
+    assert reddit.actions.count(("old", "unsticky")) == 1
+    assert ("new1", "unsticky") not in reddit.actions
+    assert reddit.actions.count(("new1", "submit")) == 1
+    assert reddit.actions.count(("t1_c1", "reply")) == 1
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_000_000.0, sleeps=[])
+
+    def sleep(seconds):
+        clock.sleeps.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(
+        refresh_weekly_thread,
+        "time",
+        SimpleNamespace(
+            time=lambda: clock.now, monotonic=lambda: clock.now, sleep=sleep
+        ),
+    )
+    return clock
+
+
+def test__find_unanswered_comments(monkeypatch):
+    reddit = FakeReddit()
+    thread = FakeSubmission(reddit, "old", "")
+    thread.comments.extend(
+        [
+            make_comment(reddit, "c1", "t3_old"),
+            make_comment(
+                reddit, "c2", "t3_old", replies=[make_comment(reddit, "c3", "t1_c2")]
+            ),
+            # replies we haven't loaded are still replies
+            make_comment(reddit, "c4", "t3_old", replies=[make_more(reddit, "t1_c4")]),
+            make_more(reddit, "t3_old", [make_comment(reddit, "c5", "t3_old")]),
+            make_more(
+                reddit,
+                "t3_old",
+                [
+                    make_comment(reddit, "c6", "t3_old"),
+                    make_comment(
+                        reddit,
+                        "c7",
+                        "t3_old",
+                        replies=[make_comment(reddit, "c8", "t1_c7")],
+                    ),
+                ],
+            ),
+        ]
+    )
+    monkeypatch.setattr(refresh_weekly_thread, "REPLACE_MORE_LIMIT", 1)
+
+    comments = refresh_weekly_thread.find_unanswered_comments(thread)
+
+    # only the last "load more comments" link was expanded
+    assert [comment.id for comment in comments] == ["c1", "c6"]
+
+
+def test__rate_limited_replies_wait_and_retry(reddit, clock):
+    reddit.things["t3_new"] = FakeSubmission(reddit, "new", "")
+    reddit.ratelimits = [
+        "Looks like you've been doing that a lot. "
+        "Take a break for 5 minutes before trying again."
+    ]
+
+    refresh_weekly_thread.direct_unanswered_comments_to_weekly_thread(
+        reddit, "old", "new"
+    )
+
+    assert clock.sleeps == [301]
+    assert reddit.actions.count(("t1_c1", "reply")) == 1
+
+
+def test__rate_limit_past_the_deadline_fails(reddit, clock):
+    reddit.things["t3_new"] = FakeSubmission(reddit, "new", "")
+    reddit.ratelimits = ["Take a break for 5 minutes before trying again."]
+
+    with pytest.raises(praw.exceptions.APIException):
+        refresh_weekly_thread.direct_unanswered_comments_to_weekly_thread(
+            reddit, "old", "new", deadline=clock.now + 60
+        )
+
+    assert clock.sleeps == []
+    assert ("t1_c1", "reply") not in reddit.actions
+
+
+def test__failed_distinguish_does_not_reply_twice(reddit):
+    reddit.things["t3_new"] = FakeSubmission(reddit, "new", "")
+    reddit.failures["distinguish"] = 1
+
+    with pytest.raises(RuntimeError):
+        refresh_weekly_thread.direct_unanswered_comments_to_weekly_thread(
+            reddit, "old", "new"
+        )
+    refresh_weekly_thread.direct_unanswered_comments_to_weekly_thread(
+        reddit, "old", "new"
+    )
+
+    assert reddit.actions.count(("t1_c1", "reply")) == 1
+    assert len([action for action in reddit.actions if action[1] == "distinguish"]) == 1
+
+
+@pytest.mark.parametrize("ready_after", [1, 3])
+def test__wait_for_weekly_thread(reddit, clock, ready_after):
+    thread = reddit.things["t3_old"]
+    thread.stickied = False
+    polls = []
+
+    def info(fullnames):
+        polls.append(fullnames)
+        thread.stickied = len(polls) >= ready_after
+        return [thread]
+
+    reddit.info = info
+
+    assert refresh_weekly_thread.wait_for_weekly_thread(reddit, thread, timeout=30)
+    assert len(polls) == ready_after
+    assert clock.sleeps == [0.5, 0.75][: ready_after - 1]
+
+
+def test__wait_for_weekly_thread_times_out(reddit, clock):
+    thread = reddit.things["t3_old"]
+    thread.stickied = False
+
+    assert not refresh_weekly_thread.wait_for_weekly_thread(reddit, thread, timeout=5)
+    assert sum(clock.sleeps) == pytest.approx(5)
+
+
+def test__wait_is_cut_short_by_the_deadline(reddit, clock, monkeypatch):
+    waits = []
+
+    def wait_for_weekly_thread(reddit, submission, timeout):
+        waits.append(timeout)
+        return False
+
+    monkeypatch.setattr(
+        refresh_weekly_thread, "wait_for_weekly_thread", wait_for_weekly_thread
+    )
+
+    # less time left than DEADLINE_MARGIN
+    refresh_weekly_thread.main(validate=False, deadline=clock.now + 10)
+
+    assert waits == [0]
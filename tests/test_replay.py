@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import json
+import sqlite3
+
+import pytest
+
+from datascience_bot import moderators, rules, state
+from datascience_bot.remove_trolls import classify_karma
+from datascience_bot.replay import Policy, Report, replay
+
+from fixtures import state_dir  # noqa: F401
+
+
+SUBMISSIONS = [
+    {"id": "video", "url": "https://youtu.be/abc", "author": "newbie"},
+    {"id": "blog", "url": "https://blog.medium.com/post", "author": "regular"},
+    {"id": "troll", "url": "https://example.com", "author": "Troll"},
+    {"id": "newbie", "url": "https://example.com", "author": "newbie"},
+    {
+        "id": "approved",
+        "url": "https://example.com",
+        "author": "newbie",
+        "approved": True,
+    },
+    {"id": "mod", "url": "https://example.com", "author": "Mod"},
+    {"id": "regular", "url": "https://example.com", "author": "regular"},
+    {"id": "unknown", "url": "https://example.com", "author": "stranger"},
+    {"id": "deleted", "url": "https://example.com", "author": None},
+]
+AUTHORS = [
+    {"name": "troll", "link_karma": -20, "comment_karma": 5},
+    {"name": "newbie", "link_karma": 10, "comment_karma": 40},
+    {"name": "regular", "link_karma": 90, "comment_karma": 10},
+    {"name": "mod", "link_karma": 0, "comment_karma": 0},
+]
+CURRENT = {
+    "video": "spam:video",
+    "blog": "spam:blog",
+    "troll": "troll:spam",
+    "newbie": "troll:underqualified",
+    "approved": None,
+    "mod": None,
+    "regular": None,
+    "unknown": None,
+    "deleted": None,
+}
+
+
+@pytest.fixture(autouse=True)
+def moderator_cache(monkeypatch):
+    monkeypatch.setattr(moderators, "_cache", None)
+
+
+@pytest.mark.parametrize(
+    "karma, expected",
+    [
+        (-11, "spam"),
+        (-10, "spam"),
+        (-9, "underqualified"),
+        (50, "underqualified"),
+        (51, None),
+    ],
+)
+def test__classify_karma(karma, expected):
+    assert classify_karma(karma) == expected
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    return path
+
+
+@pytest.fixture
+def jsonl_dump(tmp_path):
+    return (
+        write_jsonl(tmp_path / "submissions.jsonl", SUBMISSIONS),
+        write_jsonl(tmp_path / "authors.jsonl", AUTHORS),
+    )
+
+
+@pytest.fixture
+def sqlite_dump(tmp_path):
+    path = tmp_path / "dump.db"
+    connection = sqlite3.connect(str(path))
+    connection.execute("CREATE TABLE submissions (id, url, author, approved)")
+    connection.execute("CREATE TABLE authors (name, link_karma, comment_karma)")
+    connection.executemany(
+        "INSERT INTO submissions VALUES (?, ?, ?, ?)",
+        [(s["id"], s["url"], s["author"], s.get("approved", 0)) for s in SUBMISSIONS],
+    )
+    connection.executemany(
+        "INSERT INTO authors VALUES (?, ?, ?)",
+        [(a["name"], a["link_karma"], a["comment_karma"]) for a in AUTHORS],
+    )
+    connection.commit()
+    connection.close()
+    return path
+
+
+def test__replay_jsonl(jsonl_dump):
+    submissions, authors = jsonl_dump
+    policy = Policy(moderators=["mod"])
+
+    decisions = list(replay(submissions, [policy], authors_path=authors, workers=0))
+
+    assert [decision["id"] for decision in decisions] == list(CURRENT)
+    assert {d["id"]: d["decisions"]["current"] for d in decisions} == CURRENT
+
+
+def test__replay_sqlite(sqlite_dump):
+    policy = Policy(moderators=["mod"])
+
+    decisions = list(replay(sqlite_dump, [policy], workers=0, chunk_size=2))
+
+    assert {d["id"]: d["decisions"]["current"] for d in decisions} == CURRENT
+
+
+def test__replay_process_pool_keeps_order(jsonl_dump):
+    submissions, authors = jsonl_dump
+    policy = Policy(moderators=["mod"])
+
+    decisions = list(
+        replay(submissions, [policy], authors_path=authors, workers=2, chunk_size=2)
+    )
+
+    assert [(d["id"], d["decisions"]["current"]) for d in decisions] == list(
+        CURRENT.items()
+    )
+
+
+def test__report_diffs_policies(jsonl_dump, tmp_path):
+    submissions, authors = jsonl_dump
+    proposed_path = tmp_path / "proposed.json"
+    proposed_path.write_text(
+        json.dumps(
+            {
+                "min_karma": 100,
+                "domains": {"video": ["youtu.be"]},
+                "moderators": ["mod"],
+            }
+        )
+    )
+    policies = [Policy(moderators=["mod"]), Policy.from_file(proposed_path)]
+    report = Report(policies)
+
+    changed = [
+        decision["id"]
+        for decision in replay(submissions, policies, authors_path=authors, workers=0)
+        if report.add(decision)
+    ]
+
+    assert changed == ["blog", "regular"]
+    summary = report.summary()
+    assert summary["records"] == len(SUBMISSIONS)
+    assert summary["changes"] == {
+        "spam:blog -> troll:underqualified": 1,
+        "keep -> troll:underqualified": 1,
+    }
+    assert summary["decisions"]["proposed"]["troll:underqualified"] == 3
+
+
+def test__policy_names_must_be_unique(jsonl_dump):
+    submissions, _ = jsonl_dump
+    with pytest.raises(ValueError):
+        list(replay(submissions, [Policy(), Policy()], workers=0))
+
+
+def test__policy_keywords():
+    policy = Policy(keywords=["guaranteed job placement"], moderators=["mod"])
+    record = {
+        "id": "bootcamp",
+        "title": "Bootcamp review",
+        "selftext": "Guaranteed job placement!",
+        "author": "regular",
+    }
+
+    assert policy.decide(record) == "keywords:guaranteed job placement"
+    assert policy.decide({**record, "author": "Mod"}) is None
+    assert policy.decide({**record, "approved": True}) is None
+
+
+def test__policy_defaults_to_cached_moderators():
+    state.write_state(
+        moderators.STATE_NAME, {"datascience": {"fetched_at": 0, "moderators": ["mod"]}}
+    )
+    record = {"id": "mod", "url": "https://example.com", "author": "Mod"}
+
+    assert Policy().decide(record, {"mod": 0}) is None
+    assert Policy(moderators=[]).decide(record, {"mod": 0}) == "troll:underqualified"
+
+
+def test__policy_follows_the_submission_rules(monkeypatch):
+    record = {"id": "video", "url": "https://youtu.be/abc", "author": "newbie"}
+    authors = {"newbie": 50}
+    assert Policy().decide(record, authors) == "spam:video"
+
+    monkeypatch.setattr(
+        rules, "SUBMISSION_RULES", list(reversed(rules.SUBMISSION_RULES))
+    )
+
+    assert Policy().decide(record, authors) == "troll:underqualified"
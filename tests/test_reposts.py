@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from datascience_bot import reposts
+from datascience_bot.reposts import RepostIndex, minhash, normalize_url
+
+from fixtures import action_ledger, state_dir  # noqa: F401
+
+
+QUESTION = (
+    "I have a masters in statistics and two years of experience as an analyst. "
+    "Should I learn deep learning or focus on SQL and experimentation to land "
+    "my first data scientist job? Any advice on building a portfolio is welcome."
+)
+
+
+@pytest.fixture(autouse=True)
+def repost_index(monkeypatch):
+    monkeypatch.setattr(reposts, "REPOST_INDEX", RepostIndex())
+
+
+@pytest.mark.parametrize(
+    "url,normalized",
+    [
+        (
+            "https://www.Example.com/a/?utm_source=x&b=2&a=1#top",
+            "example.com/a?a=1&b=2",
+        ),
+        ("http://m.example.com/a?fbclid=abc", "example.com/a"),
+        ("example.com/a/", "example.com/a"),
+        ("/r/datascience/comments/abc123/", None),
+    ],
+)
+def test__normalize_url(url, normalized):
+    assert normalize_url(url) == normalized
+
+
+def test__minhash_estimates_similarity():
+    words = QUESTION.split()
+    edited = " ".join(words[:-2] + ["Thanks!"])
+
+    a, b = minhash(QUESTION), minhash(edited)
+    similarity = sum(x == y for x, y in zip(a, b)) / len(a)
+
+    assert 0.7 <= similarity < 1
+    assert minhash("Is a PhD worth it?") is None  # too short to compare
+
+
+def test__find_reposts():
+    index = RepostIndex()
+    now = time.time()
+    index.add("t3_a", now - 60, "/r/ds/comments/a/", None, QUESTION)
+    index.add("t3_b", now - 60, "/r/ds/comments/b/", "https://example.com/post", "")
+
+    assert index.find("t3_c", None, QUESTION.upper() + "!") == (
+        "t3_a",
+        "/r/ds/comments/a/",
+        1.0,
+    )
+    assert index.find("t3_c", "http://www.example.com/post/", "").fullname == "t3_b"
+    assert index.find("t3_a", None, QUESTION) is None  # never matches itself
+    assert index.find("t3_c", None, "A completely different question " * 5) is None
+
+
+def test__prune_drops_old_submissions():
+    index = RepostIndex(days=1)
+    index.add("t3_old", time.time() - 2 * 24 * 60 * 60, "/old/", None, QUESTION)
+    index.add("t3_new", time.time(), "/new/", None, "Another question " * 5)
+
+    assert index.find("t3_c", None, QUESTION) is None  # too old to count
+
+    assert index.prune() == 1
+    assert len(index) == 1
+    assert "t3_old" not in index
+
+
+class FakeSubmission(SimpleNamespace):
+    def report(self, reason):
+        self.reports.append(reason)
+
+
+def make_submission(id, selftext=QUESTION, approved=False):
+    return FakeSubmission(
+        id=id,
+        fullname=f"t3_{id}",
+        title="Career advice",
+        selftext=selftext,
+        is_self=True,
+        url=f"https://www.reddit.com/r/ds/comments/{id}/",
+        permalink=f"/r/ds/comments/{id}/",
+        created_utc=time.time(),
+        author=SimpleNamespace(name="b3405920"),
+        approved=approved,
+        removed=False,
+        reports=[],
+    )
+
+
+def test__report_repost():
+    original = make_submission("a")
+    repost = make_submission("b")
+
+    assert not reposts.report_repost(original)
+    assert reposts.report_repost(repost)
+    assert repost.reports == ["Possible repost of redd.it/a"]
+
+    # each submission is only checked once
+    assert not reposts.report_repost(repost)
+    assert len(repost.reports) == 1
+
+
+def test__approved_reposts_are_indexed_but_not_reported():
+    reposts.report_repost(make_submission("a"))
+    approved = make_submission("b", approved=True)
+
+    assert not reposts.report_repost(approved)
+    assert approved.reports == []
+    assert "t3_b" in reposts.REPOST_INDEX
+
+
+def test__fill_repost_index():
+    removed = make_submission("c", selftext="Spam " * 20)
+    removed.removed = True
+
+    count = reposts.fill_repost_index(
+        [make_submission("a"), make_submission("b"), removed],
+        exclude=[make_submission("b")],
+    )
+
+    assert count == 1
+    assert "t3_a" in reposts.REPOST_INDEX
+    assert "t3_b" not in reposts.REPOST_INDEX
+
+
+def test__fill_repost_index_stops_at_the_window():
+    old = make_submission("b", selftext="Old question " * 10)
+    old.created_utc -= (reposts.REPOST_INDEX.days + 1) * 24 * 60 * 60
+
+    def new():
+        yield make_submission("a")
+        yield old
+        raise AssertionError("listed past the window")
+
+    assert reposts.fill_repost_index(new()) == 1
+    assert "t3_b" not in reposts.REPOST_INDEX
+
+
+def test__fill_repost_index_does_not_fetch_missing_flags():
+    class LazySubmission(FakeSubmission):
+        def __getattr__(self, name):
+            raise AssertionError(f"fetched {name}")
+
+    submission = make_submission("a")
+    del submission.removed
+    lazy = LazySubmission(**vars(submission))
+
+    assert reposts.fill_repost_index([lazy]) == 1
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+from datascience_bot.rules import Rule, evaluate, is_loaded
+
+
+class Lazy(SimpleNamespace):
+    """Stands in for a PRAW object whose unloaded fields cost a request"""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"{name} is not loaded")
+
+
+def test__is_loaded():
+    item = Lazy(title="Test", author=Lazy(name="vogt4nick"))
+
+    assert is_loaded(item, "title")
+    assert is_loaded(item, "author.name")
+    assert not is_loaded(item, "selftext")
+    assert not is_loaded(item, "author.link_karma")
+    assert is_loaded(Lazy(author=None), "author.link_karma")
+
+
+def test__evaluate_cheapest_first_and_short_circuit():
+    calls = []
+
+    def action(name, handles):
+        def apply(item):
+            calls.append(name)
+            return handles
+
+        return apply
+
+    rules = [
+        Rule("expensive", action("expensive", True), fields=["selftext"], cost=5),
+        Rule("cheap", action("cheap", False), fields=["title"], cost=5),
+        Rule("free", action("free", True), fields=["title"], cost=0),
+    ]
+    item = Lazy(fullname="t3_test", title="Test")
+
+    assert evaluate(item, rules) == "free"
+    assert calls == ["cheap", "free"]  # loaded fields cost nothing; ties keep order
+
+
+def test__evaluate_unhandled():
+    rules = [Rule("noop", lambda item: False)]
+
+    assert evaluate(Lazy(fullname="t3_test"), rules) is None
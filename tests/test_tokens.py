@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from datascience_bot import tokens
+
+from fixtures import state_dir  # noqa: F401
+
+
+class FakeAuthorizer:
+    """Hands out a new token on every refresh, like the password grant"""
+
+    def __init__(self):
+        self.count_refreshes = 0
+        self.access_token = None
+        self._expiration_timestamp = None
+        self.scopes = None
+
+    def refresh(self):
+        time.sleep(0.01)
+        self.count_refreshes += 1
+        self.access_token = f"token-{id(self)}-{self.count_refreshes}"
+        self._expiration_timestamp = time.time() + 3600
+        self.scopes = {"*"}
+
+    def is_valid(self):
+        return (
+            self.access_token is not None and self._expiration_timestamp > time.time()
+        )
+
+
+def make_reddit(store):
+    reddit = SimpleNamespace(_core=SimpleNamespace(_authorizer=FakeAuthorizer()))
+    tokens.attach_token_store(reddit, store, key="client:datascience-bot")
+    return reddit
+
+
+@pytest.mark.parametrize(
+    "store_class", [tokens.MemoryTokenStore, tokens.FileTokenStore]
+)
+def test__new_sessions_reuse_stored_token(store_class):
+    store = store_class()
+    first = make_reddit(store)._core._authorizer
+    second = make_reddit(store)._core._authorizer
+
+    first.refresh()
+    second.refresh()
+
+    assert second.access_token == first.access_token
+    assert first.count_refreshes == 1
+    assert second.count_refreshes == 0
+
+
+def test__rejected_token_is_refreshed():
+    store = tokens.MemoryTokenStore()
+    authorizer = make_reddit(store)._core._authorizer
+    authorizer.refresh()
+    rejected = authorizer.access_token
+
+    authorizer.refresh()  # e.g. after a 401, the stored token is still "fresh"
+
+    assert authorizer.access_token != rejected
+    stored = store.get("client:datascience-bot")
+    assert stored["access_token"] == authorizer.access_token
+
+
+def test__expired_token_is_refreshed():
+    store = tokens.MemoryTokenStore()
+    store.set(
+        "client:datascience-bot",
+        {"access_token": "old", "expires_at": time.time() + 1, "scopes": ["*"]},
+    )
+    authorizer = make_reddit(store)._core._authorizer
+
+    authorizer.refresh()
+
+    assert authorizer.access_token != "old"
+    assert authorizer.count_refreshes == 1
+
+
+def test__concurrent_sessions_refresh_once():
+    store = tokens.FileTokenStore()
+    authorizers = [make_reddit(store)._core._authorizer for _ in range(8)]
+
+    threads = [threading.Thread(target=a.refresh) for a in authorizers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(a.count_refreshes for a in authorizers) == 1
+    assert len({a.access_token for a in authorizers}) == 1
+
+
+def test__concurrent_threads_of_one_session_refresh_once():
+    authorizer = make_reddit(tokens.FileTokenStore())._core._authorizer
+
+    threads = [threading.Thread(target=authorizer.refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert authorizer.count_refreshes == 1
+
+
+def test__token_store_is_abstract():
+    with pytest.raises(TypeError):
+        tokens.TokenStore()
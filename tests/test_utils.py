@@ -1,13 +1,16 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
 import os
+from types import SimpleNamespace
 
 import praw
 import pytest
 
+import datascience_bot
 from datascience_bot import (
     add_boilerplate,
     update,
+    get_submission_statuses,
     submission_is_deleted,
     submission_is_removed,
     get_datascience_bot,
@@ -80,6 +83,111 @@ def test__submission_is_removed():
     assert submission_is_removed(submission, mod) == True
 
 
+class FakeReddit:
+    """Answers /api/info requests without hitting reddit"""
+
+    def __init__(self):
+        self.batches = []
+
+    def info(self, fullnames):
+        self.batches.append(list(fullnames))
+        return [
+            SimpleNamespace(
+                fullname=fullname,
+                author=None if fullname == "t3_0" else "SubstantialStrain6",
+                selftext="[deleted]" if fullname == "t3_0" else "",
+                removed=fullname == "t3_1",
+                spam=False,
+                approved=False,
+            )
+            for fullname in fullnames
+        ]
+
+
+def test__get_submission_statuses():
+    reddit = FakeReddit()
+    fullnames = [f"t3_{i}" for i in range(250)]
+
+    statuses = get_submission_statuses(fullnames, reddit, max_age=0)
+
+    assert [len(batch) for batch in reddit.batches] == [100, 100, 50]
+    assert statuses["t3_0"].deleted == True
+    assert statuses["t3_1"].removed == True
+    assert statuses["t3_2"].deleted == statuses["t3_2"].removed == False
+
+    # recently fetched statuses don't hit the network again
+    get_submission_statuses(fullnames[:10], reddit)
+    assert len(reddit.batches) == 3
+
+
+def test__long_max_age_outlives_the_default(monkeypatch):
+    clock = SimpleNamespace(now=1570000000.0)
+    monkeypatch.setattr(
+        datascience_bot, "time", SimpleNamespace(time=lambda: clock.now)
+    )
+    monkeypatch.setattr(datascience_bot, "_status_memo", {})
+    reddit = FakeReddit()
+
+    get_submission_statuses(["t3_1"], reddit)
+    max_age = datascience_bot.STATUS_MAX_AGE
+    clock.now += max_age * 2
+    get_submission_statuses(["t3_1"], reddit, max_age=max_age * 3)
+
+    assert len(reddit.batches) == 1
+
+
+def test__status_does_not_fetch_missing_flags():
+    class LazySubmission(SimpleNamespace):
+        def __getattr__(self, name):
+            raise AssertionError(f"fetched to read {name}")
+
+    submission = LazySubmission(fullname="t3_1", author="b3405920", selftext="")
+
+    status = datascience_bot._get_status(submission)
+
+    assert not (status.removed or status.spam or status.approved)
+
+
+class FakeSession:
+    """Stands in for praw.Reddit, keeping the settings it was created with"""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self.config = SimpleNamespace(client_id=settings["client_id"])
+        self._core = SimpleNamespace(_rate_limiter=None)
+
+
+def test__get_reddit_reuses_sessions(monkeypatch):
+    attached = []
+    monkeypatch.setattr(datascience_bot, "_sessions", {})
+    monkeypatch.setattr(datascience_bot.praw, "Reddit", FakeSession)
+    monkeypatch.setattr(
+        datascience_bot.tokens,
+        "attach_token_store",
+        lambda reddit, store, key: attached.append((reddit, key)),
+    )
+    for name, value in [("USERNAME", "b3405920"), ("CLIENT_ID", "app")]:
+        monkeypatch.setenv(f"B3405920_{name}", value)
+    monkeypatch.setenv("B3405920_PASSWORD", "hunter2")
+
+    reddit = datascience_bot.get_reddit("b3405920")
+
+    assert datascience_bot.get_reddit("b3405920") is reddit
+    assert reddit.settings["password"] == "hunter2"
+    assert attached == [(reddit, "app:b3405920")]
+    assert isinstance(
+        reddit._core._rate_limiter, datascience_bot.ratelimit.PriorityRateLimiter
+    )
+
+    monkeypatch.setenv("B3405920_PASSWORD", "rotated")
+    rotated = datascience_bot.get_reddit("b3405920")
+
+    assert rotated is not reddit
+    assert rotated.settings["password"] == "rotated"
+    assert datascience_bot.get_reddit("b3405920") is rotated
+    assert len(attached) == 2
+
+
 def test__get_datascience_bot():
     assert isinstance(get_datascience_bot(), praw.reddit.Reddit)
 
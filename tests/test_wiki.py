@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import os
+from types import SimpleNamespace
+
+import prawcore
+import pytest
+
+from datascience_bot import wiki
+from datascience_bot.cli import update_wiki
+
+
+@pytest.fixture
+def wiki_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(wiki, "WIKI_DIR", tmp_path)
+    monkeypatch.setattr(wiki, "_pages", {})
+    (tmp_path / "index.md").write_text("# Index")
+    (tmp_path / "frequently-asked-questions.md").write_text("# FAQ")
+    (tmp_path / "notes.txt").write_text("not a page")
+    return tmp_path
+
+
+def test__list_pages(wiki_dir):
+    assert wiki.list_pages() == ["frequently-asked-questions", "index"]
+    assert wiki._pages == {}  # nothing was read
+
+
+def test__variables_load_lazily(wiki_dir):
+    assert wiki.faq == "# FAQ"
+    assert list(wiki._pages) == ["frequently-asked-questions"]
+
+
+def test__read_page_reloads_changed_file(wiki_dir):
+    assert wiki.read_page("index") == "# Index"
+
+    path = wiki_dir / "index.md"
+    path.write_text("# New Index")
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 1))
+
+    assert wiki.index == "# New Index"
+
+
+def test__unknown_variable():
+    with pytest.raises(AttributeError):
+        wiki.not_a_page
+
+
+class FakeWikiPage:
+    def __init__(self, content_md=None, fail=False):
+        self._content_md = content_md
+        self.fail = fail
+        self.edits = []
+
+    @property
+    def content_md(self):
+        if self._content_md is None:
+            raise prawcore.exceptions.NotFound(SimpleNamespace(status_code=404))
+        return self._content_md
+
+    def edit(self, content, reason):
+        if self.fail:
+            raise prawcore.exceptions.ServerError(SimpleNamespace(status_code=500))
+        self.edits.append(content)
+        self._content_md = content
+
+
+@pytest.fixture
+def live_wiki(wiki_dir, monkeypatch):
+    (wiki_dir / "resources.md").write_text("# Resources\n")
+    (wiki_dir / "broken.md").write_text("# Broken")
+    live_wiki = {
+        "index": FakeWikiPage("# Index"),
+        "frequently-asked-questions": FakeWikiPage("# Old FAQ"),
+        "resources": FakeWikiPage(),  # not created yet
+        "broken": FakeWikiPage("# Old", fail=True),
+    }
+    subreddit = SimpleNamespace(wiki=live_wiki)
+    reddit = SimpleNamespace(subreddit=lambda name: subreddit)
+    monkeypatch.setattr(update_wiki, "get_datascience_bot", lambda: reddit)
+    return live_wiki
+
+
+def test__content_hash_normalizes_line_endings():
+    crlf = update_wiki.content_hash("# A\r\n\nb  \r\n")
+    assert crlf == update_wiki.content_hash("# A\n\nb")
+    assert update_wiki.content_hash("# A") != update_wiki.content_hash("# B")
+
+
+def test__deploy_page(live_wiki):
+    subreddit = SimpleNamespace(wiki=live_wiki)
+    live_wiki["index"]._content_md = "# Index\r\n"
+
+    assert update_wiki.deploy_page(subreddit, "index") == "skipped"
+    assert update_wiki.deploy_page(subreddit, "frequently-asked-questions") == (
+        "updated"
+    )
+    assert update_wiki.deploy_page(subreddit, "resources") == "updated"
+    with pytest.raises(prawcore.exceptions.ServerError):
+        update_wiki.deploy_page(subreddit, "broken")
+
+    assert live_wiki["index"].edits == []
+    assert live_wiki["frequently-asked-questions"].edits == ["# FAQ"]
+    assert live_wiki["resources"].edits == ["# Resources\n"]
+
+
+def test__main_counts_pages(live_wiki):
+    summary = update_wiki.main()
+
+    assert summary.pop("seconds") >= 0
+    assert summary == {"skipped": 1, "updated": 2, "failed": 1}
+    assert update_wiki.main()["updated"] == 0  # nothing changed since